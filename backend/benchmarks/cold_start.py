@@ -0,0 +1,101 @@
+"""
+Cold-start time of the API: process start until /livez and /readyz first succeed.
+
+Usage (from the backend directory, with the .env of the target environment):
+    python -m benchmarks.cold_start --runs 5
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def probe(url: str) -> tuple[int, dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:  # noqa: S310
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except OSError:
+        return 0, {}
+
+
+def measure(command: list[str], port: int, timeout: float) -> tuple[float | None, float | None, dict]:
+    """
+    Start the server and poll the probes.
+
+    Returns:
+        Tuple: Seconds until /livez and /readyz succeeded (None if they did not within timeout) and the
+        last /readyz body.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)  # noqa: S603
+    live = ready = None
+    last_checks: dict = {}
+    try:
+        while time.perf_counter() - start < timeout and ready is None:
+            if live is None and probe(f"http://127.0.0.1:{port}/livez")[0] == 200:
+                live = time.perf_counter() - start
+            if live is not None:
+                status, last_checks = probe(f"http://127.0.0.1:{port}/readyz")
+                if status == 200:
+                    ready = time.perf_counter() - start
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    return live, ready, last_checks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--app", default="src.app:instance")
+    args = parser.parse_args()
+
+    module = args.app.split(":")[0]
+    import_command = [
+        sys.executable,
+        "-c",
+        f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)",
+    ]
+    import_times = [
+        float(subprocess.check_output(import_command, env=os.environ, text=True).split()[-1])  # noqa: S603
+        for _ in range(args.runs)
+    ]
+    print(f"import {module}: median {statistics.median(import_times) * 1000:.0f} ms")
+
+    live_times, ready_times = [], []
+    for _ in range(args.runs):
+        port = free_port()
+        command = [sys.executable, "-m", "uvicorn", args.app, "--port", str(port), "--log-level", "warning"]
+        live, ready, checks = measure(command, port, args.timeout)
+        if live is not None:
+            live_times.append(live)
+        if ready is not None:
+            ready_times.append(ready)
+        else:
+            print(f"not ready after {args.timeout:.0f} s: {checks.get('checks')}")
+
+    if live_times:
+        print(f"/livez:  median {statistics.median(live_times) * 1000:.0f} ms over {len(live_times)} runs")
+    if ready_times:
+        print(f"/readyz: median {statistics.median(ready_times) * 1000:.0f} ms over {len(ready_times)} runs")
+
+
+if __name__ == "__main__":
+    main()
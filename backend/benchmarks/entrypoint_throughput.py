@@ -0,0 +1,100 @@
+"""
+Cache-hit throughput of the previous single-process entry point vs. src.main.
+
+Starts each server variant against the configured database and blob storage, waits for /readyz,
+drives it with the locust CacheHitUploadUser scenario and prints requests/s and latency percentiles.
+
+Usage (from the backend directory, with the .env of the target environment and locust installed):
+    python -m benchmarks.entrypoint_throughput --users 500 --duration 60s
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+LOCUST_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "stress_test", "locust.py")
+
+VARIANTS = {
+    # What src.main ran before: one process, asyncio event loop, h11 parser, default keep-alive.
+    "single-process": [sys.executable, "-m", "uvicorn", "src.app:instance", "--loop", "asyncio", "--http", "h11"],
+    "src.main": [sys.executable, "-m", "src.main"],
+}
+
+
+def wait_until_ready(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1) as response:  # noqa: S310
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} not ready after {timeout} s")
+
+
+def run_variant(command: list[str], args: argparse.Namespace) -> dict:
+    env = {**os.environ, "SERVER_PORT": str(args.port), "UVICORN_PORT": str(args.port)}
+    server = subprocess.Popen(command, env=env)  # noqa: S603
+    try:
+        wait_until_ready(args.port, args.startup_timeout)
+        with tempfile.NamedTemporaryFile(suffix=".json") as report:
+            subprocess.run(  # noqa: S603
+                [
+                    sys.executable,
+                    "-m",
+                    "locust",
+                    "-f",
+                    LOCUST_FILE,
+                    "CacheHitUploadUser",
+                    "--headless",
+                    "--users",
+                    str(args.users),
+                    "--spawn-rate",
+                    str(args.users),
+                    "--run-time",
+                    args.duration,
+                    "--host",
+                    f"http://127.0.0.1:{args.port}",
+                    "--percentiles-file",
+                    report.name,
+                    "--only-summary",
+                ],
+                check=False,
+                cwd=tempfile.gettempdir(),
+            )
+            with open(report.name) as report_file:
+                return json.load(report_file).get("cache-hit-upload", {})
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--duration", default="60s")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--variants", nargs="*", default=list(VARIANTS))
+    args = parser.parse_args()
+
+    results = {name: run_variant(VARIANTS[name], args) for name in args.variants}
+
+    print(f"\n{'variant':<16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failures':>9}")
+    for name, stats in results.items():
+        percentiles = stats.get("percentiles_ms", {})
+        print(
+            f"{name:<16} {stats.get('rps', 0):>8} {percentiles.get('p50', 0):>8} "
+            f"{percentiles.get('p99', 0):>8} {stats.get('failures', 0):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Per-page CPU cost of the render path, legacy double encode vs. each encode-once backend.
+
+CPU time includes the pdftoppm child processes, so the poppler-side encode is counted too.
+
+Usage (from the backend directory):
+    python -m benchmarks.render_encode path/to/document.pdf --repeat 3 --record benchmarks/RESULTS.md
+
+--record appends the table to a Markdown file together with the machine, the poppler and Pillow
+versions and the document, so runs on different machines and versions can be compared.
+"""
+
+import argparse
+import datetime
+import os
+import platform
+import subprocess
+import time
+from collections.abc import Callable
+from io import BytesIO
+
+import PIL
+from pdf2image import convert_from_bytes
+from PIL import features
+
+from src.utils.convert_pdf_to_image import get_page_count
+from src.utils.image_encoders import ENCODERS
+from src.utils.image_encoders import get_encoder
+
+
+def render_legacy(pdf_bytes: bytes, first_page: int, last_page: int, dpi: int, quality: int) -> list[bytes]:
+    """The previous render path: poppler JPEG, decoded by PIL and encoded again."""
+    encoded_pages = []
+    for image in convert_from_bytes(
+        pdf_bytes, dpi=dpi, first_page=first_page, last_page=last_page, fmt="jpeg", thread_count=1
+    ):
+        buffered = BytesIO()
+        image.save(buffered, format="JPEG", quality=quality)
+        encoded_pages.append(buffered.getvalue())
+        image.close()
+    return encoded_pages
+
+
+def cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def measure(render: Callable[[int, int], list[bytes]], num_pages: int, batch_size: int) -> tuple[float, float, int]:
+    """
+    Render every page once.
+
+    Returns:
+        Tuple[float, float, int]: CPU seconds, wall seconds and total encoded bytes.
+    """
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    total_bytes = 0
+    for first_page in range(1, num_pages + 1, batch_size):
+        last_page = min(first_page + batch_size - 1, num_pages)
+        total_bytes += sum(len(image_bytes) for image_bytes in render(first_page, last_page))
+    return cpu_seconds() - cpu_start, time.perf_counter() - wall_start, total_bytes
+
+
+def describe_environment() -> str:
+    """The machine and library versions the measurements depend on."""
+    try:
+        pdftoppm = subprocess.run(["pdftoppm", "-v"], capture_output=True, text=True, check=False)  # noqa: S607
+        poppler_version = (pdftoppm.stderr or pdftoppm.stdout).splitlines()[0]
+    except (OSError, IndexError):
+        poppler_version = "unknown"
+    return (
+        f"{platform.processor() or platform.machine()}, {os.cpu_count()} CPUs, {platform.platform()}; "
+        f"{poppler_version}; Pillow {PIL.__version__} "
+        f"(libjpeg-turbo {features.version_feature('libjpeg_turbo') or 'no'}, "
+        f"libwebp {features.version_module('webp') or 'no'})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF document to render")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--quality", type=int, default=25)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend; the fastest run is reported")
+    parser.add_argument("--encoders", nargs="*", default=["legacy", *ENCODERS])
+    parser.add_argument("--record", help="Markdown file the results are appended to")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as pdf_file:
+        pdf_bytes = pdf_file.read()
+    num_pages = get_page_count(pdf_bytes)
+    title = f"{os.path.basename(args.pdf)}: {num_pages} pages at {args.dpi} dpi, quality {args.quality}"
+    print(f"{title}\n")
+    print(f"{'backend':<10} {'cpu ms/page':>12} {'wall ms/page':>13} {'KiB/page':>9} {'vs legacy':>10}")
+    rows = []
+
+    baseline = None
+    for name in args.encoders:
+        if name == "legacy":
+
+            def render(first: int, last: int) -> list[bytes]:
+                return render_legacy(pdf_bytes, first, last, args.dpi, args.quality)
+
+        else:
+            encoder = get_encoder(name, args.quality)
+
+            def render(first: int, last: int, encoder=encoder) -> list[bytes]:
+                return encoder.render(pdf_bytes, first, last, args.dpi)
+
+        cpu, wall, total_bytes = min(measure(render, num_pages, args.batch_size) for _ in range(args.repeat))
+        cpu_per_page = cpu * 1000 / num_pages
+        if baseline is None:
+            baseline = cpu_per_page
+        row = (name, cpu_per_page, wall * 1000 / num_pages, total_bytes / 1024 / num_pages, cpu_per_page / baseline)
+        rows.append(row)
+        print(f"{row[0]:<10} {row[1]:>12.1f} {row[2]:>13.1f} {row[3]:>9.1f} {row[4]:>9.2f}x")
+
+    if args.record:
+        with open(args.record, "a", encoding="utf-8") as record_file:
+            record_file.write(
+                f"\n## {datetime.date.today().isoformat()} - {title}\n\n"
+                f"{describe_environment()}; batches of {args.batch_size} pages, fastest of {args.repeat} runs.\n\n"
+                "| backend | cpu ms/page | wall ms/page | KiB/page | vs legacy |\n"
+                "|---|---:|---:|---:|---:|\n"
+            )
+            for name, cpu_ms, wall_ms, kib, ratio in rows:
+                record_file.write(f"| {name} | {cpu_ms:.1f} | {wall_ms:.1f} | {kib:.1f} | {ratio:.2f}x |\n")
+        print(f"\nRecorded in {args.record}")
+
+
+if __name__ == "__main__":
+    main()
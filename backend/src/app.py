@@ -1,18 +1,44 @@
+import asyncio
+import contextlib
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from src.config import Settings
 from src.db.database import Database
+from src.dependencies import get_pdf_repository
 from src.dependencies import setup_logging
+from src.routers import document_router
+from src.routers import health_router
 from src.routers import pdf_router
+from src.services.pdf_service import PdfService
+from src.services.retention_service import RetentionService
+from src.services.shard_worker import ShardWorker
+from src.utils.access_tracker import AccessTracker
 from src.utils.blob_storage import AzureBlobManager
+from src.utils.metrics import MetricsRegistry
+from src.utils.render_pool import RenderWorkerPool
+from src.utils.tracing import TRACEPARENT_HEADER
+from src.utils.tracing import shutdown_tracing
+from src.utils.tracing import span_traceparent
+from src.utils.tracing import start_span
+from starlette.datastructures import Headers
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
 
 setup_logging()
 logger = logging.getLogger(__name__)
-blob_storage = AzureBlobManager()
+metrics = MetricsRegistry()
+blob_storage = AzureBlobManager(metrics=metrics)
 db = Database()
+access_tracker = AccessTracker()
+render_pool = RenderWorkerPool()
 
 
 @asynccontextmanager
@@ -29,19 +55,105 @@ async def lifespan(app: FastAPI) -> None:
     Yields:
         None: This function does not yield any values.
     """
+    # The schema and blob container are created by the init step (python -m src.db.init_db).
     await db.initialize()
-    await db.create_tables()
     logger.info("Database initialized during application startup")
+    app.state.db = db
+    app.state.access_tracker = access_tracker
+    app.state.render_pool = render_pool
+    app.state.metrics = metrics
+    # Workers warm up in the background; /readyz reports the pool once all of them are up.
+    render_pool_start = asyncio.create_task(asyncio.to_thread(render_pool.start))
     success = await blob_storage.initialize()
+    app.state.blob_storage = blob_storage
+    retention_service = retention_task = shard_worker_task = None
     if success:
         logger.info("Azure Blob Storage initialized during application startup")
-        app.state.blob_storage = blob_storage
-        app.state.db = db
+        # The singleton the routes use, so documents deleted by the sweeper leave its caches too.
+        pdf_repository = get_pdf_repository(blob_storage=blob_storage, db=db)
+        retention_service = RetentionService(pdf_repository, access_tracker)
+        retention_task = asyncio.create_task(retention_service.run())
+        if Settings.SHARD_WORKER_ENABLED:
+            shard_worker = ShardWorker(PdfService(pdf_repository, access_tracker, render_pool, metrics))
+            shard_worker_task = asyncio.create_task(shard_worker.run())
     else:
         logger.warning("Azure Blob Storage initialization failed")
     yield
+    if shard_worker_task is not None:
+        shard_worker_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await shard_worker_task
+    if retention_service is not None and retention_task is not None:
+        retention_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await retention_task
+        await retention_service.flush_access_times()
+    try:
+        await render_pool_start
+    except Exception as e:
+        logger.error("Render worker pool failed to start: %s", str(e))
+    await asyncio.to_thread(render_pool.shutdown)
+    logger.info("Render workers drained during application shutdown")
+    await blob_storage.close()
     await db.close()
     logger.info("Database connection closed during application shutdown")
+    await asyncio.to_thread(shutdown_tracing)
+
+
+class TraceRequestsMiddleware:
+    """
+    Trace every request as the root span of its conversion, continuing the caller's trace if it sent a traceparent.
+
+    A pure ASGI middleware, so streamed responses are not buffered. The span is named after the route
+    template, gets the task id of the route, if any, and ends once the response is sent; background
+    tasks of the request still run in its context, as children of the span.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, path = scope["method"], scope["path"]
+        span = None
+
+        def end_span() -> None:
+            nonlocal span
+            if span is None:
+                return
+            route = scope.get("route")
+            if route is not None:
+                span.update_name(f"{method} {route.path}")
+            path_params = scope.get("path_params", {})
+            task_id = path_params.get("task_id") or path_params.get("hash_id") or path_params.get("sha256")
+            if task_id:
+                span.set_attribute("task_id", task_id)
+            span.end()
+            span = None
+
+        async def send_traced(message: Message) -> None:
+            if message["type"] == "http.response.start" and span is not None:
+                span.set_attribute("http.status_code", message["status"])
+                traceparent = span_traceparent(span)
+                if traceparent is not None:
+                    MutableHeaders(scope=message).append(TRACEPARENT_HEADER, traceparent)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                end_span()
+
+        try:
+            with start_span(
+                f"{method} {path}",
+                traceparent=Headers(scope=scope).get(TRACEPARENT_HEADER),
+                end_on_exit=False,
+                **{"http.method": method, "http.target": path},
+            ) as span:
+                await self.app(scope, receive, send_traced)
+        finally:
+            # Requests that failed before their response was sent end here, after the error is recorded.
+            end_span()
 
 
 def create_app() -> FastAPI:
@@ -53,7 +165,6 @@ def create_app() -> FastAPI:
         FastAPI: Configured FastAPI application instance.
     """
 
-
     app = FastAPI(title="FastAPI Template", version="0.0.1", lifespan=lifespan)
 
     # Configure CORS middleware
@@ -65,8 +176,11 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
+    app.add_middleware(TraceRequestsMiddleware)
 
     app.include_router(pdf_router.router, prefix="/api")
+    app.include_router(document_router.router, prefix="/api")
+    app.include_router(health_router.router)
 
     logger.info("FastAPI application created and configured.")
 
@@ -21,5 +21,75 @@ class Settings:
     POSTGRES_HOST: str = os.getenv("POSTGRES_HOST")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB")
+    POSTGRES_READ_HOSTS: tuple[str, ...] = tuple(
+        host.strip() for host in os.getenv("POSTGRES_READ_HOSTS", "").split(",") if host.strip()
+    )
+    READ_AFTER_WRITE_PIN_SECONDS: int = int(os.getenv("READ_AFTER_WRITE_PIN_SECONDS", "30"))
     
-    PDF_BATCH_SIZE: int = int(os.getenv("PDF_BATCH_SIZE", 10))
\ No newline at end of file
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "1"))
+    SERVER_LOOP: str = os.getenv("SERVER_LOOP", "uvloop")
+    SERVER_HTTP: str = os.getenv("SERVER_HTTP", "httptools")
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    SERVER_KEEPALIVE_SECONDS: int = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "75"))
+    SERVER_LIMIT_CONCURRENCY: int | None = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "0")) or None
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = int(os.getenv("SERVER_GRACEFUL_SHUTDOWN_SECONDS", "30"))
+    # X-Forwarded-* headers are only trusted from these addresses: the reverse proxy in front of the API.
+    SERVER_FORWARDED_ALLOW_IPS: str = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+    INLINE_MAX_PAGES: int = int(os.getenv("INLINE_MAX_PAGES", "3"))
+    INLINE_TIMEOUT_SECONDS: float = float(os.getenv("INLINE_TIMEOUT_SECONDS", "2"))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    PDF_BATCH_SIZE: int = int(os.getenv("PDF_BATCH_SIZE", "10"))
+    PDF_BATCH_MIN_SIZE: int = int(os.getenv("PDF_BATCH_MIN_SIZE", "1"))
+    PDF_BATCH_MAX_SIZE: int = int(os.getenv("PDF_BATCH_MAX_SIZE", "50"))
+    PDF_BATCH_TARGET_SECONDS: float = float(os.getenv("PDF_BATCH_TARGET_SECONDS", "5"))
+    PDF_BATCH_TARGET_MEMORY_MB: int = int(os.getenv("PDF_BATCH_TARGET_MEMORY_MB", "512"))
+    RENDER_DPI: int = int(os.getenv("RENDER_DPI", "200"))
+    MAX_PAGE_PIXELS: int = int(os.getenv("MAX_PAGE_PIXELS", "40000000"))
+    MIN_RENDER_DPI: int = int(os.getenv("MIN_RENDER_DPI", "50"))
+    IMAGE_ENCODER: str = os.getenv("IMAGE_ENCODER", "poppler")
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "25"))
+    CONVERSION_STALE_SECONDS: int = int(os.getenv("CONVERSION_STALE_SECONDS", "300"))
+    CONVERSION_ABANDON_SECONDS: int = int(os.getenv("CONVERSION_ABANDON_SECONDS", "60"))
+    POLL_TOUCH_INTERVAL_SECONDS: int = int(os.getenv("POLL_TOUCH_INTERVAL_SECONDS", "10"))
+    OUTPUT_FORMAT: str = os.getenv("OUTPUT_FORMAT", "manifest")
+    PAGE_CONTAINER_LOCAL_DIR: str | None = os.getenv("PAGE_CONTAINER_LOCAL_DIR")
+    RENDER_WORKERS: int = int(os.getenv("RENDER_WORKERS", "0"))
+    RENDER_WORKER_MAX_TASKS: int = int(os.getenv("RENDER_WORKER_MAX_TASKS", "50"))
+    RENDER_MEMORY_LIMIT_MB: int = int(os.getenv("RENDER_MEMORY_LIMIT_MB", "2048"))
+    SHARD_MIN_PAGES: int = int(os.getenv("SHARD_MIN_PAGES", "200"))
+    SHARD_PAGES: int = int(os.getenv("SHARD_PAGES", "50"))
+    SHARD_MAX_ATTEMPTS: int = int(os.getenv("SHARD_MAX_ATTEMPTS", "3"))
+    SHARD_WORKER_ENABLED: bool = os.getenv("SHARD_WORKER_ENABLED", "true").lower() == "true"
+    SHARD_WORKER_CONCURRENCY: int = int(os.getenv("SHARD_WORKER_CONCURRENCY", "0"))
+    SHARD_POLL_INTERVAL_SECONDS: float = float(os.getenv("SHARD_POLL_INTERVAL_SECONDS", "2"))
+    READINESS_TIMEOUT_SECONDS: float = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+    # Concurrent Blob Storage operations per process, adapted between the bounds to the storage throttling
+    BLOB_CONCURRENCY_INITIAL: int = int(os.getenv("BLOB_CONCURRENCY_INITIAL", "16"))
+    BLOB_CONCURRENCY_MIN: int = int(os.getenv("BLOB_CONCURRENCY_MIN", "1"))
+    BLOB_CONCURRENCY_MAX: int = int(os.getenv("BLOB_CONCURRENCY_MAX", "128"))
+    BLOB_CONCURRENCY_BACKOFF: float = float(os.getenv("BLOB_CONCURRENCY_BACKOFF", "0.5"))
+    BLOB_MAX_RETRIES: int = int(os.getenv("BLOB_MAX_RETRIES", "4"))
+    BLOB_RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("BLOB_RETRY_BASE_DELAY_SECONDS", "0.1"))
+    BLOB_RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("BLOB_RETRY_MAX_DELAY_SECONDS", "5"))
+
+    # Tracing: "file" appends JSON lines to a per-process TRACE_FILE, "otlp" posts them to an OTLP/HTTP collector
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    # Fraction of the traces started here that are recorded; continued traces follow the caller's decision
+    TRACE_SAMPLE_RATIO: float = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+    TRACE_FILE: str = os.getenv("TRACE_FILE", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "pdf-to-image-backend")
+    TRACE_BATCH_SIZE: int = int(os.getenv("TRACE_BATCH_SIZE", "512"))
+    TRACE_QUEUE_SIZE: int = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+    TRACE_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "2"))
+    TRACE_EXPORT_TIMEOUT_SECONDS: float = float(os.getenv("TRACE_EXPORT_TIMEOUT_SECONDS", "5"))
+
+    RETENTION_TTL_SECONDS: int = int(os.getenv("RETENTION_TTL_SECONDS", str(30 * 24 * 3600)))
+    RETENTION_MAX_TOTAL_BYTES: int = int(os.getenv("RETENTION_MAX_TOTAL_BYTES", "0"))
+    RETENTION_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("RETENTION_SWEEP_INTERVAL_SECONDS", "3600"))
+    RETENTION_SWEEP_BATCH_SIZE: int = int(os.getenv("RETENTION_SWEEP_BATCH_SIZE", "500"))
+    RETENTION_PAGE_GRACE_SECONDS: int = int(os.getenv("RETENTION_PAGE_GRACE_SECONDS", "3600"))
+    ACCESS_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("ACCESS_FLUSH_INTERVAL_SECONDS", "60"))
\ No newline at end of file
@@ -1,15 +1,19 @@
 import asyncio
+import itertools
 import logging
 import os
+import time
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import declarative_base
 
 from src.config import Settings
+from src.utils.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
@@ -20,21 +24,31 @@ Base = declarative_base()
 class Database:
     def __init__(self) -> None:
         """Initialize the database connection parameters"""
-        postgres_host = Settings.POSTGRES_HOST
-        postgres_port = Settings.POSTGRES_PORT
-        postgres_user = Settings.POSTGRES_USER
-        postgres_password = Settings.POSTGRES_PASSWORD
-        postgres_db = Settings.POSTGRES_DB
-        self.database_url = (
-            f"postgresql+asyncpg://{postgres_user}:{postgres_password}@{postgres_host}:{postgres_port}/{postgres_db}"
-        )
+        self.database_url = self._build_url(Settings.POSTGRES_HOST, Settings.POSTGRES_PORT)
+        self.read_database_urls = [self._build_url(*self._split_host(host)) for host in Settings.POSTGRES_READ_HOSTS]
 
         self.engine = None
         self.async_session_maker = None
+        self.read_engines = []
+        self._read_session_makers = []
+        self._next_read_session_maker = None
         self._lock = asyncio.Lock()
 
+    @staticmethod
+    def _build_url(postgres_host: str, postgres_port: str) -> str:
+        postgres_user = Settings.POSTGRES_USER
+        postgres_password = Settings.POSTGRES_PASSWORD
+        postgres_db = Settings.POSTGRES_DB
+        return f"postgresql+asyncpg://{postgres_user}:{postgres_password}@{postgres_host}:{postgres_port}/{postgres_db}"
+
+    @staticmethod
+    def _split_host(host: str) -> tuple[str, str]:
+        """Split a "host[:port]" replica address, defaulting to the primary port."""
+        name, _, port = host.partition(":")
+        return name, port or Settings.POSTGRES_PORT
+
     async def initialize(self) -> None:
-        """Initialize the async SQLAlchemy engine"""
+        """Initialize the async SQLAlchemy engine and the read replica engines, if any"""
         if self.engine is None:
             logger.info("Initializing database connection")
             self.engine = create_async_engine(
@@ -42,6 +56,17 @@ class Database:
             )
 
             self.async_session_maker = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+            for read_database_url in self.read_database_urls:
+                read_engine = create_async_engine(
+                    read_database_url, echo=False, pool_size=5, max_overflow=10, pool_pre_ping=True
+                )
+                self.read_engines.append(read_engine)
+                self._read_session_makers.append(
+                    async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+                )
+            if self._read_session_makers:
+                self._next_read_session_maker = itertools.cycle(self._read_session_makers)
+                logger.info("Routing reads to %s read replicas", len(self._read_session_makers))
             logger.info("Database connection initialized")
 
     async def create_tables(self) -> None:
@@ -51,24 +76,73 @@ class Database:
             await conn.run_sync(Base.metadata.create_all)
             logger.info("Database tables created or already exist")
 
+    async def ping(self) -> None:
+        """Run a trivial query on the primary and on every read replica, raising if one is unreachable"""
+        if not self.engine:
+            await self.initialize()
+        for engine in [self.engine, *self.read_engines]:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
     async def close(self) -> None:
         """Close database connection"""
+        for read_engine in self.read_engines:
+            await read_engine.dispose()
         if self.engine:
             await self.engine.dispose()
             logger.info("Database connection closed")
 
     @asynccontextmanager
-    async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
-        """Context manager to get a session with lock"""
+    async def advisory_lock(self, key: int) -> AsyncGenerator[bool, None]:
+        """
+        Context manager trying to take a PostgreSQL advisory lock on the primary without waiting.
+
+        The lock is held by a dedicated autocommit connection until the block exits, so it
+        serializes work across processes and hosts without keeping a transaction open.
+
+        Yields:
+            bool: True if this process holds the lock, False if another one does.
+        """
         if not self.engine:
             await self.initialize()
-
-        async with self._lock:
-            session = self.async_session_maker()
+        async with self.engine.connect() as connection:
+            await connection.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = await connection.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})
             try:
-                yield session
+                yield acquired
             finally:
-                await session.close()
+                if acquired:
+                    await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+    @asynccontextmanager
+    async def get_session(self, *, read_only: bool = False) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Context manager to get a session; primary sessions are taken under the lock.
+
+        Read-only sessions go to the read replicas in turn, or to the primary when none are configured.
+        Replicas may lag behind the primary, so reads that must see a write just made use the primary.
+        """
+        if not self.engine:
+            await self.initialize()
+
+        if read_only and self._next_read_session_maker is not None:
+            with start_span("db.session", replica=True):
+                session = next(self._next_read_session_maker)()
+                try:
+                    yield session
+                finally:
+                    await session.close()
+            return
+
+        with start_span("db.session", replica=False) as span:
+            lock_requested = time.monotonic()
+            async with self._lock:
+                span.set_attribute("lock_wait_ms", round((time.monotonic() - lock_requested) * 1000, 3))
+                session = self.async_session_maker()
+                try:
+                    yield session
+                finally:
+                    await session.close()
 
     @asynccontextmanager
     async def transaction(self) -> AsyncGenerator[AsyncSession, None]:
@@ -76,3 +150,17 @@ class Database:
         async with self.get_session() as session, session.begin():
             yield session
 
+    @asynccontextmanager
+    async def unlocked_transaction(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Context manager to get a primary session with an active transaction, not taken under the lock.
+
+        For transactions keeping rows locked across blob I/O: other primary sessions of this
+        process are not held up, only those touching the same rows wait for the commit.
+        """
+        if not self.engine:
+            await self.initialize()
+
+        with start_span("db.session", replica=False, locked=False):
+            async with self.async_session_maker() as session, session.begin():
+                yield session
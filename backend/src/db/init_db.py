@@ -0,0 +1,39 @@
+import asyncio
+import logging
+
+from src.db.database import Database
+from src.db.migrations import run_migrations
+from src.dependencies import setup_logging
+from src.utils.blob_storage import AzureBlobManager
+
+logger = logging.getLogger(__name__)
+
+
+async def init_db() -> None:
+    """
+    Create or migrate the database schema and create the default blob container.
+
+    Run once per deployment (``python -m src.db.init_db``) before starting the API, which no
+    longer creates them on every boot. Both steps are idempotent.
+    """
+    db = Database()
+    await db.initialize()
+    try:
+        async with db.engine.begin() as connection:
+            applied = await run_migrations(connection)
+        logger.info("Applied %s database migrations", len(applied))
+    finally:
+        await db.close()
+
+    blob_storage = AzureBlobManager()
+    try:
+        if not await blob_storage.initialize(create_container=True):
+            raise RuntimeError("Azure Blob Storage initialization failed")
+    finally:
+        await blob_storage.close()
+    logger.info("Database schema and blob container are ready")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(init_db())
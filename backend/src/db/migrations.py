@@ -0,0 +1,148 @@
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from src.db.database import Base
+from src.models.db import conversion_shard  # noqa: F401  (registers the tables with Base.metadata)
+from src.models.db import conversion_task  # noqa: F401
+from src.models.db import document_page  # noqa: F401
+from src.models.db import page_blob  # noqa: F401
+from src.models.db import pdf_document  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# Serializes concurrent init runs; any constant unique to this application works.
+MIGRATION_LOCK_KEY = 7_310_402_118
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    A schema change for databases created by an earlier version.
+
+    Statements must be idempotent: a fresh database already has the change from create_all, and
+    the migration still runs there once to be recorded.
+    """
+
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        1,
+        "pdf_documents.page_count",
+        ("ALTER TABLE pdf_documents ADD COLUMN IF NOT EXISTS page_count INTEGER",),
+    ),
+    Migration(
+        2,
+        "document_pages.digest referencing page_blobs",
+        (
+            "ALTER TABLE document_pages ADD COLUMN IF NOT EXISTS digest VARCHAR(64)",
+            # Pages saved before deduplication keep their blob; each gets a page_blobs row of its own,
+            # keyed by a digest of the blob name since their content digest is unknown.
+            """
+            INSERT INTO page_blobs (digest, blob_name, image_format, size_bytes, ref_count)
+            SELECT encode(sha256(convert_to(blob_name, 'UTF8')), 'hex'), blob_name,
+                   min(image_format), min(size_bytes), count(*)
+            FROM document_pages
+            WHERE digest IS NULL
+            GROUP BY blob_name
+            ON CONFLICT (digest) DO NOTHING
+            """,
+            """
+            UPDATE document_pages SET digest = encode(sha256(convert_to(blob_name, 'UTF8')), 'hex')
+            WHERE digest IS NULL
+            """,
+            "ALTER TABLE document_pages ALTER COLUMN digest SET NOT NULL",
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'document_pages_digest_fkey') THEN
+                    ALTER TABLE document_pages ADD CONSTRAINT document_pages_digest_fkey
+                        FOREIGN KEY (digest) REFERENCES page_blobs (digest);
+                END IF;
+            END
+            $$
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_document_pages_digest ON document_pages (digest)",
+        ),
+    ),
+    Migration(
+        3,
+        "pdf_documents.size_bytes and last_accessed_at",
+        (
+            "ALTER TABLE pdf_documents ADD COLUMN IF NOT EXISTS size_bytes BIGINT",
+            "ALTER TABLE pdf_documents ADD COLUMN IF NOT EXISTS last_accessed_at TIMESTAMP NOT NULL DEFAULT now()",
+            "CREATE INDEX IF NOT EXISTS ix_pdf_documents_last_accessed_at ON pdf_documents (last_accessed_at)",
+        ),
+    ),
+    Migration(
+        4,
+        "pdf_documents.storage_format",
+        (
+            "ALTER TABLE pdf_documents ADD COLUMN IF NOT EXISTS storage_format VARCHAR(20) NOT NULL DEFAULT 'manifest'",
+            # Documents converted before page_count was recorded hold their pages as base64 JSON.
+            "UPDATE pdf_documents SET storage_format = 'legacy' WHERE page_count IS NULL",
+        ),
+    ),
+    Migration(
+        5,
+        "document_pages.crc32",
+        ("ALTER TABLE document_pages ADD COLUMN IF NOT EXISTS crc32 BIGINT",),
+    ),
+    Migration(
+        6,
+        "conversion_tasks.waiters and last_polled_at",
+        (
+            "ALTER TABLE conversion_tasks ADD COLUMN IF NOT EXISTS waiters INTEGER NOT NULL DEFAULT 1",
+            "ALTER TABLE conversion_tasks ADD COLUMN IF NOT EXISTS last_polled_at TIMESTAMP",
+        ),
+    ),
+    Migration(
+        7,
+        "conversion_shards.traceparent",
+        ("ALTER TABLE conversion_shards ADD COLUMN IF NOT EXISTS traceparent VARCHAR(55)",),
+    ),
+)
+
+
+async def run_migrations(connection: AsyncConnection) -> list[int]:
+    """
+    Bring the schema up to date: create the missing tables, then apply the pending migrations.
+
+    Runs in the caller's transaction under an advisory lock, so concurrent runs wait for each
+    other and a failed migration leaves the schema unchanged.
+
+    Args:
+        connection (AsyncConnection): A connection with an active transaction on the primary.
+
+    Returns:
+        List[int]: The versions applied by this run.
+    """
+    await connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    await connection.run_sync(Base.metadata.create_all)
+    await connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, description VARCHAR(255) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+        )
+    )
+    applied_versions = set((await connection.execute(text("SELECT version FROM schema_migrations"))).scalars())
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in applied_versions:
+            continue
+        logger.info("Applying migration %s: %s", migration.version, migration.description)
+        for statement in migration.statements:
+            await connection.execute(text(statement))
+        await connection.execute(
+            text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+            {"version": migration.version, "description": migration.description},
+        )
+        applied.append(migration.version)
+    return applied
@@ -6,7 +6,11 @@ from fastapi import Depends
 from fastapi import Request
 from src.repositories.pdf_repository import PdfRepository
 from src.services.pdf_service import PdfService
+from src.utils.access_tracker import AccessTracker
 from src.utils.blob_storage import AzureBlobManager
+from src.utils.metrics import MetricsRegistry
+from src.utils.render_pool import RenderWorkerPool
+from src.utils.tracing import TraceIdFilter
 from src.db.database import Database
 
 
@@ -21,13 +25,14 @@ def setup_logging(log_level: str = "INFO") -> None:
     logger.setLevel(log_level)
 
     formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
     stdout_handler = logging.StreamHandler(sys.stdout)
     stdout_handler.setLevel(logging.DEBUG)
     stdout_handler.setFormatter(formatter)
+    stdout_handler.addFilter(TraceIdFilter())
     if logger.hasHandlers():
         logger.handlers.clear()
 
@@ -43,6 +48,21 @@ def get_db(request: Request) -> Database:
     return request.app.state.db
 
 
+def get_access_tracker(request: Request) -> AccessTracker:
+    """Retrieve the document access tracker from app state."""
+    return request.app.state.access_tracker
+
+
+def get_render_pool(request: Request) -> RenderWorkerPool:
+    """Retrieve the render worker pool from app state."""
+    return request.app.state.render_pool
+
+
+def get_metrics(request: Request) -> MetricsRegistry:
+    """Retrieve the process metrics registry from app state."""
+    return request.app.state.metrics
+
+
 @lru_cache
 def get_pdf_repository(blob_storage: AzureBlobManager = Depends(get_blob_storage),
                        db: Database = Depends(get_db)) -> PdfRepository:
@@ -51,6 +71,9 @@ def get_pdf_repository(blob_storage: AzureBlobManager = Depends(get_blob_storage
 
 
 @lru_cache
-def get_pdf_service(repository: PdfRepository = Depends(get_pdf_repository)) -> PdfService:
+def get_pdf_service(repository: PdfRepository = Depends(get_pdf_repository),
+                    access_tracker: AccessTracker = Depends(get_access_tracker),
+                    render_pool: RenderWorkerPool = Depends(get_render_pool),
+                    metrics: MetricsRegistry = Depends(get_metrics)) -> PdfService:
     """Create a singleton service instance."""
-    return PdfService(repository)
+    return PdfService(repository, access_tracker, render_pool, metrics)
@@ -1,4 +1,57 @@
+import importlib.util
+import logging
+
 import uvicorn
+from src.config import Settings
+from src.dependencies import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def _available(implementation: str, module: str) -> str:
+    """Fall back to uvicorn's automatic choice when an optional accelerator is not installed."""
+    if implementation == module and importlib.util.find_spec(module) is None:
+        logger.warning("%s is not installed, falling back to the default implementation.", module)
+        return "auto"
+    return implementation
+
+
+def main() -> None:
+    """
+    Run the API in production: SERVER_WORKERS processes with uvloop and httptools.
+
+    Every worker is a separate process that imports the app and creates its own database pool,
+    blob client and render worker pool in the lifespan, so nothing is shared across processes.
+    """
+    setup_logging()
+    loop = _available(Settings.SERVER_LOOP, "uvloop")
+    http = _available(Settings.SERVER_HTTP, "httptools")
+    logger.info(
+        "Starting %s server workers on %s:%s (loop=%s, http=%s, backlog=%s, keep-alive=%ss)",
+        Settings.SERVER_WORKERS,
+        Settings.SERVER_HOST,
+        Settings.SERVER_PORT,
+        loop,
+        http,
+        Settings.SERVER_BACKLOG,
+        Settings.SERVER_KEEPALIVE_SECONDS,
+    )
+    uvicorn.run(
+        "src.app:instance",
+        host=Settings.SERVER_HOST,
+        port=Settings.SERVER_PORT,
+        workers=Settings.SERVER_WORKERS,
+        loop=loop,
+        http=http,
+        backlog=Settings.SERVER_BACKLOG,
+        timeout_keep_alive=Settings.SERVER_KEEPALIVE_SECONDS,
+        limit_concurrency=Settings.SERVER_LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=Settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=Settings.SERVER_FORWARDED_ALLOW_IPS,
+        log_level="info",
+    )
+
 
 if __name__ == "__main__":
-    uvicorn.run("src.app:instance", host="0.0.0.0", port=8000, log_level="info")
+    main()
@@ -0,0 +1,33 @@
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import func
+from src.db.database import Base
+
+
+class ConversionShard(Base):
+    """
+    A page range of a large document, queued to be rendered by any worker node
+    """
+
+    __tablename__ = "conversion_shards"
+
+    hash_id = Column(String(64), ForeignKey("conversion_tasks.hash_id", ondelete="CASCADE"), primary_key=True)
+    first_page = Column(Integer, primary_key=True)
+    last_page = Column(Integer, nullable=False)
+    status = Column(String(20), server_default="pending", nullable=False, index=True)
+    attempts = Column(Integer, server_default="0", nullable=False)
+    claimed_by = Column(String(255), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    message = Column(String(2000), nullable=True)
+    # W3C traceparent of the conversion that queued the shard
+    traceparent = Column(String(55), nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ConversionShard(hash_id='{self.hash_id}', pages={self.first_page}-{self.last_page}, "
+            f"status='{self.status}')>"
+        )
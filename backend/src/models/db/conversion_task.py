@@ -0,0 +1,30 @@
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import func
+from src.db.database import Base
+
+
+class ConversionTask(Base):
+    """
+    Progress record of a PDF conversion, used to resume interrupted conversions
+    """
+
+    __tablename__ = "conversion_tasks"
+
+    hash_id = Column(String(64), primary_key=True, index=True)
+    status = Column(String(20), server_default="pending", nullable=False)
+    total_pages = Column(Integer, nullable=True)
+    completed_pages = Column(Integer, server_default="0", nullable=False)
+    message = Column(String(2000), nullable=True)
+    waiters = Column(Integer, server_default="1", nullable=False)
+    last_polled_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ConversionTask(hash_id='{self.hash_id}', status='{self.status}', "
+            f"pages={self.completed_pages}/{self.total_pages})>"
+        )
@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import func
+from src.db.database import Base
+
+
+class DocumentPage(Base):
+    """
+    Model for a single converted page of a PDF document stored in Blob Storage
+    """
+
+    __tablename__ = "document_pages"
+
+    hash_id = Column(String(64), ForeignKey("conversion_tasks.hash_id", ondelete="CASCADE"), primary_key=True)
+    page_number = Column(Integer, primary_key=True)
+    digest = Column(String(64), ForeignKey("page_blobs.digest"), nullable=False, index=True)
+    blob_name = Column(String(2000), nullable=False)
+    image_format = Column(String(10), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    crc32 = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<DocumentPage(hash_id='{self.hash_id}', page_number={self.page_number}, blob_name='{self.blob_name}')>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import func
+from src.db.database import Base
+
+
+class PageBlob(Base):
+    """
+    Model for a unique page image stored once in Blob Storage and shared between documents
+    """
+
+    __tablename__ = "page_blobs"
+
+    digest = Column(String(64), primary_key=True, index=True)
+    blob_name = Column(String(2000), nullable=False)
+    image_format = Column(String(10), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, server_default="0", nullable=False)
+    released_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<PageBlob(digest='{self.digest}', blob_name='{self.blob_name}', ref_count={self.ref_count})>"
@@ -1,6 +1,8 @@
+from sqlalchemy import BigInteger
 from sqlalchemy import Boolean
 from sqlalchemy import Column
 from sqlalchemy import DateTime
+from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import func
 from sqlalchemy.sql import expression
@@ -18,9 +20,13 @@ class PdfDocument(Base):
     blob_url = Column(String(2000), nullable=False)
     container_name = Column(String(100), nullable=False)
     host_name = Column(String(255), nullable=False)
+    page_count = Column(Integer, nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    storage_format = Column(String(20), server_default="manifest", nullable=False)
     is_active = Column(Boolean, server_default=expression.true(), nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    last_accessed_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
 
     def __repr__(self) -> str:
         return f"<PdfDocument(hash_id='{self.hash_id}', blob_name='{self.blob_url}')>"
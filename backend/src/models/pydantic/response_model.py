@@ -6,11 +6,12 @@ from pydantic import BaseModel
 class PdfResponse(BaseModel):
     hash_id: str | None = None
     blob_url: str | None = None
+    page_count: int | None = None
     found: bool = False
 
     @classmethod
-    def success(cls, hash_id: str, blob_url: str) -> "PdfResponse":
-        return cls(hash_id=hash_id, blob_url=blob_url, found=True)
+    def success(cls, hash_id: str, blob_url: str, page_count: int | None = None) -> "PdfResponse":
+        return cls(hash_id=hash_id, blob_url=blob_url, page_count=page_count, found=True)
 
     @classmethod
     def not_found(cls, hash_id: str) -> "PdfResponse":
@@ -40,7 +41,8 @@ class PdfBlobResponse(BaseModel):
 
 
 class StatusResponse(BaseModel):
-    status: Literal["completed", "not_found", "pending", "failed"]
+    status: Literal["completed", "not_found", "pending", "failed", "cancelled"]
     hash_id: str
     blob_url: str | None = None
+    page_count: int | None = None
     message: str | None = None
@@ -1,58 +1,144 @@
+import asyncio
+import base64
 import json
 import logging
+import time
+import zlib
+from collections import Counter
+from collections import OrderedDict
+from contextlib import AbstractAsyncContextManager
+from datetime import timedelta
+from pathlib import Path
 
+from sqlalchemy import bindparam
+from sqlalchemy import case
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import literal_column
 from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import Interval
+from src.models.db.conversion_shard import ConversionShard
+from src.models.db.conversion_task import ConversionTask
+from src.models.db.document_page import DocumentPage
+from src.models.db.page_blob import PageBlob
 from src.models.db.pdf_document import PdfDocument
 from src.models.pydantic.response_model import PdfBlobResponse
 from src.models.pydantic.response_model import PdfResponse
+from src.config import Settings
 from src.utils.blob_storage import AzureBlobManager
+from src.utils.convert_pdf_to_image import RenderedPage
+from src.utils.page_container import HEADER
+from src.utils.page_container import ContainerEntry
+from src.utils.page_container import ContainerHeader
+from src.utils.page_container import MappedPageContainer
+from src.utils.page_container import build_container
+from src.utils.page_container import parse_header
+from src.utils.page_container import parse_index
 from src.db.database import Database
 
 logger = logging.getLogger(__name__)
 
+CONTAINER_CACHE_SIZE = 256
+# Legacy documents are parsed whole, so only a few are kept.
+LEGACY_CACHE_SIZE = 8
+PINNED_HASHES_LIMIT = 10000
+
+
 class PdfRepository:
     def __init__(self, blob_storage: AzureBlobManager, db: Database) -> None:
         self.blob_storage = blob_storage
         self.db = db
+        self._container_indexes: OrderedDict[str, tuple[ContainerHeader, dict[int, ContainerEntry]]] = OrderedDict()
+        self._mapped_containers: OrderedDict[str, MappedPageContainer] = OrderedDict()
+        self._legacy_pages: OrderedDict[str, dict[int, tuple[bytes, str]]] = OrderedDict()
+        self._pinned_until: dict[str, float] = {}
+        self._polled_at: dict[str, float] = {}
+
+    def _pin_to_primary(self, hash_ids: list[str]) -> None:
+        """
+        Route reads of documents written by this process to the primary for a while, until the
+        read replicas have caught up with the write.
+        """
+        now = time.monotonic()
+        if len(self._pinned_until) > PINNED_HASHES_LIMIT:
+            self._pinned_until = {hash_id: until for hash_id, until in self._pinned_until.items() if until > now}
+        for hash_id in hash_ids:
+            self._pinned_until[hash_id] = now + Settings.READ_AFTER_WRITE_PIN_SECONDS
 
-    async def save_pdf_document_hash(self, pdf_blob_response: PdfBlobResponse) -> PdfDocument | None:
+    def _read_session(self, hash_id: str, *, primary: bool = False) -> AbstractAsyncContextManager[AsyncSession]:
+        """
+        Session for a read about hash_id: a read replica, unless the caller or a recent write needs the primary.
+        """
+        pinned = primary or self._pinned_until.get(hash_id, 0.0) > time.monotonic()
+        return self.db.get_session(read_only=not pinned)
+
+    async def save_pdf_document_hash(
+        self,
+        pdf_blob_response: PdfBlobResponse,
+        page_count: int | None = None,
+        size_bytes: int | None = None,
+        storage_format: str = "manifest",
+    ) -> PdfDocument | None:
         """
         Save the PDF document hash and metadata to the database.
 
         Args:
             pdf_blob_response (PdfBlobResponse): Response object containing blob metadata.
+            page_count (int | None): Number of converted pages in the document.
+            size_bytes (int | None): Total size of the converted page images.
+            storage_format (str): "manifest" or "container", see document_blob_name.
 
         Returns:
-            Optional[PdfDocument]: The saved PDF document object.
+            Optional[PdfDocument]: The saved PDF document object, or None if the document was
+            already saved, e.g. by a worker that took over a conversion believed to be stale.
         """
         logging.info("Saving PDF document hash to the database.")
+        hash_id = pdf_blob_response.blob_name.removesuffix(".pages")
+        self._pin_to_primary([hash_id])
         async with self.db.transaction() as session:
-            pdf_document = PdfDocument(
-                hash_id=pdf_blob_response.blob_name,
-                blob_url=pdf_blob_response.blob_url,
-                container_name=pdf_blob_response.container_name,
-                host_name=pdf_blob_response.host_name,
+            result = await session.scalars(
+                insert(PdfDocument)
+                .values(
+                    hash_id=hash_id,
+                    blob_url=pdf_blob_response.blob_url,
+                    container_name=pdf_blob_response.container_name,
+                    host_name=pdf_blob_response.host_name,
+                    page_count=page_count,
+                    size_bytes=size_bytes,
+                    storage_format=storage_format,
+                )
+                .on_conflict_do_nothing(index_elements=[PdfDocument.hash_id])
+                .returning(PdfDocument)
             )
-            session.add(pdf_document)
-            return pdf_document
+            pdf_document = result.first()
+        if pdf_document is None:
+            logger.info("Document %s was already saved.", hash_id)
+        return pdf_document
 
-    async def get_pdf_blob_storage_url_by_hash(self, hash_id: str) -> PdfResponse:
+    async def get_pdf_blob_storage_url_by_hash(self, hash_id: str, *, primary: bool = False) -> PdfResponse:
         """
         Retrieve the PDF document from the database by its hash ID.
 
         Args:
             hash_id (str): The hash ID of the PDF document.
+            primary (bool): Read from the primary instead of a read replica.
 
         Returns:
             PdfResponse: Response object containing the document data or error information.
         """
         logging.info("Retrieving PDF document from the database.")
-        async with self.db.get_session() as session:
+        async with self._read_session(hash_id, primary=primary) as session:
             result = await session.execute(select(PdfDocument).where(PdfDocument.hash_id == hash_id))
             pdf_document = result.scalars().first()
-            if pdf_document:
-                return PdfResponse.success(hash_id=pdf_document.hash_id, blob_url=pdf_document.blob_url)
+        if pdf_document is None:
             return PdfResponse.not_found(hash_id=hash_id)
+        page_count = pdf_document.page_count
+        if page_count is None and pdf_document.storage_format == "legacy":
+            page_count = await self._backfill_legacy_document(hash_id)
+        return PdfResponse.success(hash_id=pdf_document.hash_id, blob_url=pdf_document.blob_url, page_count=page_count)
 
     async def get_image_from_blob_storage_by_name(self, blob_url: str) -> list[dict[str, str]]:
         """
@@ -82,3 +168,1009 @@ class PdfRepository:
         logging.info("Saving image data to blob storage.")
         json_dumped = json.dumps(image_data).encode("utf-8")
         return await self.blob_storage.upload_file(json_dumped, blob_name)
+
+    async def get_pdf_document(self, hash_id: str, *, primary: bool = False) -> PdfDocument | None:
+        """
+        Retrieve the converted document record by its hash ID.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            primary (bool): Read from the primary instead of a read replica.
+
+        Returns:
+            Optional[PdfDocument]: The document, if it has been converted.
+        """
+        async with self._read_session(hash_id, primary=primary) as session:
+            result = await session.execute(select(PdfDocument).where(PdfDocument.hash_id == hash_id))
+            return result.scalars().first()
+
+    @staticmethod
+    def document_blob_name(hash_id: str, storage_format: str) -> str:
+        """
+        Name of the blob holding a converted document: a JSON manifest referencing one blob
+        per page, a page container holding all page images behind an index, or, for documents
+        converted before either existed, a JSON list of base64-encoded page images.
+        """
+        return f"{hash_id}.pages" if storage_format == "container" else hash_id
+
+    async def get_page_image(
+        self, document: PdfDocument, page_number: int
+    ) -> tuple[bytes | memoryview, str, str] | None:
+        """
+        Retrieve the image of one page of a converted document.
+
+        Args:
+            document (PdfDocument): The converted document.
+            page_number (int): The page number, starting at 1.
+
+        Returns:
+            Optional[Tuple[bytes, str, str]]: The encoded page image, its format and a digest of its
+            content (the page blob digest, or the hex CRC-32 of container and legacy pages), or None
+            if the document has no such page.
+        """
+        if document.storage_format == "container":
+            blob_name = self.document_blob_name(document.hash_id, document.storage_format)
+            page_image = await self.get_page_from_container(blob_name, page_number)
+            if page_image is None:
+                return None
+            _header, index = await self._get_container_index(blob_name)
+            return *page_image, f"{index[page_number].crc32:08x}"
+        if document.storage_format == "legacy":
+            page_image = (await self._get_legacy_pages(document.hash_id)).get(page_number)
+            if page_image is None:
+                return None
+            return *page_image, f"{zlib.crc32(page_image[0]):08x}"
+        async with self._read_session(document.hash_id) as session:
+            result = await session.execute(
+                select(DocumentPage.blob_name, DocumentPage.image_format, DocumentPage.digest).where(
+                    DocumentPage.hash_id == document.hash_id, DocumentPage.page_number == page_number
+                )
+            )
+            page = result.first()
+        if page is None:
+            return None
+        return await self.blob_storage.get_file(page.blob_name), page.image_format, page.digest
+
+    async def get_document_page_images(self, pages: list[DocumentPage]) -> list[tuple[int, bytes]]:
+        """
+        Download the images of checkpointed pages.
+
+        Args:
+            pages (List[DocumentPage]): The pages to download.
+
+        Returns:
+            List[Tuple[int, bytes]]: Page numbers and encoded images.
+        """
+        images = await asyncio.gather(*(self.blob_storage.get_file(page.blob_name) for page in pages))
+        return [(page.page_number, image) for page, image in zip(pages, images, strict=True)]
+
+    async def save_page_container(
+        self, hash_id: str, pages: list[tuple[int, bytes]], image_format: str
+    ) -> PdfBlobResponse:
+        """
+        Save all page images of a document as one indexed page container.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            pages (List[Tuple[int, bytes]]): Page numbers and encoded images.
+            image_format (str): Format of the encoded images, e.g. "JPEG".
+
+        Returns:
+            PdfBlobResponse: Response object containing information about the saved blob.
+        """
+        logger.info("Saving page container to blob storage.")
+        container = build_container(pages, image_format)
+        return await self.blob_storage.upload_file(
+            container, self.document_blob_name(hash_id, "container"), content_type="application/octet-stream"
+        )
+
+    async def get_page_from_container(self, blob_name: str, page_number: int) -> tuple[bytes | memoryview, str] | None:
+        """
+        Read one page of a page container.
+
+        Containers found under PAGE_CONTAINER_LOCAL_DIR are memory-mapped and the page is returned
+        as a view of the mapping. Otherwise the page is one ranged read of the blob, once the
+        container header and index have been fetched and cached.
+
+        Args:
+            blob_name (str): Name of the container blob.
+            page_number (int): The page number, starting at 1.
+
+        Returns:
+            Optional[Tuple[bytes, str]]: The encoded page image and its format, or None if the
+            container has no such page.
+        """
+        mapped_container = self._get_mapped_container(blob_name)
+        if mapped_container is not None:
+            if page_number not in mapped_container.index:
+                return None
+            return mapped_container.get_page(page_number), mapped_container.header.image_format
+
+        header, index = await self._get_container_index(blob_name)
+        entry = index.get(page_number)
+        if entry is None:
+            return None
+        return await self.blob_storage.get_file_range(blob_name, entry.offset, entry.length), header.image_format
+
+    async def _get_container_index(self, blob_name: str) -> tuple[ContainerHeader, dict[int, ContainerEntry]]:
+        mapped_container = self._get_mapped_container(blob_name)
+        if mapped_container is not None:
+            return mapped_container.header, mapped_container.index
+
+        cached = self._container_indexes.get(blob_name)
+        if cached is None:
+            header = parse_header(await self.blob_storage.get_file_range(blob_name, 0, HEADER.size))
+            index_bytes = await self.blob_storage.get_file_range(blob_name, header.index_offset, header.index_size)
+            cached = (header, parse_index(index_bytes, header))
+            self._container_indexes[blob_name] = cached
+            if len(self._container_indexes) > CONTAINER_CACHE_SIZE:
+                self._container_indexes.popitem(last=False)
+        self._container_indexes.move_to_end(blob_name)
+        return cached
+
+    async def get_stored_pages(self, document: PdfDocument) -> list[DocumentPage]:
+        """
+        List the stored page images of a converted document, ordered by page number.
+
+        For page containers the pages are built from the container index and are not attached
+        to a session; their blob_name is the container blob. Pages of legacy documents are built
+        the same way from the decoded JSON blob, whose name is the hash ID.
+
+        Args:
+            document (PdfDocument): The converted document.
+
+        Returns:
+            List[DocumentPage]: Page number, format, size and CRC-32 (None if unknown) of each page.
+        """
+        if document.storage_format == "legacy":
+            legacy_pages = await self._get_legacy_pages(document.hash_id)
+            return [
+                DocumentPage(
+                    hash_id=document.hash_id,
+                    page_number=page_number,
+                    blob_name=document.hash_id,
+                    image_format=image_format,
+                    size_bytes=len(image),
+                    crc32=zlib.crc32(image),
+                )
+                for page_number, (image, image_format) in sorted(legacy_pages.items())
+            ]
+        if document.storage_format != "container":
+            return await self.get_document_pages(document.hash_id)
+        blob_name = self.document_blob_name(document.hash_id, document.storage_format)
+        header, index = await self._get_container_index(blob_name)
+        return [
+            DocumentPage(
+                hash_id=document.hash_id,
+                page_number=entry.page_number,
+                blob_name=blob_name,
+                image_format=header.image_format,
+                size_bytes=entry.length,
+                crc32=entry.crc32,
+            )
+            for entry in sorted(index.values(), key=lambda entry: entry.page_number)
+        ]
+
+    async def read_stored_page(self, page: DocumentPage) -> bytes | memoryview:
+        """
+        Read the image of a page returned by get_stored_pages.
+        """
+        if page.blob_name.endswith(".pages"):
+            page_image = await self.get_page_from_container(page.blob_name, page.page_number)
+            if page_image is None:
+                raise KeyError(f"Page {page.page_number} missing from {page.blob_name}")
+            return page_image[0]
+        if page.blob_name == page.hash_id:
+            legacy_pages = await self._get_legacy_pages(page.hash_id)
+            if page.page_number not in legacy_pages:
+                raise KeyError(f"Page {page.page_number} missing from {page.blob_name}")
+            return legacy_pages[page.page_number][0]
+        return await self.blob_storage.get_file(page.blob_name)
+
+    async def _get_legacy_pages(self, hash_id: str) -> dict[int, tuple[bytes, str]]:
+        """
+        Decoded pages of a legacy document, by page number, with their format.
+        """
+        cached = self._legacy_pages.get(hash_id)
+        if cached is None:
+            cached = {
+                int(entry["page"]): (base64.b64decode(entry["image_data"]), entry.get("format", "JPEG"))
+                for entry in await self.get_image_from_blob_storage_by_name(hash_id)
+            }
+            self._legacy_pages[hash_id] = cached
+            if len(self._legacy_pages) > LEGACY_CACHE_SIZE:
+                self._legacy_pages.popitem(last=False)
+        self._legacy_pages.move_to_end(hash_id)
+        return cached
+
+    async def _backfill_legacy_document(self, hash_id: str) -> int:
+        """
+        Record the page count and size of a legacy document, which it was stored without.
+
+        Returns:
+            int: The page count.
+        """
+        legacy_pages = await self._get_legacy_pages(hash_id)
+        page_count = len(legacy_pages)
+        size_bytes = sum(len(image) for image, _image_format in legacy_pages.values())
+        async with self.db.transaction() as session:
+            await session.execute(
+                update(PdfDocument)
+                .where(PdfDocument.hash_id == hash_id, PdfDocument.page_count.is_(None))
+                .values(page_count=page_count, size_bytes=size_bytes)
+            )
+        self._pin_to_primary([hash_id])
+        logger.info("Backfilled legacy document %s with %s pages.", hash_id, page_count)
+        return page_count
+
+    def _get_mapped_container(self, blob_name: str) -> MappedPageContainer | None:
+        if not Settings.PAGE_CONTAINER_LOCAL_DIR:
+            return None
+        mapped_container = self._mapped_containers.get(blob_name)
+        if mapped_container is None:
+            path = Path(Settings.PAGE_CONTAINER_LOCAL_DIR) / blob_name
+            if not path.exists():
+                return None
+            mapped_container = MappedPageContainer(path)
+            self._mapped_containers[blob_name] = mapped_container
+            # Evicted mappings are not closed: pages still being sent keep them alive until released.
+            if len(self._mapped_containers) > CONTAINER_CACHE_SIZE:
+                self._mapped_containers.popitem(last=False)
+        self._mapped_containers.move_to_end(blob_name)
+        return mapped_container
+
+    async def claim_conversion_task(self, hash_id: str, stale_after_seconds: int) -> bool:
+        """
+        Create or take over the progress record of a conversion.
+
+        A conversion can be claimed when it has no progress record yet, when it is not pending
+        or when its last checkpoint is older than stale_after_seconds (the worker running it died).
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            stale_after_seconds (int): Seconds without progress after which a pending conversion is resumable.
+
+        Returns:
+            bool: True if the caller now owns the conversion.
+        """
+        stale_before = func.now() - timedelta(seconds=stale_after_seconds)
+        statement = (
+            insert(ConversionTask)
+            .values(hash_id=hash_id, status="pending")
+            .on_conflict_do_update(
+                index_elements=[ConversionTask.hash_id],
+                set_={
+                    "status": "pending",
+                    "message": None,
+                    # A stale conversion keeps its waiters, a finished or cancelled one starts over.
+                    "waiters": case((ConversionTask.status == "pending", ConversionTask.waiters + 1), else_=1),
+                    "last_polled_at": case(
+                        (ConversionTask.status == "pending", ConversionTask.last_polled_at), else_=None
+                    ),
+                    "updated_at": func.now(),
+                },
+                where=(ConversionTask.status != "pending") | (ConversionTask.updated_at < stale_before),
+            )
+            .returning(ConversionTask.hash_id)
+        )
+        self._pin_to_primary([hash_id])
+        async with self.db.transaction() as session:
+            result = await session.execute(statement)
+            return result.scalar_one_or_none() is not None
+
+    async def add_conversion_waiter(self, hash_id: str) -> None:
+        """
+        Record one more client waiting for a conversion that is already running.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+        """
+        self._pin_to_primary([hash_id])
+        async with self.db.transaction() as session:
+            await session.execute(
+                update(ConversionTask)
+                .where(ConversionTask.hash_id == hash_id, ConversionTask.status == "pending")
+                # updated_at tracks rendering progress only, see claim_conversion_task.
+                .values(waiters=ConversionTask.waiters + 1, updated_at=ConversionTask.updated_at)
+            )
+
+    async def touch_conversion_task(self, hash_id: str) -> None:
+        """
+        Record that a client polled the status of a running conversion.
+
+        Writes are throttled to one every POLL_TOUCH_INTERVAL_SECONDS per conversion and process.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+        """
+        now = time.monotonic()
+        if self._polled_at.get(hash_id, float("-inf")) > now - Settings.POLL_TOUCH_INTERVAL_SECONDS:
+            return
+        if len(self._polled_at) > PINNED_HASHES_LIMIT:
+            self._polled_at.clear()
+        self._polled_at[hash_id] = now
+        async with self.db.transaction() as session:
+            await session.execute(
+                update(ConversionTask)
+                .where(ConversionTask.hash_id == hash_id, ConversionTask.status == "pending")
+                .values(last_polled_at=func.now(), updated_at=ConversionTask.updated_at)
+            )
+
+    async def cancel_conversion_task(self, hash_id: str) -> ConversionTask | None:
+        """
+        Withdraw one waiter from a running conversion; the conversion is cancelled once none is left.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+
+        Returns:
+            Optional[ConversionTask]: The updated progress record, or None if the conversion is not running.
+        """
+        self._pin_to_primary([hash_id])
+        async with self.db.transaction() as session:
+            result = await session.execute(
+                update(ConversionTask)
+                .where(ConversionTask.hash_id == hash_id, ConversionTask.status == "pending")
+                .values(
+                    waiters=func.greatest(ConversionTask.waiters - 1, 0),
+                    status=case((ConversionTask.waiters <= 1, "cancelled"), else_=ConversionTask.status),
+                    message=case(
+                        (ConversionTask.waiters <= 1, "Cancelled by the client"), else_=ConversionTask.message
+                    ),
+                )
+                .returning(ConversionTask)
+            )
+            return result.scalars().first()
+
+    async def is_conversion_cancelled(self, hash_id: str, abandoned_after_seconds: int) -> bool:
+        """
+        Whether a running conversion was cancelled, cancelling it now if its clients stopped polling.
+
+        A conversion is abandoned when it was polled at least once but not in the last
+        abandoned_after_seconds; conversions nobody polls (e.g. API clients) are never abandoned.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            abandoned_after_seconds (int): Seconds without a poll after which nobody is waiting; 0 disables it.
+
+        Returns:
+            bool: True if the conversion should stop.
+        """
+        async with self.db.transaction() as session:
+            if abandoned_after_seconds > 0:
+                result = await session.execute(
+                    update(ConversionTask)
+                    .where(
+                        ConversionTask.hash_id == hash_id,
+                        ConversionTask.status == "pending",
+                        ConversionTask.last_polled_at < func.now() - timedelta(seconds=abandoned_after_seconds),
+                    )
+                    .values(status="cancelled", message="Cancelled, no client is waiting")
+                    .returning(ConversionTask.hash_id)
+                )
+                if result.scalar_one_or_none() is not None:
+                    return True
+            status = await session.scalar(select(ConversionTask.status).where(ConversionTask.hash_id == hash_id))
+            return status == "cancelled"
+
+    async def get_conversion_task(self, hash_id: str, *, primary: bool = False) -> ConversionTask | None:
+        """
+        Retrieve the progress record of a conversion.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            primary (bool): Read from the primary instead of a read replica.
+
+        Returns:
+            Optional[ConversionTask]: The progress record, if any.
+        """
+        async with self._read_session(hash_id, primary=primary) as session:
+            result = await session.execute(select(ConversionTask).where(ConversionTask.hash_id == hash_id))
+            return result.scalars().first()
+
+    async def update_conversion_task(self, hash_id: str, **values: object) -> None:
+        """
+        Update fields of the progress record of a conversion.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            **values: Column values to set.
+        """
+        self._pin_to_primary([hash_id])
+        async with self.db.transaction() as session:
+            await session.execute(update(ConversionTask).where(ConversionTask.hash_id == hash_id).values(**values))
+
+    @staticmethod
+    def source_blob_name(hash_id: str) -> str:
+        return f"sources/{hash_id}.pdf"
+
+    async def save_source_pdf(self, hash_id: str, pdf_content: bytes) -> None:
+        """
+        Store the source PDF of a sharded conversion where every worker node can read it.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            pdf_content (bytes): The content of the PDF file.
+        """
+        await self.blob_storage.upload_file(pdf_content, self.source_blob_name(hash_id), content_type="application/pdf")
+
+    async def get_source_pdf(self, hash_id: str) -> bytes:
+        """
+        Retrieve the source PDF of a sharded conversion.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+
+        Returns:
+            bytes: The content of the PDF file.
+        """
+        return await self.blob_storage.get_file(self.source_blob_name(hash_id))
+
+    async def create_conversion_shards(
+        self, hash_id: str, page_ranges: list[tuple[int, int]], traceparent: str | None = None
+    ) -> int:
+        """
+        Queue the page ranges of a document as shards any worker node can render.
+
+        A document that already has shards (a resumed conversion) keeps them; only its failed
+        shards are queued again.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            page_ranges (List[Tuple[int, int]]): The (first_page, last_page) ranges to queue.
+            traceparent (str | None): The trace of the conversion, continued by the workers rendering the shards.
+
+        Returns:
+            int: Number of shards of the document that are not done yet.
+        """
+        self._pin_to_primary([hash_id])
+        async with self.db.transaction() as session:
+            await session.execute(
+                update(ConversionShard)
+                .where(ConversionShard.hash_id == hash_id, ConversionShard.status == "failed")
+                .values(status="pending", attempts=0, message=None, traceparent=traceparent)
+            )
+            existing = await session.scalar(
+                select(func.count()).select_from(ConversionShard).where(ConversionShard.hash_id == hash_id)
+            )
+            if not existing and page_ranges:
+                await session.execute(
+                    insert(ConversionShard).values(
+                        [
+                            {
+                                "hash_id": hash_id,
+                                "first_page": first_page,
+                                "last_page": last_page,
+                                "traceparent": traceparent,
+                            }
+                            for first_page, last_page in page_ranges
+                        ]
+                    )
+                )
+            return await session.scalar(
+                select(func.count())
+                .select_from(ConversionShard)
+                .where(ConversionShard.hash_id == hash_id, ConversionShard.status != "done")
+            )
+
+    async def claim_conversion_shard(self, worker_id: str, stale_after_seconds: int) -> ConversionShard | None:
+        """
+        Take the oldest queued shard, or a running one whose worker made no progress for stale_after_seconds.
+
+        Rows locked by other workers are skipped, so any number of worker nodes can poll the queue.
+
+        Args:
+            worker_id (str): Identifies the worker in the shard record.
+            stale_after_seconds (int): Seconds without progress after which a running shard is taken over.
+
+        Returns:
+            Optional[ConversionShard]: The claimed shard, or None if there is nothing to do.
+        """
+        stale_before = func.now() - timedelta(seconds=stale_after_seconds)
+        claimable = (
+            select(ConversionShard.hash_id, ConversionShard.first_page)
+            .join(ConversionTask, ConversionTask.hash_id == ConversionShard.hash_id)
+            .where(
+                ConversionTask.status == "pending",
+                (ConversionShard.status == "pending")
+                | ((ConversionShard.status == "running") & (ConversionShard.claimed_at < stale_before)),
+            )
+            .order_by(ConversionShard.created_at, ConversionShard.first_page)
+            .limit(1)
+            .with_for_update(of=ConversionShard, skip_locked=True)
+        )
+        async with self.db.transaction() as session:
+            row = (await session.execute(claimable)).first()
+            if row is None:
+                return None
+            result = await session.execute(
+                update(ConversionShard)
+                .where(ConversionShard.hash_id == row.hash_id, ConversionShard.first_page == row.first_page)
+                .values(
+                    status="running",
+                    claimed_by=worker_id,
+                    claimed_at=func.now(),
+                    attempts=ConversionShard.attempts + 1,
+                )
+                .returning(ConversionShard)
+            )
+            return result.scalars().one()
+
+    async def touch_conversion_shard(self, shard: ConversionShard) -> None:
+        """
+        Record progress of a running shard, so it is not taken over by another worker.
+
+        Args:
+            shard (ConversionShard): The shard claimed by this worker.
+        """
+        async with self.db.transaction() as session:
+            await session.execute(
+                update(ConversionShard)
+                .where(
+                    ConversionShard.hash_id == shard.hash_id,
+                    ConversionShard.first_page == shard.first_page,
+                    ConversionShard.claimed_by == shard.claimed_by,
+                )
+                .values(claimed_at=func.now())
+            )
+
+    async def complete_conversion_shard(self, shard: ConversionShard) -> bool:
+        """
+        Mark a shard done.
+
+        Completions of the same document are serialized on its progress record, so exactly one
+        worker sees the last shard finish.
+
+        Args:
+            shard (ConversionShard): The rendered shard.
+
+        Returns:
+            bool: True if this was the last unfinished shard of its document.
+        """
+        self._pin_to_primary([shard.hash_id])
+        async with self.db.transaction() as session:
+            await session.execute(
+                select(ConversionTask.hash_id).where(ConversionTask.hash_id == shard.hash_id).with_for_update()
+            )
+            result = await session.execute(
+                update(ConversionShard)
+                .where(
+                    ConversionShard.hash_id == shard.hash_id,
+                    ConversionShard.first_page == shard.first_page,
+                    ConversionShard.status != "done",
+                )
+                .values(status="done", message=None)
+                .returning(ConversionShard.first_page)
+            )
+            if result.scalar_one_or_none() is None:
+                return False
+            remaining = await session.scalar(
+                select(func.count())
+                .select_from(ConversionShard)
+                .where(ConversionShard.hash_id == shard.hash_id, ConversionShard.status != "done")
+            )
+            return remaining == 0
+
+    async def release_conversion_shard(
+        self, shard: ConversionShard, message: str, *, failed: bool = False, count_attempt: bool = True
+    ) -> None:
+        """
+        Give up a claimed shard: queue it again, or mark it failed.
+
+        Args:
+            shard (ConversionShard): The shard claimed by this worker.
+            message (str): Why the shard was released.
+            failed (bool): Mark the shard failed instead of queueing it again.
+            count_attempt (bool): Whether the interrupted run counts towards the attempts of the shard.
+        """
+        async with self.db.transaction() as session:
+            await session.execute(
+                update(ConversionShard)
+                .where(
+                    ConversionShard.hash_id == shard.hash_id,
+                    ConversionShard.first_page == shard.first_page,
+                    ConversionShard.claimed_by == shard.claimed_by,
+                )
+                .values(
+                    status="failed" if failed else "pending",
+                    message=message[:2000],
+                    claimed_by=None,
+                    claimed_at=None,
+                    attempts=ConversionShard.attempts if count_attempt else ConversionShard.attempts - 1,
+                )
+            )
+
+    async def delete_conversion_shards(self, hash_id: str) -> None:
+        """
+        Drop the shards and the source PDF of a finished sharded conversion.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+        """
+        async with self.db.transaction() as session:
+            await session.execute(delete(ConversionShard).where(ConversionShard.hash_id == hash_id))
+        await self.blob_storage.delete_file(self.source_blob_name(hash_id))
+
+    async def get_document_pages(self, hash_id: str) -> list[DocumentPage]:
+        """
+        Retrieve the already converted pages of a document, ordered by page number.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+
+        Returns:
+            List[DocumentPage]: The checkpointed pages.
+        """
+        async with self.db.get_session() as session:
+            result = await session.execute(
+                select(DocumentPage).where(DocumentPage.hash_id == hash_id).order_by(DocumentPage.page_number)
+            )
+            return list(result.scalars().all())
+
+    async def save_page_crc32s(self, hash_id: str, crc32s: dict[int, int]) -> None:
+        """
+        Record the CRC-32 of pages checkpointed before CRC-32s were recorded, with a single bulk update.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            crc32s (Dict[int, int]): The CRC-32 of each page, by page number.
+        """
+        table = DocumentPage.__table__
+        statement = (
+            table.update()
+            .where(
+                table.c.hash_id == hash_id,
+                table.c.page_number == bindparam("crc_page_number"),
+                table.c.crc32.is_(None),
+            )
+            .values(crc32=bindparam("page_crc32"))
+        )
+        async with self.db.transaction() as session:
+            connection = await session.connection()
+            await connection.execute(
+                statement,
+                [{"crc_page_number": page_number, "page_crc32": crc32} for page_number, crc32 in crc32s.items()],
+            )
+
+    async def save_page_checkpoints(self, hash_id: str, pages: list[RenderedPage]) -> None:
+        """
+        Store converted pages and record them as checkpoints of the document.
+
+        Pages are content addressed: a page image already stored for any document is only
+        referenced (its reference count is incremented), new page images are uploaded once.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            pages (List[RenderedPage]): The rendered pages of one batch.
+        """
+        digests = {page.digest for page in pages}
+        swept_digests: set[str] = set()
+        async with self.db.get_session() as session:
+            result = await session.execute(select(PageBlob.digest).where(PageBlob.digest.in_(digests)))
+            known_digests = set(result.scalars().all())
+
+        new_pages = {page.digest: page for page in pages if page.digest not in known_digests}
+        await self._upload_page_blobs(list(new_pages.values()))
+
+        self._pin_to_primary([hash_id])
+
+        async with self.db.transaction() as session:
+            result = await session.execute(
+                select(DocumentPage.page_number).where(
+                    DocumentPage.hash_id == hash_id, DocumentPage.page_number.in_([page.page_number for page in pages])
+                )
+            )
+            already_recorded = set(result.scalars().all())
+            pages_to_record = [page for page in pages if page.page_number not in already_recorded]
+            unique_pages = {page.digest: page for page in pages_to_record}
+            if pages_to_record:
+                references = Counter(page.digest for page in pages_to_record)
+                upsert = insert(PageBlob).values(
+                    [
+                        {
+                            "digest": digest,
+                            "blob_name": self._page_blob_name(page),
+                            "image_format": page.image_format,
+                            "size_bytes": len(page.image_bytes),
+                            "ref_count": references[digest],
+                        }
+                        for digest, page in unique_pages.items()
+                    ]
+                )
+                result = await session.execute(
+                    upsert.on_conflict_do_update(
+                        index_elements=[PageBlob.digest],
+                        set_={"ref_count": PageBlob.ref_count + upsert.excluded.ref_count, "released_at": None},
+                    ).returning(PageBlob.digest, literal_column("xmax = 0").label("inserted"))
+                )
+                # A known page blob swept between the lookup and this upsert has to be uploaded again.
+                swept_digests = {row.digest for row in result if row.inserted and row.digest in known_digests}
+
+                await session.execute(
+                    insert(DocumentPage).values(
+                        [
+                            {
+                                "hash_id": hash_id,
+                                "page_number": page.page_number,
+                                "digest": page.digest,
+                                "blob_name": self._page_blob_name(page),
+                                "image_format": page.image_format,
+                                "size_bytes": len(page.image_bytes),
+                                "crc32": zlib.crc32(page.image_bytes),
+                            }
+                            for page in pages_to_record
+                        ]
+                    )
+                )
+
+            completed_pages = (
+                select(func.count()).select_from(DocumentPage).where(DocumentPage.hash_id == hash_id).scalar_subquery()
+            )
+            await session.execute(
+                update(ConversionTask)
+                .where(ConversionTask.hash_id == hash_id)
+                .values(completed_pages=completed_pages, updated_at=func.now())
+            )
+
+        if swept_digests:
+            # Uploaded after the commit, so the primary session is not held during blob I/O.
+            try:
+                await self._upload_page_blobs([unique_pages[digest] for digest in swept_digests])
+            except Exception:
+                await self._undo_page_checkpoints(
+                    hash_id, [page.page_number for page in pages_to_record], swept_digests
+                )
+                raise
+
+        logger.info("Checkpointed %s pages of document %s (%s new page images).", len(pages), hash_id, len(new_pages))
+
+    async def _undo_page_checkpoints(self, hash_id: str, page_numbers: list[int], missing_digests: set[str]) -> None:
+        """
+        Drop the checkpoints of pages whose page blobs could not be uploaded, and the rows of those page blobs
+        no other document references, so the next checkpoint of the page uploads it again.
+        """
+        async with self.db.transaction() as session:
+            await self._release_document_pages(session, [hash_id], page_numbers=page_numbers)
+            await session.execute(delete(PageBlob).where(PageBlob.digest.in_(missing_digests), PageBlob.ref_count <= 0))
+
+    async def release_document_pages(self, hash_ids: list[str]) -> int:
+        """
+        Drop the page references of documents.
+
+        Page blobs whose reference count drops to zero are marked as released; they are deleted
+        later by purge_released_page_blobs once no document has picked them up again.
+
+        Args:
+            hash_ids (List[str]): The hash IDs of the PDF documents.
+
+        Returns:
+            int: Number of released page references.
+        """
+        async with self.db.transaction() as session:
+            return await self._release_document_pages(session, hash_ids)
+
+    @staticmethod
+    async def _release_document_pages(
+        session: AsyncSession, hash_ids: list[str], *, page_numbers: list[int] | None = None
+    ) -> int:
+        condition = DocumentPage.hash_id.in_(hash_ids)
+        if page_numbers is not None:
+            condition &= DocumentPage.page_number.in_(page_numbers)
+        released = (delete(DocumentPage).where(condition).returning(DocumentPage.digest)).cte("released")
+        references = (
+            select(released.c.digest, func.count().label("released_count"))
+            .group_by(released.c.digest)
+            .cte("page_references")
+        )
+        new_ref_count = PageBlob.ref_count - references.c.released_count
+        result = await session.execute(
+            update(PageBlob)
+            .where(PageBlob.digest == references.c.digest)
+            .values(
+                ref_count=new_ref_count,
+                released_at=case((new_ref_count <= 0, func.now()), else_=PageBlob.released_at),
+            )
+            .returning(references.c.released_count)
+            # The ORM cannot match rows of a multi-table update to loaded objects; none are loaded here anyway.
+            .execution_options(synchronize_session=False)
+        )
+        return sum(result.scalars().all())
+
+    async def purge_released_page_blobs(self, grace_seconds: int, limit: int) -> int:
+        """
+        Delete page blobs that have not been referenced by any document for grace_seconds.
+
+        The rows stay locked until their blobs are deleted, so a document referencing one of
+        these pages concurrently waits and then uploads the page again. The transaction is not
+        taken under the primary session lock, so other sessions are not held up by the blob I/O.
+        A row is only deleted once its blob is; the page blobs that could not be deleted stay
+        released and are purged by a later call.
+
+        Args:
+            grace_seconds (int): Minimum time since the last reference was released.
+            limit (int): Maximum number of page blobs deleted in this call.
+
+        Returns:
+            int: Number of deleted page blobs.
+        """
+        released_before = func.now() - timedelta(seconds=grace_seconds)
+        async with self.db.unlocked_transaction() as session:
+            result = await session.execute(
+                select(PageBlob.digest, PageBlob.blob_name)
+                .where(PageBlob.ref_count <= 0, PageBlob.released_at < released_before)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            page_blobs = result.all()
+            results = await asyncio.gather(
+                *(self.blob_storage.delete_file(page_blob.blob_name) for page_blob in page_blobs),
+                return_exceptions=True,
+            )
+            deleted_digests = []
+            for page_blob, delete_result in zip(page_blobs, results, strict=True):
+                if isinstance(delete_result, Exception):
+                    logger.warning("Could not delete page blob %s: %s", page_blob.blob_name, delete_result)
+                else:
+                    deleted_digests.append(page_blob.digest)
+            if deleted_digests:
+                await session.execute(delete(PageBlob).where(PageBlob.digest.in_(deleted_digests)))
+        if deleted_digests:
+            logger.info("Purged %s unreferenced page blobs.", len(deleted_digests))
+        return len(deleted_digests)
+
+    async def touch_documents(self, idle_seconds: dict[str, float]) -> None:
+        """
+        Persist document access times collected in memory with a single bulk update.
+
+        Args:
+            idle_seconds (Dict[str, float]): Seconds elapsed since the last access of each document.
+        """
+        if not idle_seconds:
+            return
+        table = PdfDocument.__table__
+        accessed_at = func.now() - bindparam("idle", type_=Interval)
+        statement = (
+            table.update()
+            .where(table.c.hash_id == bindparam("accessed_hash_id"), table.c.last_accessed_at < accessed_at)
+            .values(last_accessed_at=accessed_at)
+        )
+        async with self.db.transaction() as session:
+            connection = await session.connection()
+            await connection.execute(
+                statement,
+                [
+                    {"accessed_hash_id": hash_id, "idle": timedelta(seconds=idle)}
+                    for hash_id, idle in idle_seconds.items()
+                ],
+            )
+
+    async def get_expired_document_hashes(self, idle_seconds: int, limit: int) -> list[str]:
+        """
+        Retrieve documents that have not been accessed for idle_seconds, least recently used first.
+
+        Args:
+            idle_seconds (int): Time to live since the last access.
+            limit (int): Maximum number of documents returned.
+
+        Returns:
+            List[str]: The hash IDs of the expired documents.
+        """
+        async with self.db.get_session() as session:
+            result = await session.execute(
+                select(PdfDocument.hash_id)
+                .where(PdfDocument.last_accessed_at < func.now() - timedelta(seconds=idle_seconds))
+                .order_by(PdfDocument.last_accessed_at)
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+
+    async def get_documents_over_budget(self, max_total_bytes: int, limit: int) -> list[str]:
+        """
+        Retrieve the least recently used documents to evict to bring the total size within budget.
+
+        Args:
+            max_total_bytes (int): Budget for the total size of the converted documents.
+            limit (int): Maximum number of documents returned.
+
+        Returns:
+            List[str]: The hash IDs of the documents to evict.
+        """
+        size = func.coalesce(PdfDocument.size_bytes, 0)
+        async with self.db.get_session() as session:
+            total_bytes = (await session.execute(select(func.coalesce(func.sum(size), 0)))).scalar_one()
+            excess_bytes = total_bytes - max_total_bytes
+            if excess_bytes <= 0:
+                return []
+            lru = select(
+                PdfDocument.hash_id,
+                size.label("size_bytes"),
+                func.sum(size).over(order_by=(PdfDocument.last_accessed_at, PdfDocument.hash_id)).label("freed_bytes"),
+            ).subquery()
+            result = await session.execute(
+                select(lru.c.hash_id)
+                .where(lru.c.freed_bytes - lru.c.size_bytes < excess_bytes)
+                .order_by(lru.c.freed_bytes)
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+
+    async def get_abandoned_conversion_hashes(self, idle_seconds: int, limit: int) -> list[str]:
+        """
+        Retrieve unfinished conversions without progress for idle_seconds and without a document.
+
+        Args:
+            idle_seconds (int): Time without progress after which a conversion is abandoned.
+            limit (int): Maximum number of conversions returned.
+
+        Returns:
+            List[str]: The hash IDs of the abandoned conversions.
+        """
+        async with self.db.get_session() as session:
+            result = await session.execute(
+                select(ConversionTask.hash_id)
+                .where(
+                    ConversionTask.status != "completed",
+                    ConversionTask.updated_at < func.now() - timedelta(seconds=idle_seconds),
+                    ~select(PdfDocument.hash_id).where(PdfDocument.hash_id == ConversionTask.hash_id).exists(),
+                )
+                .order_by(ConversionTask.updated_at)
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+
+    async def delete_documents(self, hash_ids: list[str]) -> int:
+        """
+        Delete documents, their conversion records, shards and page references, then their manifests
+        and the source PDFs of unfinished sharded conversions.
+
+        Rows are deleted first so a document is never served after its manifest is gone; shared
+        page blobs are only released here and purged by purge_released_page_blobs.
+
+        Args:
+            hash_ids (List[str]): The hash IDs of the documents to delete.
+
+        Returns:
+            int: Number of deleted documents.
+        """
+        if not hash_ids:
+            return 0
+        self._pin_to_primary(hash_ids)
+        async with self.db.transaction() as session:
+            result = await session.execute(
+                delete(PdfDocument)
+                .where(PdfDocument.hash_id.in_(hash_ids))
+                .returning(PdfDocument.hash_id, PdfDocument.storage_format)
+            )
+            deleted_documents = list(result.all())
+            await self._release_document_pages(session, hash_ids)
+            result = await session.execute(
+                select(ConversionShard.hash_id).where(ConversionShard.hash_id.in_(hash_ids)).distinct()
+            )
+            sharded_hashes = list(result.scalars().all())
+            await session.execute(delete(ConversionTask).where(ConversionTask.hash_id.in_(hash_ids)))
+        await asyncio.gather(
+            *(
+                self.blob_storage.delete_file(self.document_blob_name(hash_id, storage_format))
+                for hash_id, storage_format in deleted_documents
+            ),
+            *(self.blob_storage.delete_file(self.source_blob_name(hash_id)) for hash_id in sharded_hashes),
+        )
+        for hash_id, storage_format in deleted_documents:
+            self._container_indexes.pop(self.document_blob_name(hash_id, storage_format), None)
+            self._legacy_pages.pop(hash_id, None)
+        logger.info("Deleted %s documents.", len(deleted_documents))
+        return len(deleted_documents)
+
+    @staticmethod
+    def _page_blob_name(page: RenderedPage) -> str:
+        return f"pages/{page.digest}.{page.image_format.lower()}"
+
+    async def _upload_page_blobs(self, pages: list[RenderedPage]) -> None:
+        await asyncio.gather(
+            *(
+                self.blob_storage.upload_file(
+                    page.image_bytes, self._page_blob_name(page), content_type=f"image/{page.image_format.lower()}"
+                )
+                for page in pages
+            )
+        )
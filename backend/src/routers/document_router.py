@@ -0,0 +1,154 @@
+import logging
+
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
+from src.dependencies import get_pdf_service
+from src.services.pdf_service import PdfService
+from src.services.pdf_service import is_sha256_hex
+from src.utils.zip_stream import parse_byte_range
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/documents", tags=["Documents"])
+
+
+@router.api_route("/by-hash/{sha256}", methods=["GET", "HEAD"], response_class=JSONResponse)
+async def get_document_by_hash(
+    request: Request, sha256: str, pdf_service: PdfService = Depends(get_pdf_service)
+) -> Response:
+    """
+    Look up a document by the SHA-256 hash of its PDF, so clients can skip uploading known documents.
+
+    A HEAD request answers with the status code and the X-Document-Status and X-Page-Count
+    headers only. The lookup is read-only: it does not count as a poll of a pending conversion.
+
+    Args:
+        request (Request): The FastAPI request object.
+        sha256 (str): The hex SHA-256 hash of the PDF file.
+
+    Returns:
+        Response: 200 with the state and page count of the document, or 404 if it is unknown.
+    """
+    try:
+        hash_id = sha256.lower()
+        if not is_sha256_hex(hash_id):
+            raise HTTPException(status_code=400, detail="Expected a hex SHA-256 digest")
+
+        status_response = await pdf_service.get_task_status(hash_id, touch=False)
+        exists = status_response.status != "not_found"
+        status_code = 200 if exists else 404
+        headers = {"X-Document-Status": status_response.status, "Cache-Control": "no-cache"}
+        if status_response.page_count is not None:
+            headers["X-Page-Count"] = str(status_response.page_count)
+
+        if request.method == "HEAD":
+            return Response(status_code=status_code, headers=headers)
+        return JSONResponse(
+            content={
+                "hash_id": hash_id,
+                "exists": exists,
+                "status": status_response.status,
+                "page_count": status_response.page_count,
+            },
+            status_code=status_code,
+            headers=headers,
+        )
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+    except Exception as e:
+        logger.error("Error looking up document %s: %s", sha256, str(e))
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@router.get("/{hash_id}/pages/{page_number}", response_class=Response)
+async def get_page(
+    request: Request, hash_id: str, page_number: int, pdf_service: PdfService = Depends(get_pdf_service)
+) -> Response:
+    """
+    Retrieve the image of a single page of a converted document.
+
+    The ETag includes a digest of the page image, which changes with the encoder and DPI the page
+    was rendered with, so a cached page is only reused while the stored image is the same.
+
+    Args:
+        request (Request): The FastAPI request object.
+        hash_id (str): The SHA-256 hash of the PDF document.
+        page_number (int): The page number, starting at 1.
+
+    Returns:
+        Response: The encoded page image.
+    """
+    try:
+        page_image = await pdf_service.get_page_image(hash_id, page_number)
+        if page_image is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        image, media_type, digest = page_image
+        etag = f'"{hash_id}-{page_number}-{digest[:16]}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=86400, immutable"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=image, media_type=media_type, headers=headers)
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+    except Exception as e:
+        logger.error("Error retrieving page %s of %s: %s", page_number, hash_id, str(e))
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@router.get("/{hash_id}/archive.zip", response_class=StreamingResponse)
+async def get_archive(request: Request, hash_id: str, pdf_service: PdfService = Depends(get_pdf_service)) -> Response:
+    """
+    Download all page images of a converted document as a ZIP archive.
+
+    The archive is streamed as it is built. Its ETag is the document hash and a fingerprint of
+    the archive layout, which changes with the page images (and so with the encoder and DPI they
+    were rendered with); interrupted downloads can be resumed with a Range (and If-Range) request.
+
+    Args:
+        request (Request): The FastAPI request object.
+        hash_id (str): The SHA-256 hash of the PDF document.
+
+    Returns:
+        Response: The ZIP archive, or the requested byte range of it.
+    """
+    try:
+        archive = await pdf_service.get_document_archive(hash_id)
+        if archive is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        etag = f'"{hash_id}-{archive.fingerprint[:16]}"'
+        headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "public, max-age=86400, immutable",
+            "Content-Disposition": f'attachment; filename="{hash_id}.zip"',
+        }
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+
+        start, end, status_code = 0, archive.total_size - 1, 200
+        range_header = request.headers.get("range")
+        if range_header and request.headers.get("if-range", etag) == etag:
+            try:
+                byte_range = parse_byte_range(range_header, archive.total_size)
+            except ValueError:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{archive.total_size}"})
+            if byte_range is not None:
+                start, end = byte_range
+                status_code = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{archive.total_size}"
+        headers["Content-Length"] = str(end - start + 1)
+
+        return StreamingResponse(
+            archive.stream(start, end), status_code=status_code, media_type="application/zip", headers=headers
+        )
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+    except Exception as e:
+        logger.error("Error building archive of %s: %s", hash_id, str(e))
+        return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from collections.abc import Awaitable
+
+from fastapi import APIRouter
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from src.config import Settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Health"])
+
+
+async def _check(probe: Awaitable[None] | None) -> str:
+    if probe is None:
+        return "not initialized"
+    try:
+        await asyncio.wait_for(probe, Settings.READINESS_TIMEOUT_SECONDS)
+        return "ok"
+    except TimeoutError:
+        return "timeout"
+    except Exception as e:
+        return f"error: {e}"
+
+
+@router.get("/livez", response_class=JSONResponse)
+async def livez() -> JSONResponse:
+    """
+    Liveness probe: the process is up and its event loop is responsive.
+
+    Returns:
+        JSONResponse: Always {"status": "ok"}; a probe that times out means the process is stuck.
+    """
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+
+@router.get("/readyz", response_class=JSONResponse)
+async def readyz(request: Request) -> JSONResponse:
+    """
+    Readiness probe: the database, blob storage and render workers can all serve requests.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        JSONResponse: The result of every check, with status 200 if all passed and 503 otherwise.
+    """
+    db = getattr(request.app.state, "db", None)
+    blob_storage = getattr(request.app.state, "blob_storage", None)
+    render_pool = getattr(request.app.state, "render_pool", None)
+
+    database_check, storage_check = await asyncio.gather(
+        _check(db.ping() if db is not None else None),
+        _check(blob_storage.check_health() if blob_storage is not None else None),
+    )
+    checks = {
+        "database": database_check,
+        "storage": storage_check,
+        "render_pool": "ok" if render_pool is not None and render_pool.is_ready else "not ready",
+    }
+    ready = all(result == "ok" for result in checks.values())
+    if not ready:
+        logger.warning("Readiness check failed: %s", checks)
+    return JSONResponse(
+        content={"status": "ready" if ready else "not_ready", "checks": checks}, status_code=200 if ready else 503
+    )
+
+
+@router.get("/metrics", response_class=JSONResponse)
+async def metrics(request: Request) -> JSONResponse:
+    """
+    Counters, gauges and summaries of this process, such as the render batch sizes chosen so far.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        JSONResponse: The metrics snapshot; empty before the application has started.
+    """
+    registry = getattr(request.app.state, "metrics", None)
+    content = registry.snapshot() if registry is not None else {"counters": {}, "gauges": {}, "summaries": {}}
+    return JSONResponse(content=content, status_code=200)
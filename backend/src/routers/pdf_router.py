@@ -9,7 +9,10 @@ from fastapi import Request
 from fastapi import UploadFile
 from fastapi.responses import JSONResponse
 from src.dependencies import get_pdf_service
+from src.models.pydantic.response_model import PdfResponse
 from src.services.pdf_service import PdfService
+from src.services.pdf_service import is_sha256_hex
+from src.utils.tracing import set_attribute
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +42,78 @@ async def health_check(request: Request) -> JSONResponse:
     return JSONResponse(content={"status": "ok"}, status_code=200)
 
 
+async def _read_pdf(
+    request: Request, file: UploadFile, pdf_service: PdfService
+) -> tuple[bytes | None, str, PdfResponse]:
+    """
+    Hash the uploaded PDF and look it up in the cache.
+
+    A client that sends the hash of its upload in X-Content-SHA256 gets the cached document
+    without the upload being read and hashed; otherwise the claimed hash is checked against
+    the content.
+
+    Returns:
+        Tuple[Optional[bytes], str, PdfResponse]: The file content (None if it was not read),
+        its hash and the cache information of the document.
+    """
+    claimed_hash = request.headers.get("x-content-sha256")
+    if claimed_hash is not None:
+        claimed_hash = claimed_hash.strip().lower()
+        if not is_sha256_hex(claimed_hash):
+            raise HTTPException(status_code=400, detail="X-Content-SHA256 must be a hex SHA-256 digest")
+        set_attribute("task_id", claimed_hash)
+        pdf_cache_information = await pdf_service.already_exists_by_hash(claimed_hash)
+        if pdf_cache_information.found:
+            return None, claimed_hash, pdf_cache_information
+
+    contents, file_hash = await pdf_service.read_upload(file)
+    set_attribute("task_id", file_hash)
+    if claimed_hash is None:
+        return contents, file_hash, await pdf_service.already_exists_by_hash(file_hash)
+    if claimed_hash != file_hash:
+        raise HTTPException(status_code=400, detail="X-Content-SHA256 does not match the uploaded file")
+    return contents, file_hash, pdf_cache_information
+
+
+async def _convert_pdf(
+    request: Request, background_tasks: BackgroundTasks, pdf_service: PdfService, contents: bytes, file_hash: str
+) -> JSONResponse:
+    """
+    Convert a small document while the client waits, or start a background conversion of the others.
+    """
+    inline_status = await pdf_service.convert_inline(contents, file_hash)
+    if inline_status is None:
+        background_tasks.add_task(pdf_service.process_pdf_conversion, contents, file_hash)
+    elif inline_status.status == "completed":
+        return JSONResponse(
+            content={
+                "message": "PDF converted",
+                "status": "completed",
+                "hash_id": inline_status.hash_id,
+                "page_count": inline_status.page_count,
+                "pages": [
+                    request.app.url_path_for("get_page", hash_id=inline_status.hash_id, page_number=page_number)
+                    for page_number in range(1, (inline_status.page_count or 0) + 1)
+                ],
+            },
+            status_code=200,
+        )
+    elif inline_status.status == "failed":
+        return JSONResponse(
+            content={"message": inline_status.message, "status": "failed", "hash_id": inline_status.hash_id},
+            status_code=200,
+        )
+
+    return JSONResponse(
+        content={
+            "message": "PDF conversion started in background",
+            "status": "processing",
+            "hash_id": file_hash,
+        },
+        status_code=200,
+    )
+
+
 @router.post("/convert-pdf-to-image/", response_class=JSONResponse)
 async def post_pdf(
     request: Request,
@@ -50,7 +125,13 @@ async def post_pdf(
     Convert a PDF file to image(s).
 
     This endpoint accepts a PDF file upload, checks if it already exists in the cache,
-    and either returns cached information or starts a background conversion task.
+    and either returns cached information, converts a small document right away
+    (INLINE_MAX_PAGES, INLINE_TIMEOUT_SECONDS) or starts a background conversion task.
+    The multipart body is received in full before the endpoint runs, so an optional
+    X-Content-SHA256 header with the client's hash of the file only saves reading and
+    hashing a cached upload, not transferring it; clients skip the upload of known
+    documents with the /documents/by-hash/{sha256} lookup. The claimed hash is verified
+    against the upload when it is read.
 
     Parameters:
     ----------
@@ -68,12 +149,16 @@ async def post_pdf(
     JSONResponse
         A JSON response with status information:
         - For already existing files: message, status="already_exists", and filename
-        - For new files: message, status="processing", and hash_id
+        - For small files converted inline: message, status="completed", hash_id, page_count
+          and the URL path of every page
+        - For small files whose conversion failed: message, status="failed", and hash_id
+        - For other new files: message, status="processing", and hash_id
 
     Raises:
     ------
     HTTPException
         - 400 if the uploaded file is not a PDF
+        - 400 if X-Content-SHA256 is malformed or does not match the uploaded file
         - Status code from any other caught HTTPException
     Exception
         - 500 for any other unexpected errors
@@ -82,10 +167,7 @@ async def post_pdf(
         if not file.content_type == "application/pdf":
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
-        contents = await file.read()
-
-        pdf_cache_information = await pdf_service.already_exists(contents)
-
+        contents, file_hash, pdf_cache_information = await _read_pdf(request, file, pdf_service)
         if pdf_cache_information.found:
             return JSONResponse(
                 content={
@@ -96,16 +178,7 @@ async def post_pdf(
                 status_code=200,
             )
 
-        background_tasks.add_task(pdf_service.process_pdf_conversion, contents)
-
-        return JSONResponse(
-            content={
-                "message": "PDF conversion started in background",
-                "status": "processing",
-                "hash_id": pdf_cache_information.hash_id,
-            },
-            status_code=200,
-        )
+        return await _convert_pdf(request, background_tasks, pdf_service, contents, file_hash)
     except HTTPException as e:
         return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
     except Exception as e:
@@ -135,6 +208,25 @@ async def get_task_status(
                     "message": "Task completed",
                     "status": status_response.status,
                     "hash_id": status_response.hash_id,
+                    "page_count": status_response.page_count,
+                },
+                status_code=200,
+            )
+        if status_response.status == "pending":
+            return JSONResponse(
+                content={
+                    "message": status_response.message,
+                    "status": status_response.status,
+                    "hash_id": status_response.hash_id,
+                },
+                status_code=202,
+            )
+        if status_response.status in ("failed", "cancelled"):
+            return JSONResponse(
+                content={
+                    "message": status_response.message,
+                    "status": status_response.status,
+                    "hash_id": status_response.hash_id,
                 },
                 status_code=200,
             )
@@ -152,3 +244,42 @@ async def get_task_status(
     except Exception as e:
         logger.error("Error checking task status: %s", str(e))
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@router.delete("/task/{task_id}", response_class=JSONResponse)
+async def cancel_task(
+    request: Request, task_id: str, pdf_service: PdfService = Depends(get_pdf_service)
+) -> JSONResponse:
+    """
+    Endpoint for a client to give up waiting for a PDF conversion.
+
+    The conversion stops after its current batch once no client waits for it anymore. The
+    pages converted so far are kept, so submitting the document again resumes it.
+
+    Args:
+        request (Request): The FastAPI request object.
+        task_id (str): The ID of the task to cancel.
+
+    Returns:
+        JSONResponse: 200 once cancelled, 202 while other clients still wait for the conversion,
+        404 for an unknown task and 409 for a conversion that already finished.
+    """
+    try:
+        status_response = await pdf_service.cancel_task(task_id)
+        if status_response.status == "not_found":
+            raise HTTPException(status_code=404, detail="Task not found")
+        if status_response.status in ("completed", "failed"):
+            raise HTTPException(status_code=409, detail=f"Task already {status_response.status}")
+        return JSONResponse(
+            content={
+                "message": status_response.message,
+                "status": status_response.status,
+                "hash_id": status_response.hash_id,
+            },
+            status_code=200 if status_response.status == "cancelled" else 202,
+        )
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+    except Exception as e:
+        logger.error("Error cancelling task: %s", str(e))
+        return JSONResponse(content={"error": str(e)}, status_code=500)
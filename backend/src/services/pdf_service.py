@@ -1,16 +1,59 @@
 import asyncio
 import hashlib
+import logging
+import zlib
+from collections.abc import Awaitable
+from collections.abc import Callable
 
+from fastapi import UploadFile
+from opentelemetry.trace import StatusCode
+from src.config import Settings
+from src.models.db.conversion_shard import ConversionShard
+from src.models.db.pdf_document import PdfDocument
 from src.models.pydantic.response_model import PdfBlobResponse
 from src.models.pydantic.response_model import PdfResponse
 from src.models.pydantic.response_model import StatusResponse
 from src.repositories.pdf_repository import PdfRepository
+from src.utils.access_tracker import AccessTracker
+from src.utils.batch_sizer import AdaptiveBatchSizer
+from src.utils.batch_sizer import iter_adaptive_page_ranges
+from src.utils.convert_pdf_to_image import RenderStats
+from src.utils.convert_pdf_to_image import check_render_budget
 from src.utils.convert_pdf_to_image import convert_pdf_to_images
+from src.utils.convert_pdf_to_image import get_page_count
+from src.utils.convert_pdf_to_image import iter_page_ranges
+from src.utils.convert_pdf_to_image import render_pages_measured
+from src.utils.metrics import MetricsRegistry
+from src.utils.render_pool import RenderWorkerPool
+from src.utils.tracing import current_traceparent
+from src.utils.tracing import start_span
+from src.utils.zip_stream import ZipMember
+from src.utils.zip_stream import ZipStream
+
+logger = logging.getLogger(__name__)
+
+SHA256_HEX_LENGTH = 64
+
+
+def is_sha256_hex(value: str) -> bool:
+    """Whether value is a lowercase hex SHA-256 digest, the form used as document id."""
+    return len(value) == SHA256_HEX_LENGTH and all(char in "0123456789abcdef" for char in value)
 
 
 class PdfService:
-    def __init__(self, repository: PdfRepository) -> None:
+    def __init__(
+        self,
+        repository: PdfRepository,
+        access_tracker: AccessTracker | None = None,
+        render_pool: RenderWorkerPool | None = None,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
         self.pdf_repository = repository
+        self.access_tracker = access_tracker or AccessTracker()
+        self.render_pool = render_pool or RenderWorkerPool()
+        self.metrics = metrics or MetricsRegistry()
+        # Inline conversions that ran over their time budget, referenced until they finish.
+        self._background_conversions: set[asyncio.Future] = set()
 
     async def convert_pdf_to_image(self, file: bytes) -> list[dict[str, str]]:
         """
@@ -23,7 +66,7 @@ class PdfService:
             List[Dict[str, str]]: A list of dictionaries containing base64-encoded images
                                 and metadata for each page of the PDF.
         """
-        return await asyncio.to_thread(convert_pdf_to_images, file)
+        return await self.render_pool.run(convert_pdf_to_images, file)
 
     async def get_file_hash(self, file_content: bytes) -> str:
         """Generate SHA-256 hash from file content"""
@@ -52,41 +95,442 @@ class PdfService:
             PdfResponse: The PDF response object containing metadata.
         """
         file_hash = await self.get_file_hash(file_content)
-        return await self.pdf_repository.get_pdf_blob_storage_url_by_hash(file_hash)
+        return await self.already_exists_by_hash(file_hash)
 
-    async def save_pdf_hash(self, pdf_blob_response: PdfBlobResponse) -> None:
+    async def already_exists_by_hash(self, file_hash: str) -> PdfResponse:
+        """
+        Check if a file with the given SHA-256 hash already exists in the database.
+
+        Args:
+            file_hash (str): The hex SHA-256 hash of the PDF file.
+
+        Returns:
+            PdfResponse: The PDF response object containing metadata.
+        """
+        pdf_response = await self.pdf_repository.get_pdf_blob_storage_url_by_hash(file_hash)
+        if pdf_response.found:
+            self.access_tracker.touch(file_hash)
+        return pdf_response
+
+    async def read_upload(self, file: UploadFile) -> tuple[bytes, str]:
+        """
+        Read an uploaded file in chunks, hashing it as it is read.
+
+        The request body has already been received and spooled by the framework; this only
+        avoids hashing the file in a second pass.
+
+        Args:
+            file (UploadFile): The uploaded file.
+
+        Returns:
+            Tuple[bytes, str]: The file content and its hex SHA-256 hash.
+        """
+        digest = hashlib.sha256()
+        chunks = []
+        while chunk := await file.read(Settings.UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            chunks.append(chunk)
+        return b"".join(chunks), digest.hexdigest()
+
+    async def save_pdf_hash(
+        self, pdf_blob_response: PdfBlobResponse, page_count: int | None = None, size_bytes: int | None = None
+    ) -> None:
         """
         Save the PDF document hash and metadata to the database.
 
         Args:
             pdf_response (PdfResponse): The PDF response object containing metadata.
+            page_count (int | None): Number of converted pages in the document.
+            size_bytes (int | None): Total size of the converted page images.
 
         Returns:
             PdfBlobResponse: The saved PDF document object.
         """
-        await self.pdf_repository.save_pdf_document_hash(pdf_blob_response)
+        await self.pdf_repository.save_pdf_document_hash(pdf_blob_response, page_count, size_bytes)
 
-    async def process_pdf_conversion(self, file: bytes) -> None:
+    async def convert_inline(self, file: bytes, file_hash: str) -> StatusResponse | None:
+        """
+        Convert a small document while the client waits, instead of making it poll for the result.
+
+        Only documents of at most INLINE_MAX_PAGES pages are converted inline. A conversion that
+        takes longer than INLINE_TIMEOUT_SECONDS is not interrupted: it continues in the background
+        like any other and the caller gets its pending status. A document whose pages cannot be
+        counted is converted inline too, so its failure is recorded and returned.
+
+        Args:
+            file (bytes): The content of the PDF file.
+            file_hash (str): The SHA-256 hash of the content.
+
+        Returns:
+            Optional[StatusResponse]: The status of the conversion, or None if the document is too
+            large to be converted inline.
+        """
+        if Settings.INLINE_MAX_PAGES <= 0:
+            return None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + Settings.INLINE_TIMEOUT_SECONDS
+        page_count = None
+        try:
+            page_count = await self.render_pool.run(get_page_count, file)
+        except Exception as e:
+            # Converting an unreadable document records why it failed, so the client gets a failed status.
+            logger.warning("Could not count the pages of %s: %s", file_hash, str(e))
+        if page_count is not None and page_count > Settings.INLINE_MAX_PAGES:
+            return None
+
+        # The conversion task copies the current context, so its spans continue the request's trace.
+        conversion = asyncio.ensure_future(self.process_pdf_conversion(file, file_hash, page_count=page_count))
+        try:
+            await asyncio.wait_for(asyncio.shield(conversion), max(deadline - loop.time(), 0))
+        except TimeoutError:
+            logger.info("Inline conversion of %s exceeded its time budget, continuing in the background.", file_hash)
+            self._background_conversions.add(conversion)
+            conversion.add_done_callback(self._background_conversions.discard)
+        return await self.get_task_status(file_hash)
+
+    async def process_pdf_conversion(
+        self, file: bytes, file_hash: str | None = None, *, page_count: int | None = None
+    ) -> None:
         """
         Process the PDF conversion in the background.
+
+        Converted pages are checkpointed batch by batch, so a conversion interrupted by a crash,
+        a redeploy or a cancellation only renders the missing pages when the document is submitted again.
+
+        Args:
+            file (bytes): The content of the PDF file.
+            file_hash (str | None): The SHA-256 hash of the content, if it is already known.
+            page_count (int | None): The number of pages of the document, if it was already counted.
         """
         pdf_content = file
-        cache_entry = await self.check_cache(pdf_content)
-        converted_images = await self.convert_pdf_to_image(pdf_content)
-        pdf_blob_response = await self.pdf_repository.save_image_to_blob_storage(converted_images, cache_entry.hash_id)
-        await self.save_pdf_hash(pdf_blob_response)
+        file_hash = file_hash or await self.get_file_hash(pdf_content)
+        with start_span("conversion", task_id=file_hash, bytes=len(pdf_content)) as span:
+            if not await self.pdf_repository.claim_conversion_task(file_hash, Settings.CONVERSION_STALE_SECONDS):
+                logger.info("Conversion of %s is already in progress, skipping.", file_hash)
+                span.set_attribute("outcome", "in_progress")
+                await self.pdf_repository.add_conversion_waiter(file_hash)
+                return
+
+            try:
+                # Documents with a page that cannot be rendered within the pixel budget fail before any rendering.
+                num_pages = await self.render_pool.run(check_render_budget, pdf_content, page_count)
+                span.set_attribute("pages", num_pages)
+                await self.pdf_repository.update_conversion_task(file_hash, total_pages=num_pages)
+                missing_pages = await self._get_missing_pages(file_hash, range(1, num_pages + 1))
+                if Settings.SHARD_PAGES > 0 and num_pages >= Settings.SHARD_MIN_PAGES:
+                    span.set_attribute("outcome", "sharded")
+                    await self._queue_conversion_shards(file_hash, pdf_content, missing_pages)
+                    return
+                if await self._render_missing_pages(file_hash, pdf_content, missing_pages):
+                    span.set_attribute("outcome", "completed")
+                    await self._finalize_conversion(file_hash)
+                else:
+                    span.set_attribute("outcome", "cancelled")
+            except Exception as e:
+                logger.error("Conversion of %s failed: %s", file_hash, str(e))
+                span.set_attribute("outcome", "failed")
+                span.set_status(StatusCode.ERROR, str(e))
+                await self.pdf_repository.update_conversion_task(file_hash, status="failed", message=str(e)[:2000])
+
+    async def _get_missing_pages(self, file_hash: str, pages: range) -> list[int]:
+        """
+        The pages of the given range that have no checkpoint yet.
+        """
+        checkpointed = {page.page_number for page in await self.pdf_repository.get_document_pages(file_hash)}
+        missing_pages = [page for page in pages if page not in checkpointed]
+        if len(missing_pages) < len(pages):
+            logger.info(
+                "Resuming conversion of %s pages %s-%s: %s of %s pages already converted.",
+                file_hash,
+                pages.start,
+                pages.stop - 1,
+                len(pages) - len(missing_pages),
+                len(pages),
+            )
+        return missing_pages
+
+    async def _is_cancelled(self, file_hash: str) -> bool:
+        """
+        Whether the conversion was cancelled or abandoned by its clients (checked between batches).
+        """
+        if await self.pdf_repository.is_conversion_cancelled(file_hash, Settings.CONVERSION_ABANDON_SECONDS):
+            logger.info("Conversion of %s was cancelled, keeping the pages converted so far.", file_hash)
+            return True
+        return False
+
+    async def _render_missing_pages(
+        self,
+        file_hash: str,
+        pdf_content: bytes,
+        missing_pages: list[int],
+        after_batch: Callable[[], Awaitable[None]] | None = None,
+    ) -> bool:
+        """
+        Render the pages that have no checkpoint yet, one batch at a time.
+
+        Batches start at PDF_BATCH_SIZE pages and are resized after every batch from its measured
+        render time and memory (see AdaptiveBatchSizer).
+
+        Returns:
+            bool: False if the conversion was cancelled before all pages were rendered.
+        """
+        sizer = AdaptiveBatchSizer()
+        for first_page, last_page in iter_adaptive_page_ranges(missing_pages, sizer):
+            if await self._is_cancelled(file_hash):
+                return False
+            with start_span("render.batch", task_id=file_hash, first_page=first_page, last_page=last_page) as span:
+                rendered_pages, stats = await self.render_pool.run(
+                    render_pages_measured, pdf_content, first_page, last_page
+                )
+                await self.pdf_repository.save_page_checkpoints(file_hash, rendered_pages)
+                span.set_attribute("memory_bytes", stats.memory_bytes)
+                self._record_batch(sizer, stats)
+            if after_batch is not None:
+                await after_batch()
+        return True
+
+    def _record_batch(self, sizer: AdaptiveBatchSizer, stats: RenderStats) -> None:
+        batch_size = sizer.record(stats)
+        self.metrics.increment("render_batches_total")
+        self.metrics.increment("render_pages_total", stats.pages)
+        self.metrics.observe("render_batch_pages", stats.pages)
+        self.metrics.observe("render_batch_seconds", stats.seconds)
+        self.metrics.observe("render_batch_memory_bytes", stats.memory_bytes)
+        if stats.pages:
+            self.metrics.observe("render_page_seconds", stats.seconds / stats.pages)
+        self.metrics.set_gauge("render_batch_size", batch_size)
+
+    async def _queue_conversion_shards(self, file_hash: str, pdf_content: bytes, missing_pages: list[int]) -> None:
+        """
+        Split a large document into page-range shards rendered by any worker node (see ShardWorker).
+
+        The source PDF is stored in Blob Storage for the workers; the worker finishing the last
+        shard finalizes the conversion.
+        """
+        await self.pdf_repository.save_source_pdf(file_hash, pdf_content)
+        page_ranges = iter_page_ranges(missing_pages, Settings.SHARD_PAGES)
+        unfinished = await self.pdf_repository.create_conversion_shards(
+            file_hash, page_ranges, traceparent=current_traceparent()
+        )
+        logger.info("Conversion of %s queued as %s shards.", file_hash, unfinished)
+        if unfinished == 0:
+            await self._finalize_sharded_conversion(file_hash)
+
+    async def run_conversion_shard(self, shard: ConversionShard, pdf_content: bytes) -> None:
+        """
+        Render the missing pages of a claimed shard and finalize the conversion if it was the last one.
+
+        Args:
+            shard (ConversionShard): The shard claimed by this worker.
+            pdf_content (bytes): The source PDF of the document.
+        """
+        missing_pages = await self._get_missing_pages(shard.hash_id, range(shard.first_page, shard.last_page + 1))
+        completed = await self._render_missing_pages(
+            shard.hash_id,
+            pdf_content,
+            missing_pages,
+            after_batch=lambda: self.pdf_repository.touch_conversion_shard(shard),
+        )
+        if not completed:
+            # Queued again for when the document is resubmitted; the queue skips cancelled conversions.
+            await self.pdf_repository.release_conversion_shard(shard, "Conversion cancelled", count_attempt=False)
+            return
+        if await self.pdf_repository.complete_conversion_shard(shard):
+            await self._finalize_sharded_conversion(shard.hash_id)
+
+    async def fail_conversion_shard(self, shard: ConversionShard, message: str, *, retryable: bool = True) -> None:
+        """
+        Queue a shard whose rendering failed again, or fail the whole conversion after SHARD_MAX_ATTEMPTS.
+
+        Args:
+            shard (ConversionShard): The shard claimed by this worker.
+            message (str): The error message.
+            retryable (bool): False for errors another attempt cannot fix, which fail the conversion at once.
+        """
+        failed = not retryable or shard.attempts >= Settings.SHARD_MAX_ATTEMPTS
+        await self.pdf_repository.release_conversion_shard(shard, message, failed=failed)
+        if failed:
+            await self.pdf_repository.update_conversion_task(
+                shard.hash_id, status="failed", message=f"Pages {shard.first_page}-{shard.last_page}: {message}"[:2000]
+            )
+
+    async def _finalize_sharded_conversion(self, file_hash: str) -> None:
+        try:
+            await self._finalize_conversion(file_hash)
+        except Exception as e:
+            logger.error("Finalizing conversion of %s failed: %s", file_hash, str(e))
+            await self.pdf_repository.update_conversion_task(file_hash, status="failed", message=str(e)[:2000])
+            return
+        await self.pdf_repository.delete_conversion_shards(file_hash)
+
+    async def _finalize_conversion(self, file_hash: str) -> None:
+        """
+        Write the document manifest referencing the page blobs and mark the conversion completed.
+        """
+        with start_span("conversion.finalize", task_id=file_hash, output_format=Settings.OUTPUT_FORMAT):
+            await self._write_document(file_hash)
+
+    async def _write_document(self, file_hash: str) -> None:
+        pages = await self.pdf_repository.get_document_pages(file_hash)
+        size_bytes = sum(page.size_bytes for page in pages)
+        if Settings.OUTPUT_FORMAT == "container":
+            page_images = await self.pdf_repository.get_document_page_images(pages)
+            image_format = pages[0].image_format if pages else "JPEG"
+            pdf_blob_response = await self.pdf_repository.save_page_container(file_hash, page_images, image_format)
+            await self.pdf_repository.save_pdf_document_hash(pdf_blob_response, len(pages), size_bytes, "container")
+            # The container holds its own copy of every page, the shared page blobs are not needed anymore.
+            await self.pdf_repository.release_document_pages([file_hash])
+        else:
+            manifest = [
+                {
+                    "page": page.page_number,
+                    "blob_name": page.blob_name,
+                    "format": page.image_format,
+                    "size": page.size_bytes,
+                }
+                for page in pages
+            ]
+            pdf_blob_response = await self.pdf_repository.save_image_to_blob_storage(manifest, file_hash)
+            await self.save_pdf_hash(pdf_blob_response, len(pages), size_bytes)
+        await self.pdf_repository.update_conversion_task(file_hash, status="completed")
+        logger.info("Conversion of %s completed with %s pages.", file_hash, len(pages))
+
+    async def _get_pdf_document(self, hash_id: str) -> PdfDocument | None:
+        """
+        Look up a converted document on a read replica, then on the primary if the replica does not have it yet.
+        """
+        document = await self.pdf_repository.get_pdf_document(hash_id)
+        if document is None:
+            # The read replica may lag behind a conversion completed by another worker.
+            document = await self.pdf_repository.get_pdf_document(hash_id, primary=True)
+        return document
+
+    async def get_page_image(self, hash_id: str, page_number: int) -> tuple[bytes | memoryview, str, str] | None:
+        """
+        Retrieve the image of one page of a converted document.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+            page_number (int): The page number, starting at 1.
+
+        Returns:
+            Optional[Tuple[bytes, str, str]]: The encoded image, its MIME type and a digest of its
+            content, or None if not found.
+        """
+        document = await self._get_pdf_document(hash_id)
+        if document is None:
+            return None
+        page_image = await self.pdf_repository.get_page_image(document, page_number)
+        if page_image is None:
+            return None
+        self.access_tracker.touch(hash_id)
+        image, image_format, digest = page_image
+        return image, f"image/{image_format.lower()}", digest
+
+    async def get_document_archive(self, hash_id: str) -> ZipStream | None:
+        """
+        Build a streaming ZIP archive of all page images of a converted document.
+
+        The archive layout only depends on the stored pages, so it is byte-identical on every
+        request and byte ranges of it can be resumed.
+
+        Args:
+            hash_id (str): The hash ID of the PDF document.
+
+        Returns:
+            Optional[ZipStream]: The archive, or None if the document does not exist.
+        """
+        document = await self._get_pdf_document(hash_id)
+        if document is None:
+            return None
+        pages = await self.pdf_repository.get_stored_pages(document)
+        computed_crc32s = {}
+        for page in pages:
+            if page.crc32 is None:
+                # Pages checkpointed before CRC-32s were recorded are read once to compute it.
+                page.crc32 = computed_crc32s[page.page_number] = zlib.crc32(
+                    await self.pdf_repository.read_stored_page(page)
+                )
+        if computed_crc32s:
+            await self.pdf_repository.save_page_crc32s(hash_id, computed_crc32s)
+        self.access_tracker.touch(hash_id)
+
+        members = [
+            ZipMember(f"page_{page.page_number}.{page.image_format.lower()}", page.size_bytes, page.crc32)
+            for page in pages
+        ]
+
+        async def read_member(position: int) -> bytes | memoryview:
+            return await self.pdf_repository.read_stored_page(pages[position])
+
+        return ZipStream(members, read_member, document.created_at)
+
+    async def cancel_task(self, task_id: str) -> StatusResponse:
+        """
+        Withdraw the interest of one client in a conversion, cancelling it if no other client waits for it.
+
+        The pages converted so far are kept, so the conversion resumes where it stopped when the
+        document is submitted again.
+
+        Args:
+            task_id (str): The ID of the task.
+
+        Returns:
+            StatusResponse: "cancelled", "pending" if other clients still wait for the conversion,
+            or the status of a conversion that is not running.
+        """
+        conversion_task = await self.pdf_repository.cancel_conversion_task(task_id)
+        if conversion_task is None:
+            return await self.get_task_status(task_id)
+        if conversion_task.status == "cancelled":
+            logger.info("Conversion of %s cancelled by its last client.", task_id)
+            return StatusResponse(status="cancelled", hash_id=task_id, message=conversion_task.message)
+        return StatusResponse(
+            status="pending",
+            hash_id=task_id,
+            message=f"Conversion continues for {conversion_task.waiters} other clients",
+        )
 
-    async def get_task_status(self, task_id: str) -> StatusResponse:
+    async def get_task_status(self, task_id: str, *, touch: bool = True) -> StatusResponse:
         """
         Check the status of a task by its ID.
 
         Args:
             task_id (str): The ID of the task.
+            touch (bool): Record the lookup as an access of the document and as a poll of its
+                conversion. Lookups that do not wait for the result, like the hash preflight,
+                pass False so they do not keep abandoned conversions alive.
 
         Returns:
             StatusResponse: A dictionary containing the status of the task.
         """
         pdf_response = await self.pdf_repository.get_pdf_blob_storage_url_by_hash(task_id)
+        conversion_task = None
+        if not pdf_response.found:
+            conversion_task = await self.pdf_repository.get_conversion_task(task_id)
+            if conversion_task is None or conversion_task.status == "completed":
+                # The read replica may lag behind a task submitted or completed by another worker.
+                pdf_response = await self.pdf_repository.get_pdf_blob_storage_url_by_hash(task_id, primary=True)
+                if not pdf_response.found:
+                    conversion_task = await self.pdf_repository.get_conversion_task(task_id, primary=True)
         if pdf_response.found:
-            return StatusResponse(status="completed", hash_id=pdf_response.hash_id, blob_url=pdf_response.blob_url)
+            if touch:
+                self.access_tracker.touch(task_id)
+            return StatusResponse(
+                status="completed",
+                hash_id=pdf_response.hash_id,
+                blob_url=pdf_response.blob_url,
+                page_count=pdf_response.page_count,
+            )
+        if conversion_task is not None and conversion_task.status in ("failed", "cancelled"):
+            return StatusResponse(status=conversion_task.status, hash_id=task_id, message=conversion_task.message)
+        if conversion_task is not None:
+            if touch:
+                # Polls tell the render loop that a client is still waiting for the result.
+                await self.pdf_repository.touch_conversion_task(task_id)
+            return StatusResponse(
+                status="pending",
+                hash_id=task_id,
+                message=f"{conversion_task.completed_pages} of {conversion_task.total_pages or '?'} pages converted",
+            )
         return StatusResponse(status="not_found", hash_id=task_id, message="Task not found")
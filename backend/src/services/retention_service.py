@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from collections.abc import Awaitable
+from collections.abc import Callable
+
+from src.config import Settings
+from src.repositories.pdf_repository import PdfRepository
+from src.utils.access_tracker import AccessTracker
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock electing the process that sweeps; every server worker of every host tries to take it.
+SWEEP_LOCK_KEY = 7_310_402_119
+
+
+class RetentionService:
+    def __init__(self, repository: PdfRepository, access_tracker: AccessTracker) -> None:
+        self.pdf_repository = repository
+        self.access_tracker = access_tracker
+
+    async def flush_access_times(self) -> None:
+        """
+        Persist the document access times collected since the last flush.
+        """
+        idle_seconds = self.access_tracker.drain()
+        if idle_seconds:
+            await self.pdf_repository.touch_documents(idle_seconds)
+            logger.debug("Flushed access times of %s documents.", len(idle_seconds))
+
+    async def sweep(self) -> dict[str, int]:
+        """
+        Apply the retention policy once.
+
+        Deletes documents idle for longer than RETENTION_TTL_SECONDS, evicts least recently used
+        documents while the total size exceeds RETENTION_MAX_TOTAL_BYTES, drops abandoned
+        conversions and purges page blobs no document references anymore. Every step works in
+        batches of RETENTION_SWEEP_BATCH_SIZE.
+
+        Only one process sweeps at a time; the others only flush their access times and return
+        nothing removed.
+
+        Returns:
+            Dict[str, int]: Number of removed items per step.
+        """
+        await self.flush_access_times()
+        async with self.pdf_repository.db.advisory_lock(SWEEP_LOCK_KEY) as acquired:
+            if not acquired:
+                logger.debug("Retention sweep skipped, another process is sweeping.")
+                return {"expired": 0, "evicted": 0, "abandoned": 0, "page_blobs": 0}
+            return await self._sweep()
+
+    async def _sweep(self) -> dict[str, int]:
+        batch_size = Settings.RETENTION_SWEEP_BATCH_SIZE
+        removed = {"expired": 0, "evicted": 0, "abandoned": 0, "page_blobs": 0}
+
+        if Settings.RETENTION_TTL_SECONDS > 0:
+            removed["expired"] = await self._delete_in_batches(
+                lambda: self.pdf_repository.get_expired_document_hashes(Settings.RETENTION_TTL_SECONDS, batch_size)
+            )
+            removed["abandoned"] = await self._delete_in_batches(
+                lambda: self.pdf_repository.get_abandoned_conversion_hashes(Settings.RETENTION_TTL_SECONDS, batch_size)
+            )
+
+        if Settings.RETENTION_MAX_TOTAL_BYTES > 0:
+            removed["evicted"] = await self._delete_in_batches(
+                lambda: self.pdf_repository.get_documents_over_budget(Settings.RETENTION_MAX_TOTAL_BYTES, batch_size)
+            )
+
+        while True:
+            purged = await self.pdf_repository.purge_released_page_blobs(
+                Settings.RETENTION_PAGE_GRACE_SECONDS, batch_size
+            )
+            removed["page_blobs"] += purged
+            if purged < batch_size:
+                break
+
+        logger.info("Retention sweep finished: %s", removed)
+        return removed
+
+    async def run(self) -> None:
+        """
+        Flush access times and sweep periodically until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        next_sweep = loop.time()
+        while True:
+            try:
+                if loop.time() >= next_sweep:
+                    await self.sweep()
+                    next_sweep = loop.time() + Settings.RETENTION_SWEEP_INTERVAL_SECONDS
+                else:
+                    await self.flush_access_times()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Retention sweep failed: %s", str(e))
+            await asyncio.sleep(min(Settings.ACCESS_FLUSH_INTERVAL_SECONDS, Settings.RETENTION_SWEEP_INTERVAL_SECONDS))
+
+    async def _delete_in_batches(self, select_batch: Callable[[], Awaitable[list[str]]]) -> int:
+        deleted = 0
+        while hash_ids := await select_batch():
+            await self.pdf_repository.delete_documents(hash_ids)
+            deleted += len(hash_ids)
+            if len(hash_ids) < Settings.RETENTION_SWEEP_BATCH_SIZE:
+                break
+        return deleted
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import OrderedDict
+
+from src.config import Settings
+from src.services.pdf_service import PdfService
+from src.utils.convert_pdf_to_image import RenderLimitError
+from src.utils.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+class ShardWorker:
+    """
+    Renders page-range shards of large documents taken from the shared shard queue.
+
+    Every API process and every standalone worker node (``python -m src.worker``) runs one, so the
+    shards of a single document are rendered in parallel on all of them.
+    """
+
+    def __init__(self, pdf_service: PdfService, concurrency: int | None = None) -> None:
+        self.pdf_service = pdf_service
+        self.pdf_repository = pdf_service.pdf_repository
+        # One shard per render worker keeps the local pool busy without hoarding shards.
+        self.concurrency = concurrency or Settings.SHARD_WORKER_CONCURRENCY or pdf_service.render_pool.max_workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._sources: OrderedDict[str, asyncio.Task] = OrderedDict()
+
+    async def _get_source_pdf(self, hash_id: str) -> bytes:
+        """
+        Download the source PDF of a document once for all the shards of it this worker renders.
+        """
+        download = self._sources.get(hash_id)
+        if download is None:
+            download = asyncio.ensure_future(self.pdf_repository.get_source_pdf(hash_id))
+            self._sources[hash_id] = download
+            if len(self._sources) > self.concurrency:
+                self._sources.popitem(last=False)
+        self._sources.move_to_end(hash_id)
+        try:
+            return await asyncio.shield(download)
+        except Exception:
+            self._sources.pop(hash_id, None)
+            raise
+
+    async def run_once(self) -> bool:
+        """
+        Claim and render one shard.
+
+        Returns:
+            bool: False if the queue was empty.
+        """
+        shard = await self.pdf_repository.claim_conversion_shard(self.worker_id, Settings.CONVERSION_STALE_SECONDS)
+        if shard is None:
+            return False
+        logger.info("Rendering pages %s-%s of %s.", shard.first_page, shard.last_page, shard.hash_id)
+        try:
+            with start_span(
+                "shard",
+                traceparent=shard.traceparent,
+                task_id=shard.hash_id,
+                first_page=shard.first_page,
+                last_page=shard.last_page,
+                attempt=shard.attempts,
+                worker_id=self.worker_id,
+            ):
+                pdf_content = await self._get_source_pdf(shard.hash_id)
+                await self.pdf_service.run_conversion_shard(shard, pdf_content)
+        except asyncio.CancelledError:
+            # Hand the shard to another worker right away instead of waiting for it to go stale.
+            await self.pdf_repository.release_conversion_shard(shard, "Worker stopped", count_attempt=False)
+            raise
+        except Exception as e:
+            logger.error(
+                "Rendering pages %s-%s of %s failed: %s", shard.first_page, shard.last_page, shard.hash_id, str(e)
+            )
+            await self.pdf_service.fail_conversion_shard(shard, str(e), retryable=not isinstance(e, RenderLimitError))
+        return True
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                worked = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Shard worker iteration failed: %s", str(e))
+                worked = False
+            if not worked:
+                await asyncio.sleep(Settings.SHARD_POLL_INTERVAL_SECONDS)
+
+    async def run(self) -> None:
+        """
+        Render shards until cancelled, polling the queue when it is empty.
+        """
+        logger.info("Shard worker %s started with concurrency %s.", self.worker_id, self.concurrency)
+        await asyncio.gather(*(self._poll() for _ in range(self.concurrency)))
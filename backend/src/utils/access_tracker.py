@@ -0,0 +1,33 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    """
+    Collects document access times in memory so reads never write to the database.
+
+    The owner periodically calls drain() and persists the result in a single bulk update.
+    """
+
+    def __init__(self) -> None:
+        self._accessed_at: dict[str, float] = {}
+
+    def touch(self, hash_id: str) -> None:
+        """Record that a document has just been read."""
+        self._accessed_at[hash_id] = time.monotonic()
+
+    def drain(self) -> dict[str, float]:
+        """
+        Return and forget the recorded accesses.
+
+        Returns:
+            Dict[str, float]: Seconds elapsed since the last access of each document.
+        """
+        accessed_at, self._accessed_at = self._accessed_at, {}
+        now = time.monotonic()
+        return {hash_id: now - timestamp for hash_id, timestamp in accessed_at.items()}
+
+    def __len__(self) -> int:
+        return len(self._accessed_at)
@@ -0,0 +1,86 @@
+import logging
+from collections.abc import Iterator
+
+from src.config import Settings
+from src.utils.convert_pdf_to_image import RenderStats
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveBatchSizer:
+    """
+    Chooses how many pages the next render batch gets, from the time and memory of the previous ones.
+
+    The size that would have hit the target seconds and the target memory per batch is applied
+    at once when it is smaller, and approached by at most doubling per batch when it is larger:
+    a heavy page is a risk, a light one is not.
+    """
+
+    def __init__(
+        self,
+        initial_size: int | None = None,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        target_seconds: float | None = None,
+        target_memory_bytes: int | None = None,
+    ) -> None:
+        self.min_size = max(min_size or Settings.PDF_BATCH_MIN_SIZE, 1)
+        self.max_size = max(max_size or Settings.PDF_BATCH_MAX_SIZE, self.min_size)
+        self.target_seconds = target_seconds if target_seconds is not None else Settings.PDF_BATCH_TARGET_SECONDS
+        self.target_memory_bytes = (
+            target_memory_bytes
+            if target_memory_bytes is not None
+            else Settings.PDF_BATCH_TARGET_MEMORY_MB * 1024 * 1024
+        )
+        self.batch_size = self._clamp(initial_size or Settings.PDF_BATCH_SIZE)
+
+    def _clamp(self, size: int) -> int:
+        return min(max(size, self.min_size), self.max_size)
+
+    def record(self, stats: RenderStats) -> int:
+        """
+        Adjust the batch size to a measured batch.
+
+        Args:
+            stats (RenderStats): Pages, render time and memory of the batch.
+
+        Returns:
+            int: The size of the next batch.
+        """
+        if stats.pages <= 0:
+            return self.batch_size
+        fitting_sizes = []
+        if self.target_seconds > 0 and stats.seconds > 0:
+            fitting_sizes.append(self.target_seconds * stats.pages / stats.seconds)
+        if self.target_memory_bytes > 0 and stats.memory_bytes > 0:
+            fitting_sizes.append(self.target_memory_bytes * stats.pages / stats.memory_bytes)
+        if not fitting_sizes:
+            return self.batch_size
+
+        batch_size = self._clamp(min(int(min(fitting_sizes)), self.batch_size * 2))
+        if batch_size != self.batch_size:
+            logger.info(
+                "Render batch size %s -> %s (%.3f s and %.1f MB per page).",
+                self.batch_size,
+                batch_size,
+                stats.seconds / stats.pages,
+                stats.memory_bytes / stats.pages / (1024 * 1024),
+            )
+        self.batch_size = batch_size
+        return batch_size
+
+
+def iter_adaptive_page_ranges(pages: list[int], sizer: AdaptiveBatchSizer) -> Iterator[tuple[int, int]]:
+    """
+    Group page numbers into contiguous (first_page, last_page) ranges of the size the sizer currently chooses.
+
+    The size is read when the next range is requested, so it follows the batches recorded in between.
+    """
+    pages = sorted(set(pages))
+    start = 0
+    while start < len(pages):
+        end = start + 1
+        while end < min(start + sizer.batch_size, len(pages)) and pages[end] == pages[end - 1] + 1:
+            end += 1
+        yield pages[start], pages[end - 1]
+        start = end
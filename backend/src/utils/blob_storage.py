@@ -2,35 +2,67 @@ import logging
 import os
 
 from azure.core.exceptions import ResourceExistsError
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContentSettings
 from azure.storage.blob.aio import BlobServiceClient
 
 from src.models.pydantic.response_model import PdfBlobResponse
 from src.config import Settings
+from src.utils.concurrency_limiter import AdaptiveConcurrencyLimiter
+from src.utils.metrics import MetricsRegistry
+from src.utils.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
 
 class AzureBlobManager:
-    def __init__(self) -> None:
+    def __init__(self, metrics: MetricsRegistry | None = None) -> None:
         self.connection_string = Settings.AZURE_STORAGE_CONNECTION_STRING
         self.container_name = Settings.AZURE_STORAGE_CONTAINER_NAME
         self.blob_service_client = None
+        # Every blob read, write and delete goes through the limiter, which also retries throttled operations.
+        self.limiter = AdaptiveConcurrencyLimiter("blob", metrics=metrics)
 
-    async def initialize(self) -> bool:
-        """Initialize the blob service client and create default container"""
+    async def initialize(self, *, create_container: bool = False) -> bool:
+        """
+        Initialize the blob service client.
+
+        Args:
+            create_container (bool): Also create the default container; done by the init step, not on every boot.
+        """
         if not self.connection_string:
             logger.warning("Azure Storage connection string not provided")
             return False
 
         try:
-            self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
-            await self.create_container(self.container_name)
+            # Throttled operations are retried by the limiter, so the limit sees the throttling.
+            self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string, retry_total=0)
+            if create_container:
+                await self.create_container(self.container_name)
             logger.info("Blob Storage initialized with container '%s'", self.container_name)
             return True
         except Exception as e:
             logger.error("Failed to initialize Blob Storage: %s", str(e))
             return False
 
+    async def check_health(self) -> None:
+        """
+        Verify that the storage account is reachable and the default container exists.
+
+        Raises:
+            RuntimeError: If the client was never initialized.
+            AzureError: If the container cannot be reached.
+        """
+        if self.blob_service_client is None:
+            raise RuntimeError("Blob Storage is not initialized")
+        await self.blob_service_client.get_container_client(self.container_name).get_container_properties()
+
+    async def close(self) -> None:
+        """Close the blob service client and its connection pool"""
+        if self.blob_service_client is not None:
+            await self.blob_service_client.close()
+            self.blob_service_client = None
+
     async def create_container(self, container_name: str) -> BlobServiceClient:
         """
         Create a new container.
@@ -62,25 +94,59 @@ class AzureBlobManager:
         """
         blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
 
-        blob_data = await blob_client.download_blob()
-        content = await blob_data.readall()
+        async def download() -> bytes:
+            blob_data = await blob_client.download_blob()
+            return await blob_data.readall()
+
+        with start_span("blob.download", blob=blob_name) as span:
+            content = await self.limiter.run(download)
+            span.set_attribute("bytes", len(content))
 
         logger.info("Blob '%s' downloaded successfully.", blob_name)
         return content
 
-    async def upload_file(self, file: bytes, file_name: str) -> PdfBlobResponse:
+    async def get_file_range(self, blob_name: str, offset: int, length: int) -> bytes:
+        """
+        get a byte range of a blob with a single ranged request.
+
+        Args:
+            blob_name (str): Name of the blob to read
+            offset (int): Position of the first byte to read
+            length (int): Number of bytes to read
+
+        Returns:
+            bytes: Content of the requested range
+        """
+        blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
+
+        async def download() -> bytes:
+            blob_data = await blob_client.download_blob(offset=offset, length=length)
+            return await blob_data.readall()
+
+        with start_span("blob.download_range", blob=blob_name, offset=offset, length=length):
+            content = await self.limiter.run(download)
+
+        logger.debug("Blob '%s' range %s+%s downloaded successfully.", blob_name, offset, length)
+        return content
+
+    async def upload_file(self, file: bytes, file_name: str, content_type: str | None = None) -> PdfBlobResponse:
         """
         Upload a file to a blob.
 
         Args:
             file (file-like object): File to upload
             file_name (str): Name of the blob to create
+            content_type (str | None): Optional MIME type stored with the blob
 
         Returns:
             str: URL of the uploaded blob
         """
         blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=file_name)
-        await blob_client.upload_blob(file, overwrite=True)
+        content_settings = ContentSettings(content_type=content_type) if content_type else None
+        with start_span("blob.upload", blob=file_name, bytes=len(file)):
+            await self.limiter.run(
+                lambda: blob_client.upload_blob(file, overwrite=True, content_settings=content_settings)
+            )
         logger.info("Blob '%s' uploaded successfully.", file_name)
         return PdfBlobResponse.success(
             blob_client.primary_endpoint,
@@ -89,3 +155,23 @@ class AzureBlobManager:
             blob_client.account_name,
             blob_client.blob_name,
         )
+
+    async def delete_file(self, blob_name: str) -> bool:
+        """
+        Delete a blob.
+
+        Args:
+            blob_name (str): Name of the blob to delete
+
+        Returns:
+            bool: True if the blob was deleted, False if it did not exist
+        """
+        blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
+        try:
+            with start_span("blob.delete", blob=blob_name):
+                await self.limiter.run(blob_client.delete_blob)
+        except ResourceNotFoundError:
+            logger.info("Blob '%s' already deleted.", blob_name)
+            return False
+        logger.info("Blob '%s' deleted successfully.", blob_name)
+        return True
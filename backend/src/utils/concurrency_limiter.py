@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import TypeVar
+
+from azure.core.exceptions import ServiceRequestError
+from azure.core.exceptions import ServiceResponseError
+from src.config import Settings
+from src.utils.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Too Many Requests, and the Internal Error / Server Busy storage returns when an account is over its limits.
+THROTTLING_STATUS_CODES = frozenset({429, 500, 503})
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """
+    Whether an error means the storage service is overloaded: a throttling status, or a connection error or timeout.
+    """
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return True
+    return getattr(error, "status_code", None) in THROTTLING_STATUS_CODES
+
+
+def _retry_after_seconds(error: BaseException) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the concurrent operations on a service, adapting the limit to the service's throttling (AIMD).
+
+    Every successful operation raises the limit by 1/limit, i.e. by one per round of ``limit``
+    operations; a throttled one multiplies it by ``backoff_ratio``. Operations started before the
+    last decrease already ran under the old limit, so their throttling does not decrease it again:
+    a burst of errors costs one decrease, not one per error. Throttled operations are retried
+    after a full-jitter exponential backoff, without holding their slot while they wait.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int | None = None,
+        min_limit: int | None = None,
+        max_limit: int | None = None,
+        backoff_ratio: float | None = None,
+        max_retries: int | None = None,
+        retry_base_delay: float | None = None,
+        retry_max_delay: float | None = None,
+        metrics: MetricsRegistry | None = None,
+        is_throttled: Callable[[BaseException], bool] = is_throttling_error,
+    ) -> None:
+        self.name = name
+        self.min_limit = max(min_limit or Settings.BLOB_CONCURRENCY_MIN, 1)
+        self.max_limit = max(max_limit or Settings.BLOB_CONCURRENCY_MAX, self.min_limit)
+        initial_limit = initial_limit or Settings.BLOB_CONCURRENCY_INITIAL
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.backoff_ratio = backoff_ratio or Settings.BLOB_CONCURRENCY_BACKOFF
+        self.max_retries = Settings.BLOB_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_base_delay = Settings.BLOB_RETRY_BASE_DELAY_SECONDS if retry_base_delay is None else retry_base_delay
+        self.retry_max_delay = Settings.BLOB_RETRY_MAX_DELAY_SECONDS if retry_max_delay is None else retry_max_delay
+        self.metrics = metrics or MetricsRegistry()
+        self.is_throttled = is_throttled
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = float("-inf")
+        self._report()
+
+    def _report(self) -> None:
+        self.metrics.set_gauge(f"{self.name}_concurrency_limit", int(self.limit))
+        self.metrics.set_gauge(f"{self.name}_in_flight", self.in_flight)
+        self.metrics.set_gauge(f"{self.name}_queued", len(self._waiters))
+
+    async def _acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._report()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation.
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand the free slots to the waiting operations, in order."""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._report()
+
+    def _on_success(self) -> None:
+        self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+        self._wake()
+
+    def _on_throttled(self, started: float) -> None:
+        if started < self._last_decrease:
+            return
+        previous, self.limit = self.limit, max(self.limit * self.backoff_ratio, self.min_limit)
+        self._last_decrease = time.monotonic()
+        if int(previous) != int(self.limit):
+            logger.warning("%s throttled, concurrency limit %s -> %s.", self.name, int(previous), int(self.limit))
+
+    def _retry_delay(self, attempt: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2**attempt))  # noqa: S311
+        return min(max(delay, _retry_after_seconds(error)), self.retry_max_delay)
+
+    async def run(self, operation: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run an operation under the limit, retrying it while the service throttles it.
+
+        Args:
+            operation (Callable[[], Awaitable[T]]): Starts the operation; called again for every attempt.
+
+        Returns:
+            T: The result of the operation.
+
+        Raises:
+            Exception: The error of the operation, if it is not throttling or the retries ran out.
+        """
+        attempt = 0
+        while True:
+            await self._acquire()
+            started = time.monotonic()
+            try:
+                result = await operation()
+            except Exception as e:
+                self._release()
+                if not self.is_throttled(e):
+                    raise
+                self.metrics.increment(f"{self.name}_throttled_total")
+                self._on_throttled(started)
+                if attempt >= self.max_retries:
+                    self.metrics.increment(f"{self.name}_retries_exhausted_total")
+                    raise
+                delay = self._retry_delay(attempt, e)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                self._release()
+                self.metrics.observe(f"{self.name}_latency_seconds", time.monotonic() - started)
+                self._on_success()
+                return result
+            attempt += 1
+            self.metrics.increment(f"{self.name}_retries_total")
+            await asyncio.sleep(delay)
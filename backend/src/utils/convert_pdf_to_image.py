@@ -1,15 +1,253 @@
 import base64
+import hashlib
+import itertools
 import logging
+import math
 import os
-from io import BytesIO
-
-from pdf2image import convert_from_bytes
-from pdf2image.pdf2image import pdfinfo_from_bytes
+import re
+import resource
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
 
 from src.config import Settings
+from src.utils.image_encoders import ImageEncoder
+from src.utils.image_encoders import get_encoder
 
 logger = logging.getLogger(__name__)
 
+POINTS_PER_INCH = 72
+PAGE_SIZE_KEY = re.compile(r"Page\s*(\d*) size")
+
+
+@lru_cache
+def get_page_encoder() -> ImageEncoder:
+    """
+    The encoder backend selected by IMAGE_ENCODER and IMAGE_QUALITY.
+    """
+    return get_encoder(Settings.IMAGE_ENCODER, Settings.IMAGE_QUALITY)
+
+
+def get_render_profile(dpi: int | None = None) -> str:
+    """
+    Everything that influences the rendered output; part of every page digest so pages rendered
+    with different settings are never shared.
+    """
+    return f"dpi={dpi or Settings.RENDER_DPI};{get_page_encoder().profile}"
+
+
+class RenderLimitError(ValueError):
+    """A page cannot be rendered within the pixel budget or the memory limit of the render workers."""
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    page_number: int
+    image_bytes: bytes
+    image_format: str
+    digest: str
+
+
+def page_digest(image_bytes: bytes, render_profile: str | None = None) -> str:
+    """
+    Content address of a rendered page: SHA-256 of the render profile and the encoded image.
+    """
+    if render_profile is None:
+        render_profile = get_render_profile()
+    return hashlib.sha256(render_profile.encode("utf-8") + b"\0" + image_bytes).hexdigest()
+
+
+def get_page_count(pdf_bytes: bytes) -> int:
+    """
+    Return the number of pages of a PDF document.
+    """
+    # pdf2image is preloaded in the render workers and never imported by the API process.
+    from pdf2image.pdf2image import pdfinfo_from_bytes  # noqa: PLC0415
+
+    info = pdfinfo_from_bytes(pdf_bytes)
+    return info["Pages"]
+
+
+def parse_page_sizes(pdf_info: dict[str, object], first_page: int) -> dict[int, tuple[float, float]]:
+    """
+    Extract the width and height in points of every page from the output of pdfinfo.
+
+    pdfinfo reports a "Page size" for a single page and "Page   N size" entries for a page range.
+    """
+    page_sizes = {}
+    for key, value in pdf_info.items():
+        match = PAGE_SIZE_KEY.fullmatch(key)
+        if match is None:
+            continue
+        width, _, height = str(value).split()[:3]
+        page_number = int(match.group(1)) if match.group(1) else first_page
+        page_sizes[page_number] = (float(width), float(height))
+    return page_sizes
+
+
+def get_page_sizes(pdf_bytes: bytes, first_page: int, last_page: int) -> dict[int, tuple[float, float]]:
+    """
+    Return the width and height in points of pages first_page..last_page (inclusive).
+    """
+    from pdf2image.pdf2image import pdfinfo_from_bytes  # noqa: PLC0415
+
+    return parse_page_sizes(pdfinfo_from_bytes(pdf_bytes, first_page=first_page, last_page=last_page), first_page)
+
+
+def page_render_dpi(page_number: int, width: float, height: float) -> int:
+    """
+    DPI to render a page of width x height points at: RENDER_DPI, lowered until the bitmap fits in
+    MAX_PAGE_PIXELS.
+
+    Raises:
+        RenderLimitError: If the page only fits below MIN_RENDER_DPI.
+    """
+    dpi = Settings.RENDER_DPI
+    square_inches = (width / POINTS_PER_INCH) * (height / POINTS_PER_INCH)
+    if Settings.MAX_PAGE_PIXELS <= 0 or square_inches * dpi * dpi <= Settings.MAX_PAGE_PIXELS:
+        return dpi
+    dpi = int(math.sqrt(Settings.MAX_PAGE_PIXELS / square_inches))
+    if dpi < Settings.MIN_RENDER_DPI:
+        raise RenderLimitError(
+            f"Page {page_number} ({width:.0f} x {height:.0f} pt) does not fit in {Settings.MAX_PAGE_PIXELS} pixels "
+            f"at the minimum of {Settings.MIN_RENDER_DPI} DPI"
+        )
+    logger.info(
+        "Rendering page %s (%.0f x %.0f pt) at %s DPI to fit the pixel budget.", page_number, width, height, dpi
+    )
+    return dpi
+
+
+def plan_render_dpis(pdf_bytes: bytes, first_page: int, last_page: int) -> dict[int, int]:
+    """
+    The DPI of every page of first_page..last_page, within the pixel budget.
+
+    Raises:
+        RenderLimitError: If a page cannot be rendered within the pixel budget.
+    """
+    page_sizes = get_page_sizes(pdf_bytes, first_page, last_page)
+    return {
+        page_number: page_render_dpi(page_number, width, height)
+        for page_number, (width, height) in sorted(page_sizes.items())
+    }
+
+
+def check_render_budget(pdf_bytes: bytes, num_pages: int | None = None) -> int:
+    """
+    Verify up front that every page of a document can be rendered within the pixel budget.
+
+    Args:
+        pdf_bytes (bytes): The content of the PDF file.
+        num_pages (int | None): The number of pages of the document, if it was already counted.
+
+    Returns:
+        int: The number of pages of the document.
+
+    Raises:
+        RenderLimitError: If a page cannot be rendered within the pixel budget.
+    """
+    if num_pages is None:
+        num_pages = get_page_count(pdf_bytes)
+    plan_render_dpis(pdf_bytes, 1, num_pages)
+    return num_pages
+
+
+def iter_page_ranges(pages: Iterable[int], batch_size: int) -> list[tuple[int, int]]:
+    """
+    Group page numbers into contiguous (first_page, last_page) ranges of at most batch_size pages.
+    """
+    ranges: list[tuple[int, int]] = []
+    for page in sorted(set(pages)):
+        if ranges and ranges[-1][1] == page - 1 and page - ranges[-1][0] < batch_size:
+            ranges[-1] = (ranges[-1][0], page)
+        else:
+            ranges.append((page, page))
+    return ranges
+
+
+def render_pages(pdf_bytes: bytes, first_page: int, last_page: int) -> list[RenderedPage]:
+    """
+    Render a range of PDF pages, encoding each page once with the configured encoder.
+
+    Returns:
+        List[RenderedPage]: The page number, encoded image and content digest of each rendered page.
+    """
+    logger.debug("Processing pages %s to %s.", first_page, last_page)
+    encoder = get_page_encoder()
+    page_dpis = plan_render_dpis(pdf_bytes, first_page, last_page)
+    rendered_pages = []
+    # Consecutive pages with the same DPI are rendered by a single pdftoppm run.
+    for dpi, run in itertools.groupby(
+        range(first_page, last_page + 1), key=lambda page: page_dpis.get(page, Settings.RENDER_DPI)
+    ):
+        pages = list(run)
+        try:
+            encoded_pages = encoder.render(pdf_bytes, pages[0], pages[-1], dpi)
+        except MemoryError:
+            raise RenderLimitError(
+                f"Rendering pages {pages[0]}-{pages[-1]} exceeded the render memory limit "
+                f"of {Settings.RENDER_MEMORY_LIMIT_MB} MB"
+            ) from None
+        if len(encoded_pages) != len(pages):
+            # pdftoppm inherits the memory limit of the render worker and exits when it is exceeded.
+            raise RenderLimitError(
+                f"Only {len(encoded_pages)} of pages {pages[0]}-{pages[-1]} could be rendered, the page is corrupt "
+                f"or exceeded the render memory limit of {Settings.RENDER_MEMORY_LIMIT_MB} MB"
+            )
+        render_profile = get_render_profile(dpi)
+        for page_number, image_bytes in zip(pages, encoded_pages, strict=True):
+            rendered_pages.append(
+                RenderedPage(page_number, image_bytes, encoder.image_format, page_digest(image_bytes, render_profile))
+            )
+            logger.debug("Page %s converted to image.", page_number)
+    return rendered_pages
+
+
+@dataclass(frozen=True)
+class RenderStats:
+    pages: int
+    seconds: float
+    memory_bytes: int
+
+
+def _resident_memory() -> int:
+    """Current resident set size of this process in bytes."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+
+def _peak_memory(who: int) -> int:
+    """High-water mark of the resident set size in bytes (Linux reports ru_maxrss in KiB)."""
+    return resource.getrusage(who).ru_maxrss * 1024
+
+
+def render_pages_measured(pdf_bytes: bytes, first_page: int, last_page: int) -> tuple[list[RenderedPage], RenderStats]:
+    """
+    Render a range of PDF pages like render_pages and measure the time and memory it took.
+
+    The memory of a batch is how much the resident set of the render worker grew, plus the peak of
+    the pdftoppm processes when it is a new high-water mark. Peaks are only known when they exceed
+    every earlier one, so otherwise the memory still held after the batch is used.
+    """
+    started = time.perf_counter()
+    resident_before = _resident_memory()
+    peak_before = _peak_memory(resource.RUSAGE_SELF)
+    children_peak_before = _peak_memory(resource.RUSAGE_CHILDREN)
+
+    rendered_pages = render_pages(pdf_bytes, first_page, last_page)
+
+    peak_after = _peak_memory(resource.RUSAGE_SELF)
+    children_peak_after = _peak_memory(resource.RUSAGE_CHILDREN)
+    worker_memory = (peak_after if peak_after > peak_before else _resident_memory()) - resident_before
+    renderer_memory = children_peak_after if children_peak_after > children_peak_before else 0
+    stats = RenderStats(
+        pages=len(rendered_pages),
+        seconds=time.perf_counter() - started,
+        memory_bytes=max(worker_memory, 0) + renderer_memory,
+    )
+    return rendered_pages, stats
+
 
 def convert_pdf_to_images(pdf_bytes: bytes, batch_size: int = 10) -> list[dict[str, str]]:
     """
@@ -22,26 +260,21 @@ def convert_pdf_to_images(pdf_bytes: bytes, batch_size: int = 10) -> list[dict[s
         except ValueError:
             logger.warning("Invalid PDF_BATCH_SIZE env value: %s, using default %s", env_batch_size, batch_size)
 
-    info = pdfinfo_from_bytes(pdf_bytes)
-    num_pages = info["Pages"]
+    num_pages = get_page_count(pdf_bytes)
     logger.info("PDF has %s pages. Processing in batches of %s.", num_pages, batch_size)
 
     serializable_images = []
-    for start in range(1, num_pages + 1, batch_size):
-        end = min(start + batch_size - 1, num_pages)
-        logger.debug("Processing pages %s to %s.", start, end)
-        pil_images = convert_from_bytes(pdf_bytes, first_page=start, last_page=end, fmt="jpeg", thread_count=1)
-        for idx, img in enumerate(pil_images):
-            buffered = BytesIO()
-            img.save(buffered, format="JPEG", quality=25)
-            img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    for first_page, last_page in iter_page_ranges(range(1, num_pages + 1), batch_size):
+        for rendered_page in render_pages(pdf_bytes, first_page, last_page):
+            img_str = base64.b64encode(rendered_page.image_bytes).decode("utf-8")
             serializable_images.append(
-                {"page": start + idx, "image_data": img_str, "format": "JPEG", "encoding": "base64"}
+                {
+                    "page": rendered_page.page_number,
+                    "image_data": img_str,
+                    "format": rendered_page.image_format,
+                    "encoding": "base64",
+                }
             )
-            logger.debug("Page %s converted to image.", start + idx)
-            img.close()
-            del img, buffered
-        del pil_images
 
     logger.info("Finished converting %s pages to images.", num_pages)
     return serializable_images
@@ -0,0 +1,140 @@
+import logging
+import tempfile
+from abc import ABC
+from abc import abstractmethod
+from io import BytesIO
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# pdf2image and PIL are imported where they are used (noqa: PLC0415): the render workers preload
+# them, and the API process, which only selects the encoder, never loads them.
+
+# Quality scale shared by pdftoppm's jpegopt and Pillow's JPEG and WebP encoders.
+MIN_QUALITY = 1
+MAX_QUALITY = 100
+
+
+class ImageEncoder(ABC):
+    """
+    Renders a range of PDF pages and encodes each page exactly once.
+    """
+
+    name: str
+    image_format: str
+
+    def __init__(self, quality: int) -> None:
+        self.quality = quality
+
+    @property
+    def profile(self) -> str:
+        """Encoder settings that influence the encoded bytes."""
+        return f"encoder={self.name};format={self.image_format};quality={self.quality}"
+
+    @abstractmethod
+    def render(self, pdf_bytes: bytes, first_page: int, last_page: int, dpi: int) -> list[bytes]:
+        """
+        Render pages first_page..last_page (inclusive) and return the encoded image of each page in order.
+        """
+
+
+class PopplerJpegEncoder(ImageEncoder):
+    """
+    Lets pdftoppm write the final JPEG directly; the image is never decoded or re-encoded in Python.
+    """
+
+    name = "poppler"
+    image_format = "JPEG"
+
+    def render(self, pdf_bytes: bytes, first_page: int, last_page: int, dpi: int) -> list[bytes]:
+        from pdf2image import convert_from_bytes  # noqa: PLC0415
+
+        jpegopt = {"quality": self.quality, "progressive": False, "optimize": False}
+        with tempfile.TemporaryDirectory(prefix="render-") as output_folder:
+            paths = convert_from_bytes(
+                pdf_bytes,
+                dpi=dpi,
+                first_page=first_page,
+                last_page=last_page,
+                fmt="jpeg",
+                jpegopt=jpegopt,
+                output_folder=output_folder,
+                paths_only=True,
+                thread_count=1,
+            )
+            encoded_pages = []
+            for path in map(Path, paths):
+                encoded_pages.append(path.read_bytes())
+                path.unlink()
+        return encoded_pages
+
+
+class PillowEncoder(ImageEncoder):
+    """
+    Takes raw PPM output from pdftoppm and encodes it once with Pillow.
+
+    Pillow wheels are built against libjpeg-turbo, so this is the libjpeg-turbo backend whenever
+    ``PIL.features.check_feature("libjpeg_turbo")`` is true.
+    """
+
+    name = "pillow"
+    image_format = "JPEG"
+
+    def save_options(self) -> dict:
+        return {"quality": self.quality, "optimize": False}
+
+    def render(self, pdf_bytes: bytes, first_page: int, last_page: int, dpi: int) -> list[bytes]:
+        from pdf2image import convert_from_bytes  # noqa: PLC0415
+
+        images = convert_from_bytes(
+            pdf_bytes, dpi=dpi, first_page=first_page, last_page=last_page, fmt="ppm", thread_count=1
+        )
+        encoded_pages = []
+        for image in images:
+            buffered = BytesIO()
+            image.save(buffered, format=self.image_format, **self.save_options())
+            encoded_pages.append(buffered.getvalue())
+            image.close()
+        return encoded_pages
+
+
+class WebPEncoder(PillowEncoder):
+    """
+    Encodes raw PPM output to lossy WebP with Pillow.
+    """
+
+    name = "webp"
+    image_format = "WEBP"
+
+    def save_options(self) -> dict:
+        return {"quality": self.quality, "method": 4}
+
+
+ENCODERS: dict[str, type[ImageEncoder]] = {
+    PopplerJpegEncoder.name: PopplerJpegEncoder,
+    PillowEncoder.name: PillowEncoder,
+    WebPEncoder.name: WebPEncoder,
+}
+
+
+def get_encoder(name: str, quality: int) -> ImageEncoder:
+    """
+    Create the encoder backend registered under name.
+
+    Raises:
+        ValueError: If no such encoder exists, the quality is not within 1-100 or Pillow lacks the
+        codec the encoder needs.
+    """
+    from PIL import features  # noqa: PLC0415
+
+    try:
+        encoder_class = ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown image encoder {name!r}, expected one of {sorted(ENCODERS)}") from None
+    if not MIN_QUALITY <= quality <= MAX_QUALITY:
+        raise ValueError(f"Image quality must be between {MIN_QUALITY} and {MAX_QUALITY}, got {quality}")
+    if encoder_class is WebPEncoder and not features.check("webp"):
+        raise ValueError("Pillow was built without WebP support")
+    if encoder_class is PillowEncoder and not features.check_feature("libjpeg_turbo"):
+        logger.warning("Pillow is not linked against libjpeg-turbo; JPEG encoding will be slower.")
+    return encoder_class(quality)
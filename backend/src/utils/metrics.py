@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Summary:
+    count: int = 0
+    total: float = 0.0
+    minimum: float = float("inf")
+    maximum: float = float("-inf")
+    last: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.last = value
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.minimum if self.count else 0.0,
+            "max": self.maximum if self.count else 0.0,
+            "last": self.last,
+        }
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and summaries of the current process, exposed by GET /metrics.
+
+    Every server worker and render node has its own registry, so a scraper sees one process per request.
+    """
+
+    def __init__(self) -> None:
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, Summary] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add value to a counter."""
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set the current value of a gauge."""
+        self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation of a summary."""
+        self._summaries.setdefault(name, Summary()).observe(value)
+
+    def snapshot(self) -> dict[str, dict]:
+        """
+        Return the current value of every metric.
+
+        Returns:
+            Dict[str, Dict]: Counters, gauges and summaries by name.
+        """
+        return {
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            "summaries": {name: summary.to_dict() for name, summary in self._summaries.items()},
+        }
@@ -0,0 +1,129 @@
+import mmap
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Self
+
+# Layout of a page container:
+#   header | index (one entry per page, ordered by page number) | page images
+# All integers are little endian; offsets are absolute from the start of the container.
+MAGIC = b"PDFPAGES"
+VERSION = 1
+HEADER = struct.Struct("<8sHH8sI")  # magic, version, reserved, image format, page count
+ENTRY = struct.Struct("<IQII")  # page number, offset, length, crc32
+
+
+class PageContainerError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ContainerHeader:
+    image_format: str
+    page_count: int
+
+    @property
+    def index_offset(self) -> int:
+        return HEADER.size
+
+    @property
+    def index_size(self) -> int:
+        return self.page_count * ENTRY.size
+
+
+@dataclass(frozen=True)
+class ContainerEntry:
+    page_number: int
+    offset: int
+    length: int
+    crc32: int
+
+
+def build_container(pages: list[tuple[int, bytes]], image_format: str) -> bytes:
+    """
+    Pack page images into a single container with a page index.
+
+    Args:
+        pages (List[Tuple[int, bytes]]): Page numbers and encoded images.
+        image_format (str): Format of the encoded images, e.g. "JPEG".
+
+    Returns:
+        bytes: The encoded container.
+    """
+    pages = sorted(pages)
+    header = HEADER.pack(MAGIC, VERSION, 0, image_format.encode("ascii"), len(pages))
+    offset = HEADER.size + len(pages) * ENTRY.size
+    index = bytearray()
+    for page_number, image_bytes in pages:
+        index += ENTRY.pack(page_number, offset, len(image_bytes), zlib.crc32(image_bytes))
+        offset += len(image_bytes)
+    return b"".join([header, index, *(image_bytes for _, image_bytes in pages)])
+
+
+def parse_header(data: bytes | memoryview) -> ContainerHeader:
+    """
+    Parse the fixed size header at the start of a container.
+    """
+    if len(data) < HEADER.size:
+        raise PageContainerError("Truncated page container header")
+    magic, version, _, image_format, page_count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise PageContainerError("Not a page container")
+    if version != VERSION:
+        raise PageContainerError(f"Unsupported page container version {version}")
+    return ContainerHeader(image_format.rstrip(b"\0").decode("ascii"), page_count)
+
+
+def parse_index(data: bytes | memoryview, header: ContainerHeader, start: int = 0) -> dict[int, ContainerEntry]:
+    """
+    Parse the page index that follows the header.
+
+    Args:
+        data (bytes): Bytes containing the index.
+        header (ContainerHeader): The parsed container header.
+        start (int): Position of the index in data; header.index_offset when data is the whole container.
+
+    Returns:
+        Dict[int, ContainerEntry]: Index entries by page number.
+    """
+    if len(data) < start + header.index_size:
+        raise PageContainerError("Truncated page container index")
+    entries = (ContainerEntry(*ENTRY.unpack_from(data, start + i * ENTRY.size)) for i in range(header.page_count))
+    return {entry.page_number: entry for entry in entries}
+
+
+class MappedPageContainer:
+    """
+    Read-only, memory-mapped page container on local disk.
+
+    Pages are returned as memoryview slices of the mapping, so serving them copies nothing
+    until the bytes are written to the socket. Release the slices before closing the container.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        with open(path, "rb") as container_file:
+            self._mmap = mmap.mmap(container_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self.header = parse_header(self._view)
+        self.index = parse_index(self._view, self.header, self.header.index_offset)
+
+    def get_page(self, page_number: int) -> memoryview:
+        """
+        Return the image bytes of a page without copying them.
+
+        Raises:
+            KeyError: If the container has no such page.
+        """
+        entry = self.index[page_number]
+        return self._view[entry.offset : entry.offset + entry.length]
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -0,0 +1,164 @@
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import os
+import resource
+from collections.abc import Callable
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from typing import TypeVar
+
+from src.config import Settings
+from src.utils.tracing import run_traced
+from src.utils.tracing import span_traceparent
+from src.utils.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Modules imported once in the fork server, so every render worker starts with them loaded.
+PRELOADED_MODULES = [
+    "PIL.Image",
+    "PIL.JpegImagePlugin",
+    "pdf2image",
+    "src.utils.convert_pdf_to_image",
+    "src.utils.tracing",
+]
+
+
+def _initialize_worker() -> None:
+    """
+    Configure logging, cap the memory and finish warming up the imaging libraries in a new render worker.
+
+    The address space limit is inherited by the pdftoppm processes the worker starts, so an oversized
+    page makes the render fail instead of getting the node OOM-killed.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    if Settings.RENDER_MEMORY_LIMIT_MB > 0:
+        limit = Settings.RENDER_MEMORY_LIMIT_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    # Preloaded by the fork server; imported here so the API process never loads PIL.
+    from PIL import Image  # noqa: PLC0415
+
+    Image.init()
+    if Settings.MAX_PAGE_PIXELS > 0:
+        Image.MAX_IMAGE_PIXELS = Settings.MAX_PAGE_PIXELS
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class RenderWorkerPool:
+    """
+    Pool of render worker processes, so rendering and encoding never hold the API process GIL.
+
+    Workers are forked from a fork server with PIL and pdf2image already imported and finish
+    their in-flight tasks on shutdown. To cap the memory leaked by poppler and PIL, the whole
+    generation of workers is retired once it has run about max_tasks_per_child tasks per worker:
+    new tasks go to a fresh generation while the old one drains in the background. (The
+    executor's own max_tasks_per_child can deadlock when workers exit, see CPython gh-115634.)
+
+    At most max_workers tasks run at a time across generations. A fresh generation starts its
+    workers as tasks arrive, so while the old one drains the two together never exceed max_workers
+    processes.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_tasks_per_child: int | None = None) -> None:
+        # Every server worker has its own pool; by default they share the CPUs between them.
+        cpus_per_server_worker = max((os.cpu_count() or 1) // Settings.SERVER_WORKERS, 1)
+        self.max_workers = max_workers or Settings.RENDER_WORKERS or cpus_per_server_worker
+        self.max_tasks_per_child = max_tasks_per_child or Settings.RENDER_WORKER_MAX_TASKS
+        self._context: multiprocessing.context.BaseContext | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._in_flight: set[Future] = set()
+        # Released when the task finishes in its worker, even if the caller was cancelled meanwhile.
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._submitted = 0
+        self._warmed_up = False
+
+    def start(self) -> None:
+        """Create the worker processes and wait until all of them are ready."""
+        if self._executor is not None:
+            return
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self._context.set_forkserver_preload(PRELOADED_MODULES)
+        self._executor = self._create_executor()
+        pids = {future.result() for future in [self._executor.submit(_ping) for _ in range(self.max_workers)]}
+        self._warmed_up = True
+        logger.info(
+            "Render worker pool started with %s workers (%s, recycled every %s tasks per worker).",
+            len(pids),
+            method,
+            self.max_tasks_per_child,
+        )
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        self._submitted = 0
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=self._context, initializer=_initialize_worker
+        )
+
+    def _recycle_if_needed(self) -> None:
+        if self._executor is None or self._submitted < self.max_workers * self.max_tasks_per_child:
+            return
+        retired, self._executor = self._executor, self._create_executor()
+        retired.shutdown(wait=False, cancel_futures=False)
+        logger.info("Render worker generation retired after %s tasks.", self.max_workers * self.max_tasks_per_child)
+
+    @property
+    def is_running(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def is_ready(self) -> bool:
+        """True once every worker has started, as long as no worker died unexpectedly."""
+        return self._executor is not None and self._warmed_up and not getattr(self._executor, "_broken", False)
+
+    async def run(self, func: Callable[..., T], *args: object) -> T:
+        """
+        Run a function in a render worker.
+
+        Falls back to a thread when the pool is not running, e.g. in tests or scripts. The task is
+        traced as a child of the current span; the worker exports its own spans.
+        """
+        with start_span("render_pool.run", function=func.__name__) as span:
+            if self._executor is None:
+                return await asyncio.to_thread(func, *args)
+            await self._slots.acquire()
+            try:
+                self._recycle_if_needed()
+                self._submitted += 1
+                future = self._executor.submit(run_traced, span_traceparent(span), "render_pool.task", func, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+            self._in_flight.add(future)
+            loop = asyncio.get_running_loop()
+            future.add_done_callback(lambda done: self._task_done(loop, done))
+            return await asyncio.wrap_future(future)
+
+    def _task_done(self, loop: asyncio.AbstractEventLoop, future: Future) -> None:
+        """Called in the executor's thread when a task finishes."""
+        self._in_flight.discard(future)
+        with contextlib.suppress(RuntimeError):  # The event loop is already closed.
+            loop.call_soon_threadsafe(self._slots.release)
+
+    def shutdown(self) -> None:
+        """Stop accepting work, let the workers finish their in-flight tasks and exit."""
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        # Tasks still running on retired generations are only reachable through their futures.
+        wait(list(self._in_flight))
+        executor.shutdown(wait=True, cancel_futures=False)
+        logger.info("Render worker pool stopped.")
@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+from opentelemetry.sdk.trace.export import SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased
+from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+from opentelemetry.trace import Span
+from opentelemetry.trace import format_trace_id
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+from opentelemetry.util.types import AttributeValue
+from src.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# W3C Trace Context: version-trace_id-parent_id-flags, e.g. 00-<32 hex>-<16 hex>-01
+TRACEPARENT_HEADER = "traceparent"
+
+_propagator = TraceContextTextMapPropagator()
+_provider: TracerProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def trace_file_path(path: str, pid: int) -> str:
+    """
+    The trace file of one process: API workers and render workers each write their own, so lines never interleave.
+
+    Example: traces.jsonl becomes traces.1234.jsonl in process 1234.
+    """
+    trace_file = Path(path)
+    return str(trace_file.with_name(f"{trace_file.stem}.{pid}{trace_file.suffix}"))
+
+
+def _create_exporter() -> SpanExporter | None:
+    exporter = Settings.TRACE_EXPORTER.lower()
+    if exporter == "otlp":
+        # Only loaded when spans are sent to a collector.
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter  # noqa: PLC0415
+
+        return OTLPSpanExporter(endpoint=Settings.TRACE_OTLP_ENDPOINT, timeout=Settings.TRACE_EXPORT_TIMEOUT_SECONDS)
+    if exporter == "file":
+        trace_file = open(trace_file_path(Settings.TRACE_FILE, os.getpid()), "a", encoding="utf-8")  # noqa: SIM115
+        return ConsoleSpanExporter(out=trace_file, formatter=lambda span: span.to_json(indent=None) + os.linesep)
+    return None
+
+
+def create_tracer_provider(exporter: SpanExporter | None = None) -> TracerProvider:
+    """
+    Tracer provider sampling TRACE_SAMPLE_RATIO of the traces started here and following the caller's
+    decision for continued ones.
+
+    Spans are exported in batches by a background thread, to the OTLP/HTTP collector at
+    TRACE_OTLP_ENDPOINT or as JSON lines to a per-process TRACE_FILE; with TRACE_EXPORTER=none they
+    are only used for the trace ids in log lines.
+
+    Args:
+        exporter (SpanExporter | None): Exporter to use instead of the one selected by TRACE_EXPORTER.
+    """
+    provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(Settings.TRACE_SAMPLE_RATIO)),
+        resource=Resource.create({"service.name": Settings.TRACE_SERVICE_NAME}),
+        shutdown_on_exit=False,
+    )
+    exporter = exporter or _create_exporter()
+    if exporter is not None:
+        provider.add_span_processor(
+            BatchSpanProcessor(
+                exporter,
+                max_queue_size=Settings.TRACE_QUEUE_SIZE,
+                max_export_batch_size=Settings.TRACE_BATCH_SIZE,
+                schedule_delay_millis=Settings.TRACE_EXPORT_INTERVAL_SECONDS * 1000,
+                export_timeout_millis=Settings.TRACE_EXPORT_TIMEOUT_SECONDS * 1000,
+            )
+        )
+    return provider
+
+
+def get_tracer_provider() -> TracerProvider:
+    """The tracer provider of this process, created from the settings on first use."""
+    # One provider per process: render workers create their own after the fork.
+    global _provider  # noqa: PLW0603
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_tracer_provider()
+    return _provider
+
+
+def shutdown_tracing() -> None:
+    """Export the spans still queued and stop the exporter thread."""
+    global _provider
+    provider, _provider = _provider, None
+    if provider is not None:
+        provider.shutdown()
+
+
+def span_traceparent(span: Span) -> str | None:
+    """The W3C traceparent of a span, to continue its trace in another process or service."""
+    carrier: dict[str, str] = {}
+    _propagator.inject(carrier, context=trace.set_span_in_context(span))
+    return carrier.get(TRACEPARENT_HEADER)
+
+
+def current_traceparent() -> str | None:
+    """The traceparent of the current span, to continue the trace in another process."""
+    return span_traceparent(trace.get_current_span())
+
+
+def set_attribute(key: str, value: AttributeValue) -> None:
+    """Set an attribute on the current span, if any."""
+    trace.get_current_span().set_attribute(key, value)
+
+
+@contextmanager
+def start_span(
+    name: str, traceparent: str | None = None, *, end_on_exit: bool = True, **attributes: AttributeValue | None
+) -> Iterator[Span]:
+    """
+    Time a block as a span, child of the current span or of the given traceparent.
+
+    Works in sync and async code alike: the current span is kept in a context variable, so it
+    follows tasks, asyncio.to_thread and render pool tasks (see run_traced). An exception leaving
+    the block is recorded and marks the span as failed.
+
+    Args:
+        name (str): The operation name.
+        traceparent (str | None): The W3C traceparent of a remote parent, used when there is no current span.
+        end_on_exit (bool): End the span when the block exits; otherwise the caller ends it.
+        **attributes: Attributes of the span; None values are left out.
+    """
+    context = None
+    if traceparent and not trace.get_current_span().get_span_context().is_valid:
+        context = _propagator.extract({TRACEPARENT_HEADER: traceparent})
+    tracer = get_tracer_provider().get_tracer("pdf_to_image")
+    with tracer.start_as_current_span(
+        name,
+        context=context,
+        attributes={key: value for key, value in attributes.items() if value is not None},
+        end_on_exit=end_on_exit,
+    ) as span:
+        yield span
+
+
+def run_traced[T](traceparent: str | None, name: str, func: Callable[..., T], *args: object) -> T:
+    """
+    Run a function in a render worker as a child span of the caller's trace.
+
+    The worker exports its spans itself and flushes them before returning, since it may be retired
+    (and exit without running exit handlers) right after the task.
+    """
+    try:
+        with start_span(name, traceparent=traceparent, pid=os.getpid()):
+            return func(*args)
+    finally:
+        get_tracer_provider().force_flush(int(Settings.TRACE_EXPORT_TIMEOUT_SECONDS * 1000))
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds the trace id of the current span to log records, so log lines can be matched to traces."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span_context = trace.get_current_span().get_span_context()
+        record.trace_id = format_trace_id(span_context.trace_id) if span_context.is_valid else "-"
+        return True
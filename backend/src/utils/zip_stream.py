@@ -0,0 +1,174 @@
+import hashlib
+import struct
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+# Stored (uncompressed) ZIP members whose sizes and CRC-32s are known up front, so the byte layout
+# of the whole archive is fixed before the first member is read and any byte range can be served.
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_RECORD = struct.Struct("<IHHHHIIH")
+LOCAL_HEADER_SIGNATURE = 0x04034B50
+CENTRAL_HEADER_SIGNATURE = 0x02014B50
+END_RECORD_SIGNATURE = 0x06054B50
+VERSION = 20
+UTF8_NAMES = 0x0800
+STORED = 0
+MAX_SIZE = 0xFFFFFFFF
+MAX_MEMBERS = 0xFFFF
+
+
+@dataclass(frozen=True)
+class ZipMember:
+    name: str
+    size: int
+    crc32: int
+
+
+def _dos_datetime(modified: datetime) -> tuple[int, int]:
+    year = min(max(modified.year, 1980), 2107)
+    dos_time = (modified.hour << 11) | (modified.minute << 5) | (modified.second // 2)
+    dos_date = ((year - 1980) << 9) | (modified.month << 5) | modified.day
+    return dos_time, dos_date
+
+
+class ZipStream:
+    """
+    A ZIP archive of stored members, generated on the fly one member at a time.
+
+    Only the member being sent is held in memory, and because the layout is deterministic
+    any byte range of the archive can be produced without reading the members before it.
+    Archives are limited to the classic (non ZIP64) format: 65535 members and 4 GiB.
+    """
+
+    def __init__(
+        self,
+        members: list[ZipMember],
+        read_member: Callable[[int], Awaitable[bytes | memoryview]],
+        modified: datetime,
+    ) -> None:
+        """
+        Args:
+            members (List[ZipMember]): Archive members, in archive order.
+            read_member (Callable): Returns the content of the member at the given position.
+            modified (datetime): Modification time recorded for every member.
+        """
+        if len(members) > MAX_MEMBERS:
+            raise ValueError(f"Too many archive members: {len(members)}")
+        self.members = members
+        self.read_member = read_member
+        dos_time, dos_date = _dos_datetime(modified)
+
+        # Each segment is (offset, length, fixed bytes or the position of a member).
+        self._segments: list[tuple[int, int, bytes | int]] = []
+        central_directory = bytearray()
+        offset = 0
+        for position, member in enumerate(members):
+            name = member.name.encode("utf-8")
+            local_header = LOCAL_HEADER.pack(
+                LOCAL_HEADER_SIGNATURE,
+                VERSION,
+                UTF8_NAMES,
+                STORED,
+                dos_time,
+                dos_date,
+                member.crc32,
+                member.size,
+                member.size,
+                len(name),
+                0,
+            )
+            central_directory += CENTRAL_HEADER.pack(
+                CENTRAL_HEADER_SIGNATURE,
+                VERSION,
+                VERSION,
+                UTF8_NAMES,
+                STORED,
+                dos_time,
+                dos_date,
+                member.crc32,
+                member.size,
+                member.size,
+                len(name),
+                0,
+                0,
+                0,
+                0,
+                0,
+                offset,
+            )
+            central_directory += name
+            offset = self._add_segment(offset, local_header + name)
+            self._segments.append((offset, member.size, position))
+            offset += member.size
+
+        end_record = END_RECORD.pack(
+            END_RECORD_SIGNATURE, 0, 0, len(members), len(members), len(central_directory), offset, 0
+        )
+        offset = self._add_segment(offset, bytes(central_directory) + end_record)
+        if offset > MAX_SIZE:
+            raise ValueError("Archive exceeds 4 GiB")
+        self.total_size = offset
+        # The central directory records the name, size, CRC-32 and time of every member, so any
+        # change of the archive bytes, e.g. pages rendered with another encoder or DPI, changes it.
+        self.fingerprint = hashlib.sha256(central_directory).hexdigest()
+
+    def _add_segment(self, offset: int, data: bytes) -> int:
+        self._segments.append((offset, len(data), data))
+        return offset + len(data)
+
+    async def stream(self, start: int = 0, end: int | None = None) -> AsyncIterator[bytes | memoryview]:
+        """
+        Generate the bytes start..end (inclusive) of the archive.
+        """
+        if end is None:
+            end = self.total_size - 1
+        for offset, length, content in self._segments:
+            if offset + length <= start or length == 0:
+                continue
+            if offset > end:
+                break
+            if isinstance(content, int):
+                data = await self.read_member(content)
+                if len(data) != length:
+                    raise ValueError(f"Size of archive member {self.members[content].name} changed")
+            else:
+                data = content
+            yield data[max(start - offset, 0) : end - offset + 1]
+
+
+def parse_byte_range(range_header: str, total_size: int) -> tuple[int, int] | None:
+    """
+    Parse a single range ``Range`` header.
+
+    Args:
+        range_header (str): Value of the Range header, e.g. "bytes=100-".
+        total_size (int): Size of the whole representation.
+
+    Returns:
+        Optional[Tuple[int, int]]: The first and last byte of the range, or None if the header is
+        not a single byte range and the whole representation should be sent.
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    if not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        if int(last) == 0:
+            raise ValueError(f"Range {range_header} not satisfiable")
+        return max(total_size - int(last), 0), total_size - 1
+    start = int(first)
+    end = min(int(last), total_size - 1) if last else total_size - 1
+    if last and int(last) < start:
+        return None
+    if start >= total_size:
+        raise ValueError(f"Range {range_header} not satisfiable")
+    return start, end
@@ -0,0 +1,56 @@
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+
+from src.config import Settings
+from src.db.database import Database
+from src.dependencies import setup_logging
+from src.repositories.pdf_repository import PdfRepository
+from src.services.pdf_service import PdfService
+from src.services.shard_worker import ShardWorker
+from src.utils.blob_storage import AzureBlobManager
+from src.utils.metrics import MetricsRegistry
+from src.utils.render_pool import RenderWorkerPool
+from src.utils.tracing import shutdown_tracing
+
+logger = logging.getLogger(__name__)
+
+
+async def run_worker() -> None:
+    """
+    Run a standalone render node (``python -m src.worker``) that only takes shards from the queue.
+
+    Add nodes to make large documents convert faster; SIGTERM hands the shards in progress back
+    to the queue before the node exits.
+    """
+    db = Database()
+    await db.initialize()
+    metrics = MetricsRegistry()
+    blob_storage = AzureBlobManager(metrics=metrics)
+    if not await blob_storage.initialize():
+        raise RuntimeError("Azure Blob Storage initialization failed")
+    # A render node does not serve requests, so its render workers get every CPU.
+    render_pool = RenderWorkerPool(max_workers=Settings.RENDER_WORKERS or os.cpu_count() or 1)
+    await asyncio.to_thread(render_pool.start)
+
+    pdf_service = PdfService(PdfRepository(blob_storage=blob_storage, db=db), render_pool=render_pool, metrics=metrics)
+    worker_task = asyncio.create_task(ShardWorker(pdf_service).run())
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signal_number, worker_task.cancel)
+    try:
+        with contextlib.suppress(asyncio.CancelledError):
+            await worker_task
+    finally:
+        await asyncio.to_thread(render_pool.shutdown)
+        await blob_storage.close()
+        await db.close()
+        await asyncio.to_thread(shutdown_tracing)
+        logger.info("Shard worker stopped")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(run_worker())
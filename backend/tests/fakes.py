@@ -0,0 +1,72 @@
+from collections.abc import Callable
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import func
+
+from src.models.pydantic.response_model import PdfBlobResponse
+from src.utils.convert_pdf_to_image import RenderedPage
+from src.utils.convert_pdf_to_image import RenderStats
+from src.utils.convert_pdf_to_image import check_render_budget
+from src.utils.convert_pdf_to_image import get_page_count
+from src.utils.convert_pdf_to_image import page_digest
+from src.utils.convert_pdf_to_image import render_pages_measured
+
+
+def make_page(page_number: int, image_bytes: bytes | None = None) -> RenderedPage:
+    image_bytes = image_bytes if image_bytes is not None else f"page {page_number}".encode()
+    return RenderedPage(page_number, image_bytes, "JPEG", page_digest(image_bytes))
+
+
+async def make_stale(pdf_repository, hash_id: str) -> None:
+    """Age the last checkpoint of a conversion, as if the worker running it died an hour ago."""
+    await pdf_repository.update_conversion_task(hash_id, updated_at=func.now() - timedelta(hours=1))
+
+
+class FakeBlobStorage:
+    """In-memory stand-in for AzureBlobManager, for tests against a real database."""
+
+    container_name = "pdfs"
+
+    def __init__(self) -> None:
+        self.blobs: dict[str, bytes] = {}
+
+    async def get_file(self, blob_name: str) -> bytes:
+        return self.blobs[blob_name]
+
+    async def get_file_range(self, blob_name: str, offset: int, length: int) -> bytes:
+        return self.blobs[blob_name][offset : offset + length]
+
+    async def upload_file(self, file: bytes, file_name: str, content_type: str | None = None) -> PdfBlobResponse:
+        self.blobs[file_name] = bytes(file)
+        return PdfBlobResponse.success(
+            f"https://account.blob.core.windows.net/{self.container_name}/{file_name}",
+            "account.blob.core.windows.net",
+            self.container_name,
+            "account",
+            file_name,
+        )
+
+    async def delete_file(self, blob_name: str) -> bool:
+        return self.blobs.pop(blob_name, None) is not None
+
+
+class FakeRenderPool:
+    """Stand-in for RenderWorkerPool that "renders" a document of page_count pages without poppler."""
+
+    def __init__(self, page_count: int) -> None:
+        self.page_count = page_count
+        self.rendered_pages: list[int] = []
+        self.fail_on_page: int | None = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if func in (get_page_count, check_render_budget):
+            return self.page_count
+        if func is render_pages_measured:
+            _pdf_bytes, first_page, last_page = args
+            if self.fail_on_page is not None and first_page <= self.fail_on_page <= last_page:
+                raise RuntimeError(f"Page {self.fail_on_page} cannot be rendered")
+            pages = [make_page(page_number) for page_number in range(first_page, last_page + 1)]
+            self.rendered_pages.extend(page.page_number for page in pages)
+            return pages, RenderStats(pages=len(pages), seconds=0.01, memory_bytes=0)
+        raise NotImplementedError(func.__name__)
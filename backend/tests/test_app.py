@@ -1,12 +1,16 @@
+import hashlib
 import pytest
 import logging
 from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
-from src.db.database import db
 from src.utils.blob_storage import AzureBlobManager
 from src.app import create_app, lifespan
+from src.dependencies import get_pdf_service
+from src.models.pydantic.response_model import PdfResponse, StatusResponse
+from src.services.pdf_service import PdfService
+from src.utils.metrics import MetricsRegistry
 
 from dotenv import load_dotenv
 load_dotenv(override=True)
@@ -38,9 +42,11 @@ class TestAppCreation:
 
 @pytest.mark.asyncio
 class TestLifespan:
+    @patch('src.app.ShardWorker')
+    @patch('src.app.render_pool')
     @patch('src.app.blob_storage', new_callable=AsyncMock)
     @patch('src.app.db')  
-    async def test_lifespan_success_flow(self, mock_db, mock_blob_storage):
+    async def test_lifespan_success_flow(self, mock_db, mock_blob_storage, mock_render_pool, mock_shard_worker):
         """Test the successful flow of the lifespan function."""
         mock_app = MagicMock()
         mock_db.initialize = AsyncMock()
@@ -48,12 +54,267 @@ class TestLifespan:
         mock_db.close = AsyncMock()
         
         mock_blob_storage.initialize.return_value = True
+        mock_shard_worker.return_value.run = AsyncMock()
         
         async with lifespan(mock_app):
             pass
         
         mock_db.initialize.assert_called_once()
-        mock_db.create_tables.assert_called_once()
+        mock_db.create_tables.assert_not_called()
         mock_blob_storage.initialize.assert_called_once()
+        mock_render_pool.start.assert_called_once()
+        mock_render_pool.shutdown.assert_called_once()
+        mock_shard_worker.return_value.run.assert_called_once()
         mock_db.close.assert_called_once()
-        assert hasattr(mock_app.state, 'blob_storage')
\ No newline at end of file
+        assert hasattr(mock_app.state, 'blob_storage')
+
+
+class TestHealthProbes:
+    @pytest.fixture
+    def probe_client(self, app):
+        """Test client with mocked dependencies in app state, without running the lifespan."""
+        app.state.db = MagicMock(ping=AsyncMock())
+        app.state.blob_storage = MagicMock(check_health=AsyncMock())
+        app.state.render_pool = MagicMock(is_ready=True)
+        return TestClient(app)
+
+    def test_livez(self, probe_client):
+        """Test that the liveness probe answers without touching dependencies."""
+        response = probe_client.get("/livez")
+
+        assert response.status_code == 200
+        probe_client.app.state.db.ping.assert_not_called()
+
+    def test_readyz_when_all_dependencies_are_available(self, probe_client):
+        """Test that the readiness probe passes when every check passes."""
+        response = probe_client.get("/readyz")
+
+        assert response.status_code == 200
+        assert response.json()["checks"] == {"database": "ok", "storage": "ok", "render_pool": "ok"}
+
+    def test_readyz_reports_failed_dependencies(self, probe_client):
+        """Test that the readiness probe fails and names the check when storage is unreachable."""
+        probe_client.app.state.blob_storage.check_health.side_effect = RuntimeError("Blob Storage is not initialized")
+        probe_client.app.state.render_pool.is_ready = False
+
+        response = probe_client.get("/readyz")
+
+        assert response.status_code == 503
+        checks = response.json()["checks"]
+        assert checks["database"] == "ok"
+        assert checks["storage"] == "error: Blob Storage is not initialized"
+        assert checks["render_pool"] == "not ready"
+
+
+class TestHashPreflight:
+    PDF = b"%PDF-1.4 test document"
+    PDF_HASH = hashlib.sha256(PDF).hexdigest()
+
+    @pytest.fixture
+    def preflight_client(self, app):
+        """Test client with a mocked PDF service, without running the lifespan."""
+        pdf_service = MagicMock(
+            get_task_status=AsyncMock(),
+            already_exists_by_hash=AsyncMock(return_value=PdfResponse.not_found(self.PDF_HASH)),
+            convert_inline=AsyncMock(return_value=None),
+            process_pdf_conversion=AsyncMock(),
+        )
+        pdf_service.read_upload = AsyncMock(return_value=(self.PDF, self.PDF_HASH))
+        app.dependency_overrides[get_pdf_service] = lambda: pdf_service
+        return TestClient(app), pdf_service
+
+    def test_head_unknown_document(self, preflight_client):
+        """Test that HEAD answers 404 without a body for a hash the service does not know."""
+        client, pdf_service = preflight_client
+        pdf_service.get_task_status.return_value = StatusResponse(status="not_found", hash_id=self.PDF_HASH)
+
+        response = client.head(f"/api/documents/by-hash/{self.PDF_HASH}")
+
+        assert response.status_code == 404
+        assert response.headers["X-Document-Status"] == "not_found"
+        assert response.content == b""
+
+    def test_get_completed_document(self, preflight_client):
+        """Test that GET reports the state and page count of a converted document."""
+        client, pdf_service = preflight_client
+        pdf_service.get_task_status.return_value = StatusResponse(
+            status="completed", hash_id=self.PDF_HASH, page_count=3
+        )
+
+        response = client.get(f"/api/documents/by-hash/{self.PDF_HASH.upper()}")
+
+        assert response.status_code == 200
+        assert response.json() == {"hash_id": self.PDF_HASH, "exists": True, "status": "completed", "page_count": 3}
+        assert response.headers["X-Page-Count"] == "3"
+        pdf_service.get_task_status.assert_awaited_once_with(self.PDF_HASH, touch=False)
+
+    def test_get_rejects_malformed_hash(self, preflight_client):
+        """Test that a value that is not a SHA-256 digest is rejected before the service is asked."""
+        client, pdf_service = preflight_client
+
+        response = client.get("/api/documents/by-hash/not-a-hash")
+
+        assert response.status_code == 400
+        pdf_service.get_task_status.assert_not_called()
+
+    def test_upload_with_known_hash_is_not_read(self, preflight_client):
+        """Test that an upload whose claimed hash is cached is answered without reading the file."""
+        client, pdf_service = preflight_client
+        pdf_service.already_exists_by_hash.return_value = PdfResponse.success(self.PDF_HASH, "blob-url")
+
+        response = client.post(
+            "/api/convert-pdf-to-image/",
+            files={"file": ("doc.pdf", self.PDF, "application/pdf")},
+            headers={"X-Content-SHA256": self.PDF_HASH},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "already_exists"
+        pdf_service.read_upload.assert_not_called()
+
+    def test_upload_with_mismatched_hash(self, preflight_client):
+        """Test that an upload whose content does not match the claimed hash is rejected."""
+        client, pdf_service = preflight_client
+        pdf_service.already_exists_by_hash.return_value = PdfResponse.not_found("0" * 64)
+
+        response = client.post(
+            "/api/convert-pdf-to-image/",
+            files={"file": ("doc.pdf", self.PDF, "application/pdf")},
+            headers={"X-Content-SHA256": "0" * 64},
+        )
+
+        assert response.status_code == 400
+        pdf_service.process_pdf_conversion.assert_not_called()
+
+    def test_small_upload_is_converted_inline(self, preflight_client):
+        """Test that a document converted within the request is returned with the paths of its pages."""
+        client, pdf_service = preflight_client
+        pdf_service.convert_inline.return_value = StatusResponse(
+            status="completed", hash_id=self.PDF_HASH, page_count=2
+        )
+
+        response = client.post(
+            "/api/convert-pdf-to-image/", files={"file": ("doc.pdf", self.PDF, "application/pdf")}
+        )
+
+        assert response.json()["status"] == "completed"
+        assert response.json()["pages"] == [
+            f"/api/documents/{self.PDF_HASH}/pages/1",
+            f"/api/documents/{self.PDF_HASH}/pages/2",
+        ]
+        pdf_service.process_pdf_conversion.assert_not_called()
+
+    def test_large_upload_is_converted_in_background(self, preflight_client):
+        """Test that a document too large for the inline path is handed to a background task."""
+        client, pdf_service = preflight_client
+
+        response = client.post(
+            "/api/convert-pdf-to-image/", files={"file": ("doc.pdf", self.PDF, "application/pdf")}
+        )
+
+        assert response.json() == {
+            "message": "PDF conversion started in background",
+            "status": "processing",
+            "hash_id": self.PDF_HASH,
+        }
+        pdf_service.process_pdf_conversion.assert_awaited_once_with(self.PDF, self.PDF_HASH)
+
+    def test_unreadable_upload_fails_without_a_server_error(self, app):
+        """Test that a corrupt PDF is answered with a failed status instead of a 500."""
+        conversion_task = MagicMock(status="pending", message=None)
+
+        async def update_conversion_task(hash_id, **values):
+            for name, value in values.items():
+                setattr(conversion_task, name, value)
+
+        pdf_repository = MagicMock(
+            get_pdf_blob_storage_url_by_hash=AsyncMock(return_value=PdfResponse.not_found(self.PDF_HASH)),
+            claim_conversion_task=AsyncMock(return_value=True),
+            update_conversion_task=AsyncMock(side_effect=update_conversion_task),
+            get_conversion_task=AsyncMock(return_value=conversion_task),
+        )
+        render_pool = MagicMock(run=AsyncMock(side_effect=RuntimeError("Unable to get page count.")))
+        pdf_service = PdfService(pdf_repository, render_pool=render_pool, metrics=MetricsRegistry())
+        app.dependency_overrides[get_pdf_service] = lambda: pdf_service
+
+        response = TestClient(app).post(
+            "/api/convert-pdf-to-image/", files={"file": ("doc.pdf", self.PDF, "application/pdf")}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "message": "Unable to get page count.",
+            "status": "failed",
+            "hash_id": self.PDF_HASH,
+        }
+
+
+class TestCancelTask:
+    HASH = "b" * 64
+
+    @pytest.fixture
+    def cancel_client(self, app):
+        """Test client with a mocked PDF service, without running the lifespan."""
+        pdf_service = MagicMock(cancel_task=AsyncMock())
+        app.dependency_overrides[get_pdf_service] = lambda: pdf_service
+        return TestClient(app), pdf_service
+
+    def test_last_client_cancels_the_conversion(self, cancel_client):
+        """Test that cancelling a conversion nobody else waits for answers 200."""
+        client, pdf_service = cancel_client
+        pdf_service.cancel_task.return_value = StatusResponse(
+            status="cancelled", hash_id=self.HASH, message="Cancelled by the client"
+        )
+
+        response = client.delete(f"/api/task/{self.HASH}")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelled"
+
+    def test_conversion_continues_for_other_clients(self, cancel_client):
+        """Test that the conversion keeps running while other clients wait for it."""
+        client, pdf_service = cancel_client
+        pdf_service.cancel_task.return_value = StatusResponse(status="pending", hash_id=self.HASH)
+
+        assert client.delete(f"/api/task/{self.HASH}").status_code == 202
+
+    def test_finished_conversion_cannot_be_cancelled(self, cancel_client):
+        """Test that cancelling a completed conversion is refused."""
+        client, pdf_service = cancel_client
+        pdf_service.cancel_task.return_value = StatusResponse(status="completed", hash_id=self.HASH)
+
+        response = client.delete(f"/api/task/{self.HASH}")
+
+        assert response.status_code == 409
+        assert response.json() == {"error": "Task already completed"}
+
+
+class TestPageCaching:
+    HASH = "c" * 64
+
+    @pytest.fixture
+    def page_client(self, app):
+        """Test client with a mocked PDF service, without running the lifespan."""
+        pdf_service = MagicMock(get_page_image=AsyncMock(return_value=(b"page 1", "image/jpeg", "d" * 64)))
+        app.dependency_overrides[get_pdf_service] = lambda: pdf_service
+        return TestClient(app), pdf_service
+
+    def test_etag_follows_the_page_image(self, page_client):
+        """Test that the ETag of a page changes when the stored image does, e.g. with another encoder profile."""
+        client, pdf_service = page_client
+
+        etag = client.get(f"/api/documents/{self.HASH}/pages/1").headers["ETag"]
+        pdf_service.get_page_image.return_value = (b"page 1 as webp", "image/webp", "e" * 64)
+
+        assert etag == f'"{self.HASH}-1-{"d" * 16}"'
+        assert client.get(f"/api/documents/{self.HASH}/pages/1").headers["ETag"] != etag
+
+    def test_unchanged_page_is_not_sent_again(self, page_client):
+        """Test that a page whose ETag the client already has is answered with 304."""
+        client, _pdf_service = page_client
+        etag = f'"{self.HASH}-1-{"d" * 16}"'
+
+        response = client.get(f"/api/documents/{self.HASH}/pages/1", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
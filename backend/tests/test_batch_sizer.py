@@ -0,0 +1,64 @@
+from src.utils.batch_sizer import AdaptiveBatchSizer
+from src.utils.batch_sizer import iter_adaptive_page_ranges
+from src.utils.convert_pdf_to_image import RenderStats
+
+MB = 1024 * 1024
+
+
+def make_sizer(**overrides) -> AdaptiveBatchSizer:
+    options = dict(initial_size=10, min_size=1, max_size=50, target_seconds=5, target_memory_bytes=500 * MB)
+    options.update(overrides)
+    return AdaptiveBatchSizer(**options)
+
+
+class TestAdaptiveBatchSizer:
+    def test_slow_pages_shrink_the_batch_at_once(self):
+        """Test that a batch over the latency target shrinks the next one to the size that fits it."""
+        sizer = make_sizer()
+
+        assert sizer.record(RenderStats(pages=10, seconds=20, memory_bytes=10 * MB)) == 2
+
+    def test_heavy_pages_shrink_the_batch_at_once(self):
+        """Test that a batch over the memory target shrinks the next one to the size that fits it."""
+        sizer = make_sizer()
+
+        assert sizer.record(RenderStats(pages=10, seconds=1, memory_bytes=1000 * MB)) == 5
+
+    def test_light_pages_grow_the_batch_gradually(self):
+        """Test that the batch size at most doubles per batch when pages are cheap."""
+        sizer = make_sizer()
+        light_batch = RenderStats(pages=10, seconds=0.1, memory_bytes=1 * MB)
+
+        assert [sizer.record(light_batch) for _ in range(4)] == [20, 40, 50, 50]
+
+    def test_size_stays_within_bounds(self):
+        """Test that the batch size never leaves the configured bounds."""
+        sizer = make_sizer(min_size=3)
+
+        assert sizer.record(RenderStats(pages=10, seconds=500, memory_bytes=0)) == 3
+
+    def test_unmeasured_batch_keeps_the_size(self):
+        """Test that a batch without time or memory measurements does not change the size."""
+        sizer = make_sizer()
+
+        assert sizer.record(RenderStats(pages=0, seconds=0, memory_bytes=0)) == 10
+        assert sizer.record(RenderStats(pages=10, seconds=0, memory_bytes=0)) == 10
+
+
+class TestAdaptivePageRanges:
+    def test_ranges_follow_the_current_size(self):
+        """Test that every range is cut with the size recorded after the previous one."""
+        sizer = make_sizer(initial_size=2)
+        ranges = iter_adaptive_page_ranges(list(range(1, 11)), sizer)
+
+        assert next(ranges) == (1, 2)
+        sizer.batch_size = 5
+        assert next(ranges) == (3, 7)
+        sizer.batch_size = 1
+        assert list(ranges) == [(8, 8), (9, 9), (10, 10)]
+
+    def test_ranges_break_at_gaps(self):
+        """Test that pages already rendered split the remaining ones into contiguous ranges."""
+        sizer = make_sizer(initial_size=10)
+
+        assert list(iter_adaptive_page_ranges([1, 2, 3, 7, 8, 12], sizer)) == [(1, 3), (7, 8), (12, 12)]
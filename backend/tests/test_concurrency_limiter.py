@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+from azure.core.exceptions import ServiceRequestError
+
+from src.utils.concurrency_limiter import AdaptiveConcurrencyLimiter
+from src.utils.concurrency_limiter import is_throttling_error
+from src.utils.metrics import MetricsRegistry
+
+
+class ThrottledError(Exception):
+    status_code = 503
+
+
+class FakeBlobService:
+    """In-memory stand-in for Blob Storage that throttles every operation over its capacity."""
+
+    def __init__(self, capacity: int, latency: float = 0.002) -> None:
+        self.capacity = capacity
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+
+    async def operation(self) -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            throttled = self.in_flight > self.capacity
+            await asyncio.sleep(self.latency)
+            if throttled:
+                raise ThrottledError("Server Busy")
+            self.completed += 1
+            return "ok"
+        finally:
+            self.in_flight -= 1
+
+
+def make_limiter(**overrides) -> AdaptiveConcurrencyLimiter:
+    options = dict(
+        initial_limit=4,
+        min_limit=1,
+        max_limit=64,
+        backoff_ratio=0.5,
+        max_retries=3,
+        retry_base_delay=0.001,
+        retry_max_delay=0.01,
+        metrics=MetricsRegistry(),
+    )
+    options.update(overrides)
+    return AdaptiveConcurrencyLimiter("blob", **options)
+
+
+@pytest.mark.asyncio
+class TestAdaptiveConcurrencyLimiter:
+    async def test_limit_grows_while_operations_succeed(self):
+        """Test that the limit grows by about one per round of limit successful operations."""
+        limiter = make_limiter(initial_limit=4)
+        service = FakeBlobService(capacity=100)
+
+        for _ in range(4):
+            await limiter.run(service.operation)
+
+        assert int(limiter.limit) == 4
+        assert limiter.limit > 4.9
+        assert limiter.metrics.snapshot()["summaries"]["blob_latency_seconds"]["count"] == 4
+
+    async def test_limit_never_exceeds_the_maximum(self):
+        """Test that the limit stops growing at max_limit, and the operations in flight stay under it."""
+        limiter = make_limiter(initial_limit=2, max_limit=4)
+        service = FakeBlobService(capacity=100)
+
+        await asyncio.gather(*(limiter.run(service.operation) for _ in range(200)))
+
+        assert limiter.limit == 4
+        assert service.max_in_flight <= 4
+
+    async def test_burst_of_throttling_decreases_the_limit_once(self):
+        """Test that operations throttled together halve the limit once, not once per error."""
+        limiter = make_limiter(initial_limit=16, max_retries=0)
+        service = FakeBlobService(capacity=0)
+
+        results = await asyncio.gather(*(limiter.run(service.operation) for _ in range(16)), return_exceptions=True)
+
+        assert all(isinstance(result, ThrottledError) for result in results)
+        assert int(limiter.limit) == 8
+        assert limiter.metrics.snapshot()["counters"]["blob_throttled_total"] == 16
+
+    async def test_throughput_converges_to_the_storage_capacity(self):
+        """Test that a burst far over the capacity completes without errors and settles near the capacity."""
+        limiter = make_limiter(initial_limit=32, max_retries=8)
+        service = FakeBlobService(capacity=8)
+
+        results = await asyncio.gather(*(limiter.run(service.operation) for _ in range(300)))
+
+        assert results == ["ok"] * 300
+        assert 4 <= int(limiter.limit) <= 10
+        counters = limiter.metrics.snapshot()["counters"]
+        # Throttling is a signal to back off, not a storm: a small share of the operations.
+        assert counters["blob_throttled_total"] < 60
+        assert "blob_retries_exhausted_total" not in counters
+        assert limiter.metrics.snapshot()["gauges"]["blob_concurrency_limit"] == int(limiter.limit)
+
+    async def test_retries_are_bounded(self):
+        """Test that an operation throttled on every attempt fails after max_retries retries."""
+        limiter = make_limiter(max_retries=2)
+        attempts = 0
+
+        async def always_throttled() -> None:
+            nonlocal attempts
+            attempts += 1
+            raise ThrottledError("Too Many Requests")
+
+        with pytest.raises(ThrottledError):
+            await limiter.run(always_throttled)
+
+        assert attempts == 3
+        counters = limiter.metrics.snapshot()["counters"]
+        assert counters["blob_retries_total"] == 2
+        assert counters["blob_retries_exhausted_total"] == 1
+        assert limiter.in_flight == 0
+
+    async def test_other_errors_are_not_retried(self):
+        """Test that an error that is not throttling is raised at once and leaves the limit alone."""
+        limiter = make_limiter(initial_limit=4)
+        attempts = 0
+
+        async def missing_blob() -> None:
+            nonlocal attempts
+            attempts += 1
+            raise ResourceNotFoundError("The specified blob does not exist.")
+
+        with pytest.raises(ResourceNotFoundError):
+            await limiter.run(missing_blob)
+
+        assert attempts == 1
+        assert limiter.limit == 4
+        assert limiter.in_flight == 0
+
+    async def test_cancelled_waiters_do_not_leak_slots(self):
+        """Test that operations cancelled while queued or running give their slot back."""
+        limiter = make_limiter(initial_limit=1)
+        release = asyncio.Event()
+
+        async def blocked() -> None:
+            await release.wait()
+
+        running = asyncio.create_task(limiter.run(blocked))
+        queued = asyncio.create_task(limiter.run(blocked))
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 1
+
+        queued.cancel()
+        running.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+
+        assert limiter.in_flight == 0
+        assert await limiter.run(FakeBlobService(capacity=1).operation) == "ok"
+
+
+class TestThrottlingErrors:
+    @pytest.mark.parametrize(
+        ("error", "throttled"),
+        [
+            (ThrottledError("Server Busy"), True),
+            (ServiceRequestError("Connection reset"), True),
+            (ResourceNotFoundError("Not found"), False),
+            (ValueError("bad argument"), False),
+        ],
+    )
+    def test_classification(self, error, throttled):
+        """Test that throttling statuses and connection errors are recognised as throttling."""
+        assert is_throttling_error(error) is throttled
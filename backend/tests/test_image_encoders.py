@@ -0,0 +1,98 @@
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from src.utils.image_encoders import PillowEncoder
+from src.utils.image_encoders import PopplerJpegEncoder
+from src.utils.image_encoders import WebPEncoder
+from src.utils.image_encoders import get_encoder
+
+PAGE_SIZE = (85, 110)
+
+
+def fake_page(page_number: int) -> Image.Image:
+    return Image.new("RGB", PAGE_SIZE, color=(page_number * 40, 255, 255))
+
+
+@pytest.fixture
+def convert_from_bytes(monkeypatch):
+    """Replace pdftoppm: PPM pages become PIL images, JPEG pages files in the output folder."""
+    calls = []
+
+    def fake_convert_from_bytes(pdf_bytes, dpi, first_page, last_page, fmt, thread_count, **kwargs):
+        calls.append({"dpi": dpi, "first_page": first_page, "last_page": last_page, "fmt": fmt, **kwargs})
+        pages = [fake_page(page_number) for page_number in range(first_page, last_page + 1)]
+        if not kwargs.get("paths_only"):
+            return pages
+        paths = []
+        for page_number, page in enumerate(pages, start=first_page):
+            path = os.path.join(kwargs["output_folder"], f"page-{page_number}.jpg")
+            page.save(path, format="JPEG", quality=kwargs["jpegopt"]["quality"])
+            paths.append(path)
+        return paths
+
+    monkeypatch.setattr("pdf2image.convert_from_bytes", fake_convert_from_bytes)
+    return calls
+
+
+class TestGetEncoder:
+    @pytest.mark.parametrize(
+        ("name", "encoder_class"), [("poppler", PopplerJpegEncoder), ("pillow", PillowEncoder), ("webp", WebPEncoder)]
+    )
+    def test_registered_encoders(self, name, encoder_class):
+        """Test that every backend is created by its name with the requested quality."""
+        encoder = get_encoder(name, 30)
+
+        assert type(encoder) is encoder_class
+        assert encoder.quality == 30
+
+    def test_unknown_encoder(self):
+        """Test that an unknown backend name is rejected with the available names."""
+        with pytest.raises(ValueError, match="Unknown image encoder 'avif'.*poppler"):
+            get_encoder("avif", 25)
+
+    @pytest.mark.parametrize("quality", [0, -5, 101])
+    def test_invalid_quality(self, quality):
+        """Test that a quality outside 1-100 is rejected."""
+        with pytest.raises(ValueError, match="between 1 and 100"):
+            get_encoder("pillow", quality)
+
+    def test_profile_distinguishes_encoders(self):
+        """Test that the profile, part of every page digest, differs per backend and quality."""
+        profiles = {
+            get_encoder(name, quality).profile for name in ("poppler", "pillow", "webp") for quality in (25, 80)
+        }
+
+        assert len(profiles) == 6
+
+
+class TestEncoders:
+    def test_poppler_reads_the_jpeg_files(self, convert_from_bytes):
+        """Test that pdftoppm's JPEG files are returned as they are and removed."""
+        pages = PopplerJpegEncoder(40).render(b"%PDF", 2, 3, dpi=100)
+
+        assert len(pages) == 2
+        assert all(page.startswith(b"\xff\xd8") for page in pages)
+        assert convert_from_bytes[0]["fmt"] == "jpeg"
+        assert convert_from_bytes[0]["jpegopt"]["quality"] == 40
+        assert not os.path.exists(convert_from_bytes[0]["output_folder"])
+
+    def test_pillow_encodes_jpeg_once(self, convert_from_bytes):
+        """Test that raw PPM pages are encoded to JPEG by Pillow, in page order."""
+        pages = PillowEncoder(90).render(b"%PDF", 1, 3, dpi=100)
+
+        assert convert_from_bytes == [{"dpi": 100, "first_page": 1, "last_page": 3, "fmt": "ppm"}]
+        images = [Image.open(BytesIO(page)) for page in pages]
+        assert [image.format for image in images] == ["JPEG"] * 3
+        assert all(image.size == PAGE_SIZE for image in images)
+        assert [image.convert("RGB").getpixel((40, 50))[0] for image in images] == pytest.approx([40, 80, 120], abs=8)
+
+    def test_webp(self, convert_from_bytes):
+        """Test that the WebP backend produces WebP images."""
+        pages = WebPEncoder(50).render(b"%PDF", 1, 2, dpi=100)
+
+        images = [Image.open(BytesIO(page)) for page in pages]
+        assert [image.format for image in images] == ["WEBP"] * 2
+        assert all(image.size == PAGE_SIZE for image in images)
@@ -0,0 +1,112 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy import text
+
+from src.db import init_db
+from src.db.migrations import MIGRATIONS
+from src.db.migrations import run_migrations
+from src.models.db.document_page import DocumentPage
+from src.models.db.page_blob import PageBlob
+from src.models.db.pdf_document import PdfDocument
+
+# The schema as created by create_all before pdf_documents and document_pages gained columns.
+EARLY_SCHEMA = (
+    """
+    CREATE TABLE pdf_documents (
+        hash_id VARCHAR(64) PRIMARY KEY,
+        blob_url VARCHAR(2000) NOT NULL,
+        container_name VARCHAR(100) NOT NULL,
+        host_name VARCHAR(255) NOT NULL,
+        is_active BOOLEAN NOT NULL DEFAULT true,
+        created_at TIMESTAMP NOT NULL DEFAULT now(),
+        updated_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE conversion_tasks (
+        hash_id VARCHAR(64) PRIMARY KEY,
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        total_pages INTEGER,
+        completed_pages INTEGER NOT NULL DEFAULT 0,
+        message VARCHAR(2000),
+        created_at TIMESTAMP NOT NULL DEFAULT now(),
+        updated_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE document_pages (
+        hash_id VARCHAR(64) REFERENCES conversion_tasks (hash_id) ON DELETE CASCADE,
+        page_number INTEGER,
+        blob_name VARCHAR(2000) NOT NULL,
+        image_format VARCHAR(10) NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT now(),
+        PRIMARY KEY (hash_id, page_number)
+    )
+    """,
+    "INSERT INTO pdf_documents (hash_id, blob_url, container_name, host_name) VALUES ('legacy', 'url', 'pdfs', 'host')",
+    "INSERT INTO conversion_tasks (hash_id, status, total_pages, completed_pages) VALUES ('paged', 'pending', 2, 1)",
+    """
+    INSERT INTO document_pages (hash_id, page_number, blob_name, image_format, size_bytes)
+    VALUES ('paged', 1, 'pages/paged/1.jpeg', 'JPEG', 100)
+    """,
+)
+
+
+async def create_early_schema(connection) -> None:
+    await connection.execute(text("DROP SCHEMA public CASCADE"))
+    await connection.execute(text("CREATE SCHEMA public"))
+    for statement in EARLY_SCHEMA:
+        await connection.execute(text(statement))
+
+
+@pytest.mark.asyncio
+class TestMigrations:
+    async def test_fresh_database_is_up_to_date(self, db):
+        """Test that a database created from the models records every migration and has none pending."""
+        async with db.engine.begin() as connection:
+            applied = await run_migrations(connection)
+            versions = (await connection.execute(text("SELECT version FROM schema_migrations"))).scalars().all()
+
+        assert applied == []
+        assert sorted(versions) == [migration.version for migration in MIGRATIONS]
+
+    async def test_early_schema_is_upgraded(self, db):
+        """Test that tables created before the new columns are altered in place, keeping their rows."""
+        async with db.engine.begin() as connection:
+            await create_early_schema(connection)
+            applied = await run_migrations(connection)
+
+        assert applied == [migration.version for migration in MIGRATIONS]
+        async with db.get_session() as session:
+            document = await session.get(PdfDocument, "legacy")
+            page = (await session.execute(select(DocumentPage))).scalar_one()
+            page_blob = await session.get(PageBlob, page.digest)
+
+        assert document.storage_format == "legacy"
+        assert document.page_count is None
+        assert document.last_accessed_at is not None
+        assert page.crc32 is None
+        assert page_blob.blob_name == "pages/paged/1.jpeg"
+        assert page_blob.ref_count == 1
+
+        async with db.engine.begin() as connection:
+            assert await run_migrations(connection) == []
+
+    async def test_init_step_migrates_the_database(self, db, monkeypatch):
+        """Test that the deployment init step upgrades an existing database, not only creates missing tables."""
+        async with db.engine.begin() as connection:
+            await create_early_schema(connection)
+        blob_storage = AsyncMock()
+        blob_storage.initialize.return_value = True
+        monkeypatch.setattr(init_db, "Database", lambda: db)
+        monkeypatch.setattr(init_db, "AzureBlobManager", lambda: blob_storage)
+
+        await init_db.init_db()
+
+        async with db.get_session() as session:
+            document = await session.get(PdfDocument, "legacy")
+        assert document.storage_format == "legacy"
+        blob_storage.initialize.assert_awaited_once_with(create_container=True)
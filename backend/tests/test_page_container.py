@@ -0,0 +1,53 @@
+import zlib
+
+import pytest
+
+from src.utils.page_container import ContainerHeader
+from src.utils.page_container import HEADER
+from src.utils.page_container import MappedPageContainer
+from src.utils.page_container import PageContainerError
+from src.utils.page_container import build_container
+from src.utils.page_container import parse_header
+from src.utils.page_container import parse_index
+
+PAGES = [(2, b"second page"), (1, b"first"), (3, b"")]
+
+
+class TestPageContainer:
+    def test_header_and_index_describe_every_page(self):
+        """Test that the index locates each page image inside the container."""
+        container = build_container(PAGES, "JPEG")
+
+        header = parse_header(container)
+        index = parse_index(container, header, header.index_offset)
+
+        assert header == ContainerHeader("JPEG", 3)
+        for page_number, image_bytes in PAGES:
+            entry = index[page_number]
+            assert container[entry.offset : entry.offset + entry.length] == image_bytes
+            assert entry.crc32 == zlib.crc32(image_bytes)
+
+    def test_index_can_be_parsed_from_a_ranged_read(self):
+        """Test that the index parses from only its own bytes, as fetched by a range request."""
+        container = build_container(PAGES, "JPEG")
+        header = parse_header(container[: HEADER.size])
+
+        index_bytes = container[header.index_offset : header.index_offset + header.index_size]
+
+        assert parse_index(index_bytes, header) == parse_index(container, header, header.index_offset)
+
+    def test_rejects_other_files(self):
+        """Test that arbitrary bytes are not mistaken for a container."""
+        with pytest.raises(PageContainerError):
+            parse_header(b"%PDF-1.4" + bytes(HEADER.size))
+
+    def test_mapped_container_returns_pages_without_copying(self, tmp_path):
+        """Test that a container on disk serves pages as views of the mapping."""
+        path = tmp_path / "document.pages"
+        path.write_bytes(build_container(PAGES, "JPEG"))
+
+        with MappedPageContainer(path) as container:
+            page = container.get_page(2)
+            assert isinstance(page, memoryview)
+            assert page == b"second page"
+            page.release()
@@ -0,0 +1,370 @@
+import base64
+import json
+import zlib
+from datetime import timedelta
+
+import pytest
+from fakes import make_page
+from fakes import make_stale
+from sqlalchemy import func
+from sqlalchemy import update
+
+from src.models.db.conversion_shard import ConversionShard
+from src.models.db.page_blob import PageBlob
+from src.models.db.pdf_document import PdfDocument
+
+HASH_ID = "a" * 64
+OTHER_HASH_ID = "c" * 64
+THIRD_HASH_ID = "d" * 64
+
+
+@pytest.mark.asyncio
+class TestClaimConversionTask:
+    async def test_first_claim_wins(self, pdf_repository):
+        """Test that only the first of two claims of a running conversion owns it."""
+        assert await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300) is True
+        assert await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300) is False
+
+        conversion_task = await pdf_repository.get_conversion_task(HASH_ID, primary=True)
+        assert conversion_task.status == "pending"
+        assert conversion_task.waiters == 1
+
+    async def test_stale_conversion_is_taken_over(self, pdf_repository):
+        """Test that a pending conversion without recent progress can be claimed, keeping its waiters."""
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await make_stale(pdf_repository, HASH_ID)
+
+        assert await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300) is True
+
+        conversion_task = await pdf_repository.get_conversion_task(HASH_ID, primary=True)
+        assert conversion_task.status == "pending"
+        assert conversion_task.waiters == 2
+
+    async def test_failed_conversion_starts_over(self, pdf_repository):
+        """Test that a failed conversion can be claimed again and its message and waiters are reset."""
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await pdf_repository.update_conversion_task(HASH_ID, status="failed", message="pdftoppm crashed", waiters=3)
+
+        assert await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300) is True
+
+        conversion_task = await pdf_repository.get_conversion_task(HASH_ID, primary=True)
+        assert conversion_task.status == "pending"
+        assert conversion_task.message is None
+        assert conversion_task.waiters == 1
+
+
+@pytest.mark.asyncio
+class TestConversionCancellation:
+    async def test_cancel_withdraws_one_waiter(self, pdf_repository):
+        """Test that a cancellation only stops the conversion once its last waiter has withdrawn."""
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await pdf_repository.add_conversion_waiter(HASH_ID)
+
+        conversion_task = await pdf_repository.cancel_conversion_task(HASH_ID)
+        assert conversion_task.status == "pending"
+        assert conversion_task.waiters == 1
+        assert await pdf_repository.is_conversion_cancelled(HASH_ID, abandoned_after_seconds=0) is False
+
+        conversion_task = await pdf_repository.cancel_conversion_task(HASH_ID)
+        assert conversion_task.status == "cancelled"
+        assert conversion_task.waiters == 0
+        assert conversion_task.message == "Cancelled by the client"
+        assert await pdf_repository.is_conversion_cancelled(HASH_ID, abandoned_after_seconds=0) is True
+
+    async def test_cancel_of_a_finished_conversion(self, pdf_repository):
+        """Test that a conversion that is not running cannot be cancelled."""
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await pdf_repository.update_conversion_task(HASH_ID, status="completed")
+
+        assert await pdf_repository.cancel_conversion_task(HASH_ID) is None
+        assert (await pdf_repository.get_conversion_task(HASH_ID, primary=True)).status == "completed"
+
+    async def test_conversion_abandoned_by_its_clients(self, pdf_repository):
+        """Test that a conversion whose clients stopped polling is cancelled, unlike one nobody ever polled."""
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await pdf_repository.claim_conversion_task(OTHER_HASH_ID, stale_after_seconds=300)
+        await pdf_repository.touch_conversion_task(HASH_ID)
+        assert await pdf_repository.is_conversion_cancelled(HASH_ID, abandoned_after_seconds=60) is False
+
+        await pdf_repository.update_conversion_task(HASH_ID, last_polled_at=func.now() - timedelta(minutes=5))
+
+        assert await pdf_repository.is_conversion_cancelled(HASH_ID, abandoned_after_seconds=0) is False
+        assert await pdf_repository.is_conversion_cancelled(HASH_ID, abandoned_after_seconds=60) is True
+        assert await pdf_repository.is_conversion_cancelled(OTHER_HASH_ID, abandoned_after_seconds=60) is False
+        conversion_task = await pdf_repository.get_conversion_task(HASH_ID, primary=True)
+        assert conversion_task.status == "cancelled"
+        assert conversion_task.message == "Cancelled, no client is waiting"
+
+    async def test_interrupted_shard_keeps_its_attempts(self, pdf_repository):
+        """Test that a shard released without counting the attempt is queued again with its attempts unchanged."""
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await pdf_repository.create_conversion_shards(HASH_ID, [(1, 2)])
+
+        shard = await pdf_repository.claim_conversion_shard("worker-1", stale_after_seconds=300)
+        await pdf_repository.release_conversion_shard(shard, "Conversion cancelled", count_attempt=False)
+        shard = await pdf_repository.claim_conversion_shard("worker-1", stale_after_seconds=300)
+        await pdf_repository.release_conversion_shard(shard, "Render worker crashed")
+
+        async with pdf_repository.db.get_session() as session:
+            shard = await session.get(ConversionShard, (HASH_ID, 1))
+        assert shard.status == "pending"
+        assert shard.attempts == 1
+        assert shard.claimed_by is None
+        assert shard.message == "Render worker crashed"
+
+
+@pytest.mark.asyncio
+class TestSavePdfDocumentHash:
+    async def test_second_save_is_ignored(self, pdf_repository, blob_storage):
+        """Test that saving a document twice, e.g. after a stale takeover, keeps the first record."""
+        pdf_blob_response = await blob_storage.upload_file(b"[]", HASH_ID)
+
+        first = await pdf_repository.save_pdf_document_hash(pdf_blob_response, page_count=2, size_bytes=10)
+        second = await pdf_repository.save_pdf_document_hash(pdf_blob_response, page_count=3, size_bytes=20)
+
+        assert first.hash_id == HASH_ID
+        assert second is None
+        document = await pdf_repository.get_pdf_document(HASH_ID, primary=True)
+        assert document.page_count == 2
+
+
+@pytest.mark.asyncio
+class TestLegacyDocuments:
+    async def save_legacy_document(self, pdf_repository, blob_storage) -> None:
+        """A document converted before page rows existed: base64 pages in one JSON blob, no page count."""
+        pages = [
+            {
+                "page": page_number,
+                "image_data": base64.b64encode(f"page {page_number}".encode()).decode(),
+                "format": "JPEG",
+            }
+            for page_number in (1, 2)
+        ]
+        pdf_blob_response = await blob_storage.upload_file(json.dumps(pages).encode(), HASH_ID)
+        await pdf_repository.save_pdf_document_hash(pdf_blob_response, storage_format="legacy")
+
+    async def test_pages_are_served_from_the_json_blob(self, pdf_repository, blob_storage):
+        """Test that a legacy document is served page by page and as stored pages for the archive."""
+        await self.save_legacy_document(pdf_repository, blob_storage)
+        document = await pdf_repository.get_pdf_document(HASH_ID, primary=True)
+
+        assert await pdf_repository.get_page_image(document, 2) == (b"page 2", "JPEG", f"{zlib.crc32(b'page 2'):08x}")
+        assert await pdf_repository.get_page_image(document, 3) is None
+        pages = await pdf_repository.get_stored_pages(document)
+        assert [page.page_number for page in pages] == [1, 2]
+        assert [await pdf_repository.read_stored_page(page) for page in pages] == [b"page 1", b"page 2"]
+
+    async def test_page_count_is_backfilled(self, pdf_repository, blob_storage):
+        """Test that looking up a legacy document records its page count and size."""
+        await self.save_legacy_document(pdf_repository, blob_storage)
+
+        pdf_response = await pdf_repository.get_pdf_blob_storage_url_by_hash(HASH_ID)
+
+        assert pdf_response.page_count == 2
+        document = await pdf_repository.get_pdf_document(HASH_ID, primary=True)
+        assert document.page_count == 2
+        assert document.size_bytes == 12
+
+
+@pytest.mark.asyncio
+class TestPageBlobReferences:
+    async def get_page_blob(self, pdf_repository, digest: str) -> PageBlob | None:
+        async with pdf_repository.db.get_session() as session:
+            return await session.get(PageBlob, digest)
+
+    async def checkpoint(self, pdf_repository, hash_id: str, pages: list) -> None:
+        await pdf_repository.claim_conversion_task(hash_id, stale_after_seconds=300)
+        await pdf_repository.save_page_checkpoints(hash_id, pages)
+
+    async def test_identical_pages_are_stored_once(self, pdf_repository, blob_storage):
+        """Test that a page shared by two documents is uploaded once and referenced twice."""
+        page = make_page(1, b"same page")
+        await self.checkpoint(pdf_repository, HASH_ID, [page])
+        await self.checkpoint(pdf_repository, OTHER_HASH_ID, [page])
+
+        page_blob = await self.get_page_blob(pdf_repository, page.digest)
+        assert page_blob.ref_count == 2
+        assert list(blob_storage.blobs) == [page_blob.blob_name]
+        document = PdfDocument(hash_id=OTHER_HASH_ID, storage_format="manifest")
+        assert await pdf_repository.get_page_image(document, 1) == (b"same page", "JPEG", page.digest)
+
+    async def test_released_page_is_purged_after_the_last_reference(self, pdf_repository, blob_storage):
+        """Test that a page blob is only purged once no document references it."""
+        page = make_page(1, b"same page")
+        await self.checkpoint(pdf_repository, HASH_ID, [page])
+        await self.checkpoint(pdf_repository, OTHER_HASH_ID, [page])
+
+        assert await pdf_repository.release_document_pages([HASH_ID]) == 1
+        assert await pdf_repository.purge_released_page_blobs(grace_seconds=0, limit=10) == 0
+        page_blob = await self.get_page_blob(pdf_repository, page.digest)
+        assert page_blob.ref_count == 1
+        assert page_blob.released_at is None
+
+        assert await pdf_repository.release_document_pages([OTHER_HASH_ID]) == 1
+        assert await pdf_repository.purge_released_page_blobs(grace_seconds=3600, limit=10) == 0
+        assert await pdf_repository.purge_released_page_blobs(grace_seconds=0, limit=10) == 1
+        assert await self.get_page_blob(pdf_repository, page.digest) is None
+        assert blob_storage.blobs == {}
+
+    async def test_released_page_is_picked_up_again(self, pdf_repository, blob_storage):
+        """Test that a released page referenced again before the purge is kept."""
+        page = make_page(1, b"same page")
+        await self.checkpoint(pdf_repository, HASH_ID, [page])
+        await pdf_repository.release_document_pages([HASH_ID])
+
+        await self.checkpoint(pdf_repository, OTHER_HASH_ID, [page])
+
+        assert await pdf_repository.purge_released_page_blobs(grace_seconds=0, limit=10) == 0
+        page_blob = await self.get_page_blob(pdf_repository, page.digest)
+        assert page_blob.ref_count == 1
+        assert page_blob.released_at is None
+        assert page_blob.blob_name in blob_storage.blobs
+
+    async def test_failed_blob_delete_keeps_its_page_blob(self, pdf_repository, blob_storage, monkeypatch):
+        """Test that a page blob whose delete fails stays released, while the others of the batch are purged."""
+        failing_page, page = make_page(1, b"failing page"), make_page(2, b"page")
+        await self.checkpoint(pdf_repository, HASH_ID, [failing_page, page])
+        await pdf_repository.release_document_pages([HASH_ID])
+        failing_blob = (await self.get_page_blob(pdf_repository, failing_page.digest)).blob_name
+        delete_file = blob_storage.delete_file
+        locked_during_delete = []
+
+        async def failing_delete(blob_name: str) -> bool:
+            locked_during_delete.append(pdf_repository.db._lock.locked())
+            if blob_name == failing_blob:
+                raise RuntimeError("Blob Storage unavailable")
+            return await delete_file(blob_name)
+
+        monkeypatch.setattr(blob_storage, "delete_file", failing_delete)
+        assert await pdf_repository.purge_released_page_blobs(grace_seconds=0, limit=10) == 1
+
+        assert await self.get_page_blob(pdf_repository, page.digest) is None
+        page_blob = await self.get_page_blob(pdf_repository, failing_page.digest)
+        assert page_blob.ref_count == 0
+        assert list(blob_storage.blobs) == [failing_blob]
+        # The blobs are deleted without holding the primary session lock.
+        assert locked_during_delete == [False, False]
+
+        monkeypatch.setattr(blob_storage, "delete_file", delete_file)
+        assert await pdf_repository.purge_released_page_blobs(grace_seconds=0, limit=10) == 1
+        assert blob_storage.blobs == {}
+
+    async def test_page_swept_during_checkpoint_is_uploaded_again(self, pdf_repository, blob_storage, monkeypatch):
+        """Test that a known page purged between the lookup and the upsert is stored again after the commit."""
+        known_page, new_page = make_page(1, b"known page"), make_page(2, b"new page")
+        await self.checkpoint(pdf_repository, OTHER_HASH_ID, [known_page])
+        await pdf_repository.release_document_pages([OTHER_HASH_ID])
+        upload_file = blob_storage.upload_file
+        locked_during_upload = []
+
+        async def checking_upload(file: bytes, file_name: str, content_type: str | None = None):
+            locked_during_upload.append(pdf_repository.db._lock.locked())
+            return await upload_file(file, file_name, content_type)
+
+        async def purge_while_uploading(file: bytes, file_name: str, content_type: str | None = None):
+            # The purge runs while the new page of the batch is being uploaded, after the lookup.
+            monkeypatch.setattr(blob_storage, "upload_file", checking_upload)
+            await pdf_repository.purge_released_page_blobs(grace_seconds=0, limit=10)
+            return await upload_file(file, file_name, content_type)
+
+        monkeypatch.setattr(blob_storage, "upload_file", purge_while_uploading)
+        await self.checkpoint(pdf_repository, HASH_ID, [known_page, new_page])
+
+        page_blob = await self.get_page_blob(pdf_repository, known_page.digest)
+        assert page_blob.ref_count == 1
+        assert blob_storage.blobs[page_blob.blob_name] == b"known page"
+        # The swept page is uploaded again without holding a primary session.
+        assert locked_during_upload == [False]
+
+    async def test_failed_upload_of_a_swept_page_is_undone(self, pdf_repository, blob_storage, monkeypatch):
+        """Test that the checkpoint of a swept page blob that could not be uploaded again is undone."""
+        known_page, new_page = make_page(1, b"known page"), make_page(2, b"new page")
+        await self.checkpoint(pdf_repository, OTHER_HASH_ID, [known_page])
+        await pdf_repository.release_document_pages([OTHER_HASH_ID])
+        upload_file = blob_storage.upload_file
+
+        async def failing_upload(file: bytes, file_name: str, content_type: str | None = None):
+            raise RuntimeError("Blob Storage unavailable")
+
+        async def purge_while_uploading(file: bytes, file_name: str, content_type: str | None = None):
+            monkeypatch.setattr(blob_storage, "upload_file", failing_upload)
+            await pdf_repository.purge_released_page_blobs(grace_seconds=0, limit=10)
+            return await upload_file(file, file_name, content_type)
+
+        monkeypatch.setattr(blob_storage, "upload_file", purge_while_uploading)
+        with pytest.raises(RuntimeError, match="Blob Storage unavailable"):
+            await self.checkpoint(pdf_repository, HASH_ID, [known_page, new_page])
+
+        assert await self.get_page_blob(pdf_repository, known_page.digest) is None
+        assert await pdf_repository.get_document_pages(HASH_ID) == []
+
+        # The next checkpoint of the page uploads it again.
+        monkeypatch.setattr(blob_storage, "upload_file", upload_file)
+        await pdf_repository.save_page_checkpoints(HASH_ID, [known_page, new_page])
+        page_blob = await self.get_page_blob(pdf_repository, known_page.digest)
+        assert blob_storage.blobs[page_blob.blob_name] == b"known page"
+
+
+@pytest.mark.asyncio
+class TestRetentionQueries:
+    async def save_document(self, pdf_repository, blob_storage, hash_id: str, size_bytes: int, idle: float) -> None:
+        pdf_blob_response = await blob_storage.upload_file(b"[]", hash_id)
+        await pdf_repository.save_pdf_document_hash(pdf_blob_response, page_count=1, size_bytes=size_bytes)
+        await pdf_repository.touch_documents({hash_id: 0.0})
+        async with pdf_repository.db.transaction() as session:
+            await session.execute(
+                update(PdfDocument)
+                .where(PdfDocument.hash_id == hash_id)
+                .values(last_accessed_at=func.now() - timedelta(seconds=idle))
+            )
+
+    async def test_touch_documents_only_moves_access_times_forward(self, pdf_repository, blob_storage):
+        """Test that a flush sets the access time of each document, unless it already has a later one."""
+        await self.save_document(pdf_repository, blob_storage, HASH_ID, 10, idle=3600)
+        await self.save_document(pdf_repository, blob_storage, OTHER_HASH_ID, 10, idle=60)
+
+        await pdf_repository.touch_documents({HASH_ID: 0.0, OTHER_HASH_ID: 600.0})
+
+        assert await pdf_repository.get_expired_document_hashes(idle_seconds=30, limit=10) == [OTHER_HASH_ID]
+
+    async def test_expired_documents_least_recently_used_first(self, pdf_repository, blob_storage):
+        """Test that documents idle for longer than the TTL are returned oldest first, up to the limit."""
+        await self.save_document(pdf_repository, blob_storage, HASH_ID, 10, idle=7200)
+        await self.save_document(pdf_repository, blob_storage, OTHER_HASH_ID, 10, idle=10800)
+        await self.save_document(pdf_repository, blob_storage, THIRD_HASH_ID, 10, idle=60)
+
+        assert await pdf_repository.get_expired_document_hashes(idle_seconds=3600, limit=10) == [
+            OTHER_HASH_ID,
+            HASH_ID,
+        ]
+        assert await pdf_repository.get_expired_document_hashes(idle_seconds=3600, limit=1) == [OTHER_HASH_ID]
+
+    async def test_documents_over_budget(self, pdf_repository, blob_storage):
+        """Test that just enough least recently used documents are evicted to fit the size budget."""
+        await self.save_document(pdf_repository, blob_storage, HASH_ID, 100, idle=300)
+        await self.save_document(pdf_repository, blob_storage, OTHER_HASH_ID, 50, idle=600)
+        await self.save_document(pdf_repository, blob_storage, THIRD_HASH_ID, 100, idle=60)
+
+        assert await pdf_repository.get_documents_over_budget(max_total_bytes=250, limit=10) == []
+        assert await pdf_repository.get_documents_over_budget(max_total_bytes=200, limit=10) == [OTHER_HASH_ID]
+        assert await pdf_repository.get_documents_over_budget(max_total_bytes=150, limit=10) == [
+            OTHER_HASH_ID,
+            HASH_ID,
+        ]
+
+    async def test_delete_documents(self, pdf_repository, blob_storage):
+        """Test that deleting a document removes its record, manifest and conversion and releases its pages."""
+        page = make_page(1)
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await pdf_repository.save_page_checkpoints(HASH_ID, [page])
+        await self.save_document(pdf_repository, blob_storage, HASH_ID, 10, idle=0)
+
+        assert await pdf_repository.delete_documents([HASH_ID, OTHER_HASH_ID]) == 1
+
+        assert await pdf_repository.get_pdf_document(HASH_ID, primary=True) is None
+        assert await pdf_repository.get_conversion_task(HASH_ID, primary=True) is None
+        assert HASH_ID not in blob_storage.blobs
+        async with pdf_repository.db.get_session() as session:
+            page_blob = await session.get(PageBlob, page.digest)
+        assert page_blob.ref_count == 0
+        assert page_blob.released_at is not None
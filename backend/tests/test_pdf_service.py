@@ -0,0 +1,229 @@
+import json
+import zlib
+from datetime import datetime
+from unittest.mock import AsyncMock
+from unittest.mock import call
+
+import pytest
+from fakes import FakeRenderPool
+from fakes import make_page
+from fakes import make_stale
+from sqlalchemy import update
+
+from src.config import Settings
+from src.models.db.document_page import DocumentPage
+from src.models.db.pdf_document import PdfDocument
+from src.services.pdf_service import PdfService
+from src.utils.metrics import MetricsRegistry
+
+HASH_ID = "b" * 64
+PDF_CONTENT = b"%PDF-1.4 four pages"
+
+
+@pytest.fixture
+def render_pool():
+    return FakeRenderPool(page_count=4)
+
+
+@pytest.fixture
+def pdf_service(pdf_repository, render_pool, monkeypatch):
+    monkeypatch.setattr(Settings, "PDF_BATCH_SIZE", 2)
+    monkeypatch.setattr(Settings, "PDF_BATCH_MAX_SIZE", 2)
+    return PdfService(pdf_repository, render_pool=render_pool, metrics=MetricsRegistry())
+
+
+@pytest.mark.asyncio
+class TestConversionResume:
+    async def test_conversion_is_finalized(self, pdf_service, pdf_repository, blob_storage):
+        """Test that a conversion renders every page and writes a manifest referencing the page blobs."""
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+
+        status = await pdf_service.get_task_status(HASH_ID)
+        assert status.status == "completed"
+        assert status.page_count == 4
+        manifest = json.loads(blob_storage.blobs[HASH_ID])
+        assert [entry["page"] for entry in manifest] == [1, 2, 3, 4]
+        assert all(entry["blob_name"] in blob_storage.blobs for entry in manifest)
+
+    async def test_failed_conversion_resumes_at_missing_pages(self, pdf_service, render_pool):
+        """Test that resubmitting a failed conversion only renders the pages without a checkpoint."""
+        render_pool.fail_on_page = 3
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+        assert (await pdf_service.get_task_status(HASH_ID)).status == "failed"
+        assert render_pool.rendered_pages == [1, 2]
+
+        render_pool.fail_on_page = None
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+
+        assert render_pool.rendered_pages == [1, 2, 3, 4]
+        assert (await pdf_service.get_task_status(HASH_ID)).status == "completed"
+
+    async def test_stale_conversion_is_resumed(self, pdf_service, pdf_repository, render_pool):
+        """Test that a conversion whose worker died is taken over and resumed where it stopped."""
+        await pdf_repository.claim_conversion_task(HASH_ID, Settings.CONVERSION_STALE_SECONDS)
+        await pdf_repository.save_page_checkpoints(HASH_ID, [make_page(1), make_page(2)])
+        await make_stale(pdf_repository, HASH_ID)
+
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+
+        assert render_pool.rendered_pages == [3, 4]
+        assert (await pdf_service.get_task_status(HASH_ID)).status == "completed"
+
+    async def test_running_conversion_is_not_claimed_twice(self, pdf_service, pdf_repository, render_pool):
+        """Test that a second submission of a running conversion only registers one more waiter."""
+        await pdf_repository.claim_conversion_task(HASH_ID, Settings.CONVERSION_STALE_SECONDS)
+
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+
+        assert render_pool.rendered_pages == []
+        conversion_task = await pdf_repository.get_conversion_task(HASH_ID, primary=True)
+        assert conversion_task.waiters == 2
+
+    async def test_double_finalization(self, pdf_service, pdf_repository):
+        """Test that a conversion finalized twice, by its worker and by one that took it over, succeeds once."""
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+
+        await pdf_service._finalize_conversion(HASH_ID)
+
+        conversion_task = await pdf_repository.get_conversion_task(HASH_ID, primary=True)
+        assert conversion_task.status == "completed"
+        assert (await pdf_repository.get_pdf_document(HASH_ID, primary=True)).page_count == 4
+
+
+@pytest.mark.asyncio
+class TestConversionCancellation:
+    async def test_render_loop_stops_between_batches(self, pdf_service, pdf_repository, render_pool, monkeypatch):
+        """Test that a conversion cancelled during a batch stops before the next one, keeping the rendered pages."""
+        run = render_pool.run
+
+        async def cancel_after_first_batch(func, *args):
+            result = await run(func, *args)
+            if render_pool.rendered_pages == [1, 2]:
+                await pdf_repository.cancel_conversion_task(HASH_ID)
+            return result
+
+        monkeypatch.setattr(render_pool, "run", cancel_after_first_batch)
+
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+
+        assert render_pool.rendered_pages == [1, 2]
+        assert (await pdf_service.get_task_status(HASH_ID)).status == "cancelled"
+        assert [page.page_number for page in await pdf_repository.get_document_pages(HASH_ID)] == [1, 2]
+        assert await pdf_repository.get_pdf_document(HASH_ID, primary=True) is None
+
+    async def test_cancel_task_with_other_waiters(self, pdf_service, pdf_repository):
+        """Test that a client cancelling a conversion other clients wait for only withdraws itself."""
+        await pdf_repository.claim_conversion_task(HASH_ID, Settings.CONVERSION_STALE_SECONDS)
+        await pdf_repository.add_conversion_waiter(HASH_ID)
+
+        first = await pdf_service.cancel_task(HASH_ID)
+        second = await pdf_service.cancel_task(HASH_ID)
+
+        assert first.status == "pending"
+        assert first.message == "Conversion continues for 1 other clients"
+        assert second.status == "cancelled"
+
+    async def test_lookup_without_touch_does_not_keep_the_conversion_alive(self, pdf_service, pdf_repository):
+        """Test that a read-only status lookup of a pending conversion does not count as a poll."""
+        await pdf_repository.claim_conversion_task(HASH_ID, Settings.CONVERSION_STALE_SECONDS)
+        polled_at = (await pdf_repository.get_conversion_task(HASH_ID, primary=True)).last_polled_at
+
+        assert (await pdf_service.get_task_status(HASH_ID, touch=False)).status == "pending"
+
+        conversion_task = await pdf_repository.get_conversion_task(HASH_ID, primary=True)
+        assert conversion_task.last_polled_at == polled_at
+        assert len(pdf_service.access_tracker) == 0
+
+
+@pytest.mark.asyncio
+class TestInlineConversion:
+    async def test_pages_are_counted_once(self, pdf_service, render_pool, monkeypatch):
+        """Test that the page count of the inline size check is passed on to the render budget check."""
+        monkeypatch.setattr(Settings, "INLINE_MAX_PAGES", 4)
+        calls = []
+        run = render_pool.run
+
+        async def recording_run(func, *args):
+            calls.append((func.__name__, args[1:]))
+            return await run(func, *args)
+
+        monkeypatch.setattr(render_pool, "run", recording_run)
+
+        status = await pdf_service.convert_inline(PDF_CONTENT, HASH_ID)
+
+        assert status.status == "completed"
+        assert calls[:2] == [("get_page_count", ()), ("check_render_budget", (4,))]
+
+    async def test_large_document_is_left_to_the_background(self, pdf_service, render_pool, monkeypatch):
+        """Test that a document over INLINE_MAX_PAGES is not converted inline."""
+        monkeypatch.setattr(Settings, "INLINE_MAX_PAGES", 3)
+
+        assert await pdf_service.convert_inline(PDF_CONTENT, HASH_ID) is None
+        assert render_pool.rendered_pages == []
+
+
+@pytest.mark.asyncio
+class TestDocumentArchive:
+    async def test_missing_crc32s_are_computed_once(self, pdf_service, pdf_repository, blob_storage, monkeypatch):
+        """Test that pages checkpointed without a CRC-32 are read for the first archive only."""
+        await pdf_service.process_pdf_conversion(PDF_CONTENT, HASH_ID)
+        async with pdf_repository.db.transaction() as session:
+            await session.execute(update(DocumentPage).where(DocumentPage.page_number > 2).values(crc32=None))
+        reads = []
+        get_file = blob_storage.get_file
+
+        async def counting_get_file(blob_name: str) -> bytes:
+            reads.append(blob_name)
+            return await get_file(blob_name)
+
+        monkeypatch.setattr(blob_storage, "get_file", counting_get_file)
+
+        first = await pdf_service.get_document_archive(HASH_ID)
+        assert len(reads) == 2
+        second = await pdf_service.get_document_archive(HASH_ID)
+
+        assert len(reads) == 2
+        assert first.fingerprint == second.fingerprint
+        assert [member.crc32 for member in second.members] == [
+            zlib.crc32(f"page {page_number}".encode()) for page_number in range(1, 5)
+        ]
+
+
+@pytest.mark.asyncio
+class TestReplicaLag:
+    @pytest.fixture
+    def lagging_repository(self):
+        """Repository whose read replica does not have the document yet, unlike the primary."""
+        document = PdfDocument(hash_id=HASH_ID, storage_format="manifest", created_at=datetime(2025, 1, 1))
+        pdf_repository = AsyncMock()
+        pdf_repository.get_pdf_document.side_effect = lambda hash_id, primary=False: document if primary else None
+        pdf_repository.get_page_image.return_value = (b"page 1", "JPEG", "digest")
+        pdf_repository.get_stored_pages.return_value = [
+            DocumentPage(page_number=1, blob_name="page-1", image_format="JPEG", size_bytes=6, crc32=1)
+        ]
+        return pdf_repository
+
+    async def test_page_is_read_from_the_primary(self, lagging_repository):
+        """Test that a page of a document missing from the read replica is served from the primary."""
+        pdf_service = PdfService(lagging_repository, render_pool=FakeRenderPool(1), metrics=MetricsRegistry())
+
+        assert await pdf_service.get_page_image(HASH_ID, 1) == (b"page 1", "image/jpeg", "digest")
+        assert lagging_repository.get_pdf_document.await_args_list == [call(HASH_ID), call(HASH_ID, primary=True)]
+
+    async def test_archive_is_read_from_the_primary(self, lagging_repository):
+        """Test that the archive of a document missing from the read replica is built from the primary."""
+        pdf_service = PdfService(lagging_repository, render_pool=FakeRenderPool(1), metrics=MetricsRegistry())
+
+        archive = await pdf_service.get_document_archive(HASH_ID)
+
+        assert [member.name for member in archive.members] == ["page_1.jpeg"]
+        assert lagging_repository.get_pdf_document.await_args_list == [call(HASH_ID), call(HASH_ID, primary=True)]
+
+    async def test_unknown_document(self, lagging_repository):
+        """Test that a document on neither the replica nor the primary is not found."""
+        lagging_repository.get_pdf_document.side_effect = None
+        lagging_repository.get_pdf_document.return_value = None
+        pdf_service = PdfService(lagging_repository, render_pool=FakeRenderPool(1), metrics=MetricsRegistry())
+
+        assert await pdf_service.get_page_image(HASH_ID, 1) is None
+        assert await pdf_service.get_document_archive(HASH_ID) is None
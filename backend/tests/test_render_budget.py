@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.convert_pdf_to_image import RenderLimitError
+from src.utils.convert_pdf_to_image import page_render_dpi
+from src.utils.convert_pdf_to_image import parse_page_sizes
+
+LETTER = (612.0, 792.0)
+A0 = (2384.0, 3370.0)
+
+
+@pytest.fixture(autouse=True)
+def budget():
+    """Render at 200 DPI within 40 megapixels, never below 50 DPI."""
+    with (
+        patch("src.utils.convert_pdf_to_image.Settings.RENDER_DPI", 200),
+        patch("src.utils.convert_pdf_to_image.Settings.MAX_PAGE_PIXELS", 40_000_000),
+        patch("src.utils.convert_pdf_to_image.Settings.MIN_RENDER_DPI", 50),
+    ):
+        yield
+
+
+class TestPageSizes:
+    def test_page_range_entries(self):
+        """Test that the size of every page of a range is read from pdfinfo output."""
+        pdf_info = {
+            "Pages": 3,
+            "Page    2 size": "612 x 792 pts (letter)",
+            "Page    2 rot": "0",
+            "Page    3 size": "2383.94 x 3370.39 pts (A0)",
+        }
+
+        assert parse_page_sizes(pdf_info, 2) == {2: (612.0, 792.0), 3: (2383.94, 3370.39)}
+
+    def test_single_page_entry(self):
+        """Test that a single page report is attributed to the requested page."""
+        assert parse_page_sizes({"Page size": "595.276 x 841.89 pts (A4)"}, 7) == {7: (595.276, 841.89)}
+
+
+class TestPageRenderDpi:
+    def test_regular_page_keeps_the_configured_dpi(self):
+        """Test that pages within the budget are rendered at RENDER_DPI."""
+        assert page_render_dpi(1, *LETTER) == 200
+
+    def test_poster_page_is_scaled_into_the_budget(self):
+        """Test that an oversized page is rendered at the highest DPI that fits the pixel budget."""
+        dpi = page_render_dpi(1, *A0)
+
+        assert 50 <= dpi < 200
+        assert (A0[0] / 72 * dpi) * (A0[1] / 72 * dpi) <= 40_000_000
+        assert (A0[0] / 72 * (dpi + 1)) * (A0[1] / 72 * (dpi + 1)) > 40_000_000
+
+    def test_page_too_large_for_the_minimum_dpi(self):
+        """Test that a page that would only fit below MIN_RENDER_DPI is refused with its number and size."""
+        with pytest.raises(RenderLimitError, match="Page 4 \\(200000 x 200000 pt\\)"):
+            page_render_dpi(4, 200_000.0, 200_000.0)
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.utils.render_pool import RenderWorkerPool
+
+
+def timed_task(seconds: float) -> tuple[int, float, float]:
+    """Runs in a render worker: sleep, and report which process ran when."""
+    started = time.time()
+    time.sleep(seconds)
+    return os.getpid(), started, time.time()
+
+
+def max_overlap(intervals: list[tuple[float, float]]) -> int:
+    events = sorted([(start, 1) for start, _end in intervals] + [(end, -1) for _start, end in intervals])
+    overlap = highest = 0
+    for _time, change in events:
+        overlap += change
+        highest = max(highest, overlap)
+    return highest
+
+
+@pytest.fixture
+def render_pool():
+    pool = RenderWorkerPool(max_workers=2, max_tasks_per_child=2)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+class TestRenderWorkerPool:
+    async def test_generations_do_not_exceed_max_workers(self, render_pool):
+        """Test that tasks run in worker processes that are recycled, never more than max_workers at a time."""
+        results = await asyncio.gather(*(render_pool.run(timed_task, 0.2) for _ in range(12)))
+
+        lifetimes: dict[int, tuple[float, float]] = {}
+        for pid, started, finished in results:
+            first, last = lifetimes.get(pid, (started, finished))
+            lifetimes[pid] = (min(first, started), max(last, finished))
+
+        assert os.getpid() not in lifetimes
+        # 12 tasks with generations retired every 2 workers x 2 tasks: at least 3 generations.
+        assert len(lifetimes) >= 6
+        assert max_overlap([(started, finished) for _pid, started, finished in results]) <= 2
+        assert max_overlap(list(lifetimes.values())) <= 2
+
+    async def test_cancelled_caller_keeps_the_slot_until_the_task_finishes(self):
+        """Test that a task whose caller gave up still counts against max_workers until it ends."""
+        render_pool = RenderWorkerPool(max_workers=2, max_tasks_per_child=1)
+        render_pool.start()
+        try:
+            abandoned = asyncio.ensure_future(render_pool.run(timed_task, 1.0))
+            await asyncio.sleep(0.1)
+            abandoned.cancel()
+
+            # A generation is retired every two tasks, so only the slots keep these from running together.
+            results = await asyncio.gather(*(render_pool.run(timed_task, 0.3) for _ in range(2)))
+        finally:
+            render_pool.shutdown()
+
+        assert max_overlap([(started, finished) for _pid, started, finished in results]) == 1
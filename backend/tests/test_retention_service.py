@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+import pytest
+from fakes import make_page
+from sqlalchemy import func
+from sqlalchemy import update
+
+from src.config import Settings
+from src.models.db.pdf_document import PdfDocument
+from src.services.retention_service import SWEEP_LOCK_KEY
+from src.services.retention_service import RetentionService
+from src.utils.access_tracker import AccessTracker
+
+HASH_ID = "a" * 64
+
+
+@pytest.mark.asyncio
+class TestRetentionService:
+    async def test_only_one_process_sweeps(self, pdf_repository, db):
+        """Test that a sweep is skipped while another process holds the sweep lock, but access times are flushed."""
+        access_tracker = AccessTracker()
+        access_tracker.touch(HASH_ID)
+        retention_service = RetentionService(pdf_repository, access_tracker)
+
+        async with db.advisory_lock(SWEEP_LOCK_KEY) as acquired:
+            assert acquired is True
+            async with db.advisory_lock(SWEEP_LOCK_KEY) as acquired_again:
+                assert acquired_again is False
+            assert await retention_service.sweep() == {"expired": 0, "evicted": 0, "abandoned": 0, "page_blobs": 0}
+        assert len(access_tracker) == 0
+
+        async with db.advisory_lock(SWEEP_LOCK_KEY) as acquired:
+            assert acquired is True
+
+    async def test_sweep_deletes_expired_documents(self, pdf_repository, blob_storage, monkeypatch):
+        """Test that a sweep deletes the documents idle for longer than the TTL and purges their pages."""
+        monkeypatch.setattr(Settings, "RETENTION_TTL_SECONDS", 3600)
+        monkeypatch.setattr(Settings, "RETENTION_PAGE_GRACE_SECONDS", 0)
+        await pdf_repository.claim_conversion_task(HASH_ID, stale_after_seconds=300)
+        await pdf_repository.save_page_checkpoints(HASH_ID, [make_page(1)])
+        await pdf_repository.save_pdf_document_hash(await blob_storage.upload_file(b"[]", HASH_ID), 1, 10)
+        async with pdf_repository.db.transaction() as session:
+            await session.execute(update(PdfDocument).values(last_accessed_at=func.now() - timedelta(seconds=7200)))
+        retention_service = RetentionService(pdf_repository, AccessTracker())
+
+        removed = await retention_service.sweep()
+
+        assert removed == {"expired": 1, "evicted": 0, "abandoned": 0, "page_blobs": 1}
+        assert blob_storage.blobs == {}
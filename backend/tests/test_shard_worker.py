@@ -0,0 +1,84 @@
+import asyncio
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.models.db.conversion_shard import ConversionShard
+from src.services.shard_worker import ShardWorker
+
+
+def make_shard(first_page: int, last_page: int) -> ConversionShard:
+    return ConversionShard(
+        hash_id="a" * 64, first_page=first_page, last_page=last_page, attempts=1, claimed_by="worker"
+    )
+
+
+@pytest.fixture
+def pdf_service():
+    """PDF service whose repository hands out the queued shards, then reports an empty queue."""
+    service = MagicMock(run_conversion_shard=AsyncMock(), fail_conversion_shard=AsyncMock())
+    service.pdf_repository = MagicMock(
+        claim_conversion_shard=AsyncMock(return_value=None),
+        get_source_pdf=AsyncMock(return_value=b"%PDF-1.4"),
+        release_conversion_shard=AsyncMock(),
+    )
+    return service
+
+
+@pytest.mark.asyncio
+class TestShardWorker:
+    async def test_empty_queue(self, pdf_service):
+        """Test that run_once reports an empty queue without rendering anything."""
+        worker = ShardWorker(pdf_service, concurrency=1)
+
+        assert await worker.run_once() is False
+        pdf_service.run_conversion_shard.assert_not_called()
+
+    async def test_source_is_downloaded_once_per_document(self, pdf_service):
+        """Test that consecutive shards of a document reuse the downloaded source PDF."""
+        shards = [make_shard(1, 50), make_shard(51, 100)]
+        pdf_service.pdf_repository.claim_conversion_shard.side_effect = [*shards, None]
+        worker = ShardWorker(pdf_service, concurrency=1)
+
+        while await worker.run_once():
+            pass
+
+        pdf_service.pdf_repository.get_source_pdf.assert_awaited_once_with("a" * 64)
+        assert [call.args for call in pdf_service.run_conversion_shard.await_args_list] == [
+            (shards[0], b"%PDF-1.4"),
+            (shards[1], b"%PDF-1.4"),
+        ]
+
+    async def test_failed_shard_is_handed_back(self, pdf_service):
+        """Test that a shard whose rendering raises is reported to the service, and the worker carries on."""
+        shard = make_shard(1, 50)
+        pdf_service.pdf_repository.claim_conversion_shard.return_value = shard
+        pdf_service.run_conversion_shard.side_effect = RuntimeError("pdftoppm crashed")
+        worker = ShardWorker(pdf_service, concurrency=1)
+
+        assert await worker.run_once() is True
+        pdf_service.fail_conversion_shard.assert_awaited_once_with(shard, "pdftoppm crashed", retryable=True)
+
+    async def test_stopping_worker_requeues_its_shard(self, pdf_service):
+        """Test that cancelling a worker mid-shard puts the shard back without counting the attempt."""
+        shard = make_shard(1, 50)
+        started = asyncio.Event()
+
+        async def render_forever(*args):
+            started.set()
+            await asyncio.Event().wait()
+
+        pdf_service.pdf_repository.claim_conversion_shard.return_value = shard
+        pdf_service.run_conversion_shard.side_effect = render_forever
+        task = asyncio.create_task(ShardWorker(pdf_service, concurrency=1).run())
+        await started.wait()
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        pdf_service.pdf_repository.release_conversion_shard.assert_awaited_once_with(
+            shard, "Worker stopped", count_attempt=False
+        )
+        pdf_service.fail_conversion_shard.assert_not_called()
@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+from opentelemetry.trace import format_span_id
+from opentelemetry.trace import format_trace_id
+
+from src.app import create_app
+from src.config import Settings
+from src.utils import tracing
+from src.utils.tracing import create_tracer_provider
+from src.utils.tracing import current_traceparent
+from src.utils.tracing import run_traced
+from src.utils.tracing import start_span
+from src.utils.tracing import trace_file_path
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+TRACEPARENT = f"00-{TRACE_ID}-{PARENT_ID}-01"
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    """Finished spans of this process, exported synchronously to memory."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_provider", provider)
+    return exporter
+
+
+class TestSpans:
+    def test_nested_spans_share_the_trace(self, exported):
+        """Test that a span started inside another one is its child, and the remote parent is continued."""
+        with start_span("conversion", traceparent=TRACEPARENT, task_id="abc", pages=None) as parent:
+            with start_span("render.batch") as child:
+                traceparent = current_traceparent()
+
+        spans = exported.get_finished_spans()
+        assert [span.name for span in spans] == ["render.batch", "conversion"]
+        assert format_trace_id(parent.get_span_context().trace_id) == TRACE_ID
+        assert child.get_span_context().trace_id == parent.get_span_context().trace_id
+        assert format_span_id(spans[1].parent.span_id) == PARENT_ID
+        assert spans[0].parent.span_id == parent.get_span_context().span_id
+        assert dict(spans[1].attributes) == {"task_id": "abc"}
+        assert traceparent == f"00-{TRACE_ID}-{format_span_id(child.get_span_context().span_id)}-01"
+
+    def test_failed_span_records_the_error(self, exported):
+        """Test that an exception leaving a span marks it as failed."""
+        with pytest.raises(RuntimeError), start_span("blob.upload"):
+            raise RuntimeError("throttled")
+
+        span = exported.get_finished_spans()[0]
+        assert span.status.status_code == StatusCode.ERROR
+        assert span.status.description == "RuntimeError: throttled"
+        assert span.events[0].name == "exception"
+
+    def test_render_worker_flushes_its_spans(self, monkeypatch):
+        """Test that spans recorded in a render worker are exported before the task returns."""
+        exporter = InMemorySpanExporter()
+        monkeypatch.setattr(tracing, "_provider", create_tracer_provider(exporter))
+
+        def render(first_page: int, last_page: int) -> list[int]:
+            with start_span("render.pages"):
+                return list(range(first_page, last_page + 1))
+
+        assert run_traced(TRACEPARENT, "render_pool.task", render, 1, 3) == [1, 2, 3]
+
+        spans = exporter.get_finished_spans()
+        assert [span.name for span in spans] == ["render.pages", "render_pool.task"]
+        assert format_span_id(spans[1].parent.span_id) == PARENT_ID
+        assert {format_trace_id(span.context.trace_id) for span in spans} == {TRACE_ID}
+        assert spans[1].attributes["pid"] == os.getpid()
+
+
+class TestSampling:
+    def test_new_traces_are_sampled_at_the_ratio(self, monkeypatch):
+        """Test that traces started here are dropped at a sample ratio of 0, keeping trace ids for the logs."""
+        monkeypatch.setattr(Settings, "TRACE_SAMPLE_RATIO", 0.0)
+        exporter = InMemorySpanExporter()
+        monkeypatch.setattr(tracing, "_provider", create_tracer_provider(exporter))
+
+        with start_span("GET /livez"):
+            traceparent = current_traceparent()
+        tracing.get_tracer_provider().force_flush()
+
+        assert exporter.get_finished_spans() == ()
+        # The sampled bit of the trace flags is off.
+        assert int(traceparent.split("-")[3], 16) & 1 == 0
+
+    def test_continued_traces_follow_the_caller(self, monkeypatch):
+        """Test that a trace the caller sampled is recorded whatever the local ratio."""
+        monkeypatch.setattr(Settings, "TRACE_SAMPLE_RATIO", 0.0)
+        exporter = InMemorySpanExporter()
+        monkeypatch.setattr(tracing, "_provider", create_tracer_provider(exporter))
+
+        with start_span("GET /livez", traceparent=TRACEPARENT):
+            pass
+        tracing.get_tracer_provider().force_flush()
+
+        assert [span.name for span in exporter.get_finished_spans()] == ["GET /livez"]
+
+
+class TestFileExporter:
+    def test_trace_file_per_process(self):
+        """Test that every process gets its own trace file next to the configured one."""
+        assert trace_file_path("/var/log/traces.jsonl", 1234) == "/var/log/traces.1234.jsonl"
+
+    def test_spans_are_written_as_json_lines(self, monkeypatch, tmp_path):
+        """Test that the file exporter writes one JSON line per span to the file of this process."""
+        monkeypatch.setattr(Settings, "TRACE_EXPORTER", "file")
+        monkeypatch.setattr(Settings, "TRACE_FILE", str(tmp_path / "traces.jsonl"))
+        monkeypatch.setattr(tracing, "_provider", create_tracer_provider())
+
+        with start_span("conversion", task_id="abc"):
+            pass
+        tracing.shutdown_tracing()
+
+        lines = (tmp_path / f"traces.{os.getpid()}.jsonl").read_text().splitlines()
+        assert [json.loads(line)["name"] for line in lines] == ["conversion"]
+
+
+class TestRequestTracing:
+    def test_request_continues_the_callers_trace(self, exported):
+        """Test that a request with a traceparent header is traced as part of the caller's trace."""
+        response = TestClient(create_app()).get("/livez", headers={"traceparent": TRACEPARENT})
+
+        _version, trace_id, span_id, _flags = response.headers["traceparent"].split("-")
+        assert trace_id == TRACE_ID
+        request_span = exported.get_finished_spans()[-1]
+        assert request_span.name == "GET /livez"
+        assert format_span_id(request_span.context.span_id) == span_id
+        assert format_span_id(request_span.parent.span_id) == PARENT_ID
+        assert request_span.attributes["http.status_code"] == 200
@@ -0,0 +1,95 @@
+import io
+import zipfile
+import zlib
+from datetime import datetime
+
+import pytest
+
+from src.utils.zip_stream import ZipMember
+from src.utils.zip_stream import ZipStream
+from src.utils.zip_stream import parse_byte_range
+
+PAGES = [b"first page", b"", b"third page image bytes"]
+
+
+def build_archive(reads: list[int] | None = None) -> ZipStream:
+    members = [ZipMember(f"page_{i + 1}.jpeg", len(page), zlib.crc32(page)) for i, page in enumerate(PAGES)]
+
+    async def read_member(position: int) -> bytes:
+        if reads is not None:
+            reads.append(position)
+        return PAGES[position]
+
+    return ZipStream(members, read_member, datetime(2025, 4, 1, 12, 30, 10))
+
+
+async def collect(archive: ZipStream, start: int = 0, end: int | None = None) -> bytes:
+    return b"".join([bytes(chunk) async for chunk in archive.stream(start, end)])
+
+
+class TestZipStream:
+    @pytest.mark.asyncio
+    async def test_streamed_archive_is_a_valid_stored_zip(self):
+        """Test that the generated bytes form a ZIP that zipfile reads back unchanged."""
+        archive = build_archive()
+
+        data = await collect(archive)
+
+        assert len(data) == archive.total_size
+        with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+            assert zip_file.testzip() is None
+            assert zip_file.namelist() == ["page_1.jpeg", "page_2.jpeg", "page_3.jpeg"]
+            assert all(info.compress_type == zipfile.ZIP_STORED for info in zip_file.infolist())
+            assert [zip_file.read(name) for name in zip_file.namelist()] == PAGES
+
+    @pytest.mark.asyncio
+    async def test_byte_ranges_match_the_full_archive(self):
+        """Test that every byte range equals the same slice of the full archive."""
+        full = await collect(build_archive())
+
+        for start in range(0, len(full), 7):
+            for end in (start, start + 20, len(full) - 1):
+                end = min(end, len(full) - 1)
+                assert await collect(build_archive(), start, end) == full[start : end + 1]
+
+    @pytest.mark.asyncio
+    async def test_range_reads_only_the_members_it_covers(self):
+        """Test that resuming near the end does not read earlier members."""
+        reads: list[int] = []
+        archive = build_archive(reads)
+
+        await collect(archive, archive.total_size - 30)
+
+        assert reads == []
+
+    def test_fingerprint_follows_the_member_content(self):
+        """Test that the fingerprint is stable for the same pages and changes with any page image."""
+        reencoded = [ZipMember("page_1.jpeg", len(b"first page!"), zlib.crc32(b"first page!"))]
+        original = [ZipMember("page_1.jpeg", len(PAGES[0]), zlib.crc32(PAGES[0]))]
+        modified = datetime(2025, 4, 1, 12, 30, 10)
+
+        assert build_archive().fingerprint == build_archive().fingerprint
+        assert ZipStream(original, None, modified).fingerprint != ZipStream(reencoded, None, modified).fingerprint
+
+
+class TestParseByteRange:
+    @pytest.mark.parametrize(
+        ("header", "expected"),
+        [
+            ("bytes=0-9", (0, 9)),
+            ("bytes=90-", (90, 99)),
+            ("bytes=-10", (90, 99)),
+            ("bytes=50-500", (50, 99)),
+            ("bytes=0-1,5-6", None),
+            ("items=0-1", None),
+            ("bytes=abc", None),
+        ],
+    )
+    def test_parses_single_ranges(self, header, expected):
+        """Test that single byte ranges are resolved against the size and others are ignored."""
+        assert parse_byte_range(header, 100) == expected
+
+    def test_rejects_unsatisfiable_ranges(self):
+        """Test that a range starting past the end cannot be satisfied."""
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=100-", 100)
@@ -1,27 +1,102 @@
-import os
+import hashlib
 from typing import Any
 
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 
 from src.config import Settings
 
+
 @st.cache_resource
+def get_session() -> requests.Session:
+    """HTTP session shared by all reruns and users, so connections to the API are kept alive and reused."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Settings.HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.verify = Settings.CERT_FILE_PATH
+    return session
+
+
+class SubmissionFailed(Exception):
+    """Raised by _submit_pdf for a failed upload, so st.cache_data does not keep the answer."""
+
+    def __init__(self, response: dict[str, Any]) -> None:
+        super().__init__(response.get("message"))
+        self.response = response
+
+
 def convert_pdf_to_image(file) -> dict[str, Any]:
     """Convert PDF file to image using the API."""
+    content = file.getvalue()
+    try:
+        return _submit_pdf(hashlib.sha256(content).hexdigest(), file.name, content)
+    except SubmissionFailed as e:
+        return e.response
+    except requests.RequestException as e:
+        return {"status": "error", "message": f"Error contacting the API: {e}"}
+
+
+def get_document_by_hash(content_hash: str) -> dict[str, Any] | None:
+    """State and page count of the document with the given SHA-256 hash, or None if the API does not know it."""
+    url = f"https://{Settings.API_HOST}/api/documents/by-hash/{content_hash}"
+    response = get_session().get(url)
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+
+@st.cache_data(ttl=Settings.RESULT_CACHE_TTL_SECONDS, max_entries=100, show_spinner=False)
+def _submit_pdf(content_hash: str, file_name: str, _content: bytes) -> dict[str, Any]:
+    """
+    Upload a PDF once per content hash; the content itself is not hashed again by Streamlit.
+
+    The API is asked about the hash first, so documents it already has are not uploaded. Documents it is
+    converting are uploaded anyway: the API only registers one more waiter, or resumes the conversion if
+    its worker died. Failed uploads raise SubmissionFailed instead of returning, so they are not cached
+    and are retried.
+    """
+    document = get_document_by_hash(content_hash)
+    if document is not None and document["status"] == "completed":
+        return {"status": "already_exists", "filename": content_hash}
+
     url = f"https://{Settings.API_HOST}/api/convert-pdf-to-image/"
-    files = {"file": (file.name, file, "application/pdf")}
-    response = requests.post(url, files=files, verify=Settings.CERT_FILE_PATH)
-    return response.json()
+    files = {"file": (file_name, _content, "application/pdf")}
+    response = get_session().post(url, files=files, headers={"X-Content-SHA256": content_hash})
+    if not response.ok:
+        raise SubmissionFailed({"status": "error", "message": f"Upload failed with status {response.status_code}"})
+    result = response.json()
+    if result.get("status") == "failed":
+        raise SubmissionFailed(result)
+    return result
+
+
+def forget_submissions() -> None:
+    """Drop the cached upload answers, so the next attempt asks the API again instead of reusing a stale one."""
+    _submit_pdf.clear()
 
 
 def get_status(task_id: str) -> dict[str, Any]:
     """Check the status of a conversion task."""
-    url = f"https://{Settings.API_HOST}/api/task/{task_id}/status/"
-    response = requests.get(url, verify=Settings.CERT_FILE_PATH)
+    url = f"https://{Settings.API_HOST}/api/task/{task_id}/status"
+    response = get_session().get(url)
 
     if response.status_code == 200:
         return response.json()
     if response.status_code == 202:
         return {"status": "pending"}
     return {"status": "error", "message": "Error checking task status"}
+
+
+@st.cache_data(ttl=Settings.RESULT_CACHE_TTL_SECONDS, max_entries=Settings.PAGE_CACHE_ENTRIES, show_spinner=False)
+def get_page_image(hash_id: str, page_number: int) -> tuple[bytes, str]:
+    """Download the image of one page of a converted document and its format."""
+    url = f"https://{Settings.API_HOST}/api/documents/{hash_id}/pages/{page_number}"
+    response = get_session().get(url)
+    response.raise_for_status()
+    return response.content, response.headers.get("Content-Type", "image/jpeg").split("/")[-1]
+
+
+def get_archive_url(hash_id: str) -> str:
+    """URL of the ZIP archive with all pages of a converted document."""
+    return f"https://{Settings.API_HOST}/api/documents/{hash_id}/archive.zip"
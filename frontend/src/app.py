@@ -1,13 +1,14 @@
-import base64
-import io
 import time
-import zipfile
 
+import requests
 import streamlit as st
 
 from src.api.fe_api_pdf import convert_pdf_to_image
+from src.api.fe_api_pdf import forget_submissions
+from src.api.fe_api_pdf import get_archive_url
+from src.api.fe_api_pdf import get_page_image
 from src.api.fe_api_pdf import get_status
-from src.utils.blob_storage import get_content_from_blob
+from src.config import Settings
 
 
 st.set_page_config(page_title="PDF Converter App", page_icon="📄", layout="wide", initial_sidebar_state="collapsed")
@@ -81,6 +82,8 @@ with st.container():
         result_placeholder = st.empty()
         
         filename = uploaded_file.name
+        hash_id = None
+        page_count = 0
 
         with processing_placeholder:
             st.markdown("### 🔄 Processing document")
@@ -97,22 +100,48 @@ with st.container():
 
             if "hash_id" in response:
                 task_id = response["hash_id"]
+                hash_id = task_id
 
                 with st.spinner("Conversion in progress..."):
                     completed = False
+                    failed = False
+                    timed_out = False
+                    deadline = time.monotonic() + Settings.POLL_TIMEOUT_SECONDS
 
-                    while not completed:
+                    while not completed and not failed and not timed_out:
                         status_response = get_status(task_id)
 
                         if status_response.get("status") == "completed":
                             completed = True
+                        elif status_response.get("status") in ("failed", "cancelled"):
+                            failed = True
+                        elif time.monotonic() >= deadline:
+                            timed_out = True
                         else:
-                            time.sleep(2)
-
-                response = get_content_from_blob(task_id)
+                            time.sleep(Settings.POLL_INTERVAL_SECONDS)
+
+                if failed or timed_out:
+                    # Uploading the document again resumes its conversion where it stopped.
+                    forget_submissions()
+                if failed:
+                    st.error(f"⚠️ Error: conversion failed. {status_response.get('message') or ''}")
+                elif timed_out:
+                    st.error("⚠️ Error: the conversion is taking too long. Reload the page to try again.")
+                else:
+                    page_count = status_response.get("page_count") or 0
                 processing_placeholder.empty()
                 status_placeholder.empty()
 
+        elif response["status"] == "completed":
+            # Small documents are converted within the upload request.
+            hash_id = response["hash_id"]
+            page_count = response.get("page_count") or 0
+            processing_placeholder.empty()
+            status_placeholder.empty()
+        elif response["status"] == "failed":
+            st.error(f"⚠️ Error: conversion failed. {response.get('message') or ''}")
+            processing_placeholder.empty()
+            status_placeholder.empty()
         elif response["status"] == "already_exists":
             with status_placeholder:
                 st.markdown(
@@ -121,66 +150,56 @@ with st.container():
                 )
             if "filename" in response:
                 filename = response["filename"]
-                response = get_content_from_blob(response["filename"])
+                hash_id = response["filename"]
+                page_count = get_status(hash_id).get("page_count") or 0
             else:
                 st.error("⚠️ Error: filename missing in response.")
             processing_placeholder.empty()
             status_placeholder.empty()
         else:
-            st.error("⚠️ Error: unable to process the file.")
+            st.error(f"⚠️ Error: unable to process the file. {response.get('message') or ''}")
             processing_placeholder.empty()
             status_placeholder.empty()
 
-        if isinstance(response, list) and len(response) > 0:
-                st.markdown("---")
-                st.markdown(f"### 🖼️ Conversion results ({len(response)} pages)")
+        if hash_id and page_count > 0:
+            st.markdown("---")
+            st.markdown(f"### 🖼️ Conversion results ({page_count} pages)")
 
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                    for i, img in enumerate(response):
-                        img_data = img["image_data"]
-                        img_format = img["format"].lower()
-                        image_bytes = base64.b64decode(img_data)
-                        zip_file.writestr(f"page_{i + 1}.{img_format}", image_bytes)
-
-                zip_buffer.seek(0)
-                st.markdown('<div class="download-all-btn">', unsafe_allow_html=True)
-                st.download_button(
+            st.markdown('<div class="download-all-btn">', unsafe_allow_html=True)
+            st.link_button(
                 label="📦 Download all pages (ZIP)",
-                data=zip_buffer,
-                file_name=f"{filename.split('.')[0]}_images.zip" if filename else "images.zip",
-                mime="application/zip",
+                url=get_archive_url(hash_id),
                 use_container_width=True,
             )
-                st.markdown("</div>", unsafe_allow_html=True)
-
-                tabs = st.tabs([f"Page {img['page']}" for img in response])
-
-                for i, tab in enumerate(tabs):
-                    with tab:
-                        img_data = response[i]["image_data"]
-                        img_format = response[i]["format"].lower()
-                        image_bytes = base64.b64decode(img_data)
-
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.image(image_bytes, caption=f"Page {i + 1}", use_container_width=True)
-                        with col2:
-                            st.markdown(f"#### Page {i + 1} details")
-                            st.markdown(f"**Format**: {img_format.upper()}")
-
-                            # Image size
-                            image_size = round(len(image_bytes) / 1024, 2)  # KB
-                            st.markdown(f"**Size**: {image_size} KB")
-
-                            st.markdown("#### Download")
-                            st.download_button(
-                                label=f"⬇️ Download page {i + 1}",
-                                data=image_bytes,
-                                file_name=f"page_{i + 1}.{img_format}",
-                                mime=f"image/{img_format}",
-                                use_container_width=True,
-                            )
+            st.markdown("</div>", unsafe_allow_html=True)
+
+            # Only the selected page is downloaded, so large documents open as fast as small ones.
+            page_number = int(st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1))
+            try:
+                image_bytes, img_format = get_page_image(hash_id, page_number)
+            except requests.RequestException as e:
+                st.error(f"⚠️ Error: unable to load page {page_number}. {e}")
+                st.stop()
+
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.image(image_bytes, caption=f"Page {page_number}", use_container_width=True)
+            with col2:
+                st.markdown(f"#### Page {page_number} details")
+                st.markdown(f"**Format**: {img_format.upper()}")
+
+                # Image size
+                image_size = round(len(image_bytes) / 1024, 2)  # KB
+                st.markdown(f"**Size**: {image_size} KB")
+
+                st.markdown("#### Download")
+                st.download_button(
+                    label=f"⬇️ Download page {page_number}",
+                    data=image_bytes,
+                    file_name=f"page_{page_number}.{img_format}",
+                    mime=f"image/{img_format}",
+                    use_container_width=True,
+                )
 
 
 # Footer
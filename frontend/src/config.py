@@ -16,4 +16,10 @@ class Settings:
     CERT_FILE_PATH: str = os.getenv("CERT_FILE_PATH")
     PATH_CRT: str = os.getenv("PATH_CRT")
     PATH_CRT_KEY: str = os.getenv("PATH_CRT_KEY")
-    API_HOST: str = os.getenv("API_HOST", "localhost")
\ No newline at end of file
+    API_HOST: str = os.getenv("API_HOST", "localhost")
+
+    HTTP_POOL_SIZE: int = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    RESULT_CACHE_TTL_SECONDS: int = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "600"))
+    PAGE_CACHE_ENTRIES: int = int(os.getenv("PAGE_CACHE_ENTRIES", "200"))
+    POLL_INTERVAL_SECONDS: float = float(os.getenv("POLL_INTERVAL_SECONDS", "2"))
+    POLL_TIMEOUT_SECONDS: float = float(os.getenv("POLL_TIMEOUT_SECONDS", "600"))
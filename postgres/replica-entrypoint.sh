@@ -0,0 +1,22 @@
+#!/bin/bash
+# Hot standby of the primary: clone it on first start, then follow it with streaming replication.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 0700 "$PGDATA"
+    until gosu postgres pg_basebackup \
+        --pgdata="$PGDATA" \
+        --host="$PRIMARY_HOST" \
+        --port="${PRIMARY_PORT:-5432}" \
+        --username="$POSTGRES_REPLICATION_USER" \
+        --wal-method=stream \
+        --write-recovery-conf; do
+        echo "Waiting for the primary to accept replication connections..."
+        rm -rf "${PGDATA:?}"/*
+        sleep 2
+    done
+fi
+
+exec gosu postgres postgres -c hot_standby=on
@@ -1,37 +1,181 @@
+import hashlib
+import json
 import os
+import random
+from collections import deque
 
 from locust import HttpUser
 from locust import between
+from locust import events
 from locust import task
 from locust.exception import StopUser
+from pdf_factory import build_pdf
+from pdf_factory import build_unique_pdf
+from pdf_factory import parse_size_distribution
+from pdf_factory import sample_page_count
+
+CONVERT_URL = "/api/convert-pdf-to-image/"
+STATUS_URL = "/api/task/{task_id}/status"
+PAGE_URL = "/api/documents/{hash_id}/pages/{page_number}"
+PERCENTILES = (0.5, 0.75, 0.9, 0.95, 0.99, 0.999)
+
+# Hashes of documents seen during the run, shared by the users of this locust process.
+known_hashes: deque[str] = deque(maxlen=1000)
+completed_hashes: deque[str] = deque(maxlen=1000)
+page_counts: dict[str, int] = {}
+
+
+@events.init_command_line_parser.add_listener
+def _(parser) -> None:
+    parser.add_argument(
+        "--doc-sizes",
+        type=str,
+        env_var="LOCUST_DOC_SIZES",
+        default="1:60,5:25,50:10,300:5",
+        help="Document size distribution as pages:weight pairs, e.g. '1:60,5:25,50:10,300:5'",
+    )
+    parser.add_argument(
+        "--cache-hit-docs",
+        type=int,
+        env_var="LOCUST_CACHE_HIT_DOCS",
+        default=5,
+        help="Number of fixed documents re-uploaded by cache-hit users",
+    )
+    parser.add_argument(
+        "--percentiles-file",
+        type=str,
+        env_var="LOCUST_PERCENTILES_FILE",
+        default="",
+        help="Write latency percentiles per scenario to this JSON file when the run stops",
+    )
+
+
+@events.quitting.add_listener
+def _(environment, **kwargs) -> None:
+    path = environment.parsed_options.percentiles_file if environment.parsed_options else ""
+    if not path:
+        return
+
+    report = {}
+    for (name, method), entry in sorted(environment.stats.entries.items()):
+        if entry.num_requests == 0:
+            continue
+        report[name] = {
+            "method": method,
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "rps": round(entry.total_rps, 2),
+            "avg_ms": round(entry.avg_response_time, 2),
+            "max_ms": round(entry.max_response_time, 2),
+            "percentiles_ms": {f"p{p * 100:g}": entry.get_response_time_percentile(p) for p in PERCENTILES},
+        }
+
+    with open(path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+
+
+def load_seed_pdf() -> bytes | None:
+    """Load the optional real-world sample document from ``data/test.pdf``."""
+    pdf_path = os.path.join(os.path.dirname(__file__), "data", "test.pdf")
+    if not os.path.exists(pdf_path):
+        return None
+    with open(pdf_path, "rb") as pdf_file:
+        return pdf_file.read()
 
 
 class PDFConverterUser(HttpUser):
+    abstract = True
     wait_time = between(1, 3)
 
+    def upload(self, pdf_data: bytes, name: str) -> None:
+        files = {"file": ("sample.pdf", pdf_data, "application/pdf")}
+        with self.client.post(CONVERT_URL, files=files, name=name, catch_response=True, verify=False) as response:
+            if response.status_code == 200:
+                file_hash = hashlib.sha256(pdf_data).hexdigest()
+                known_hashes.append(file_hash)
+                body = response.json()
+                if body.get("status") == "already_exists":
+                    completed_hashes.append(file_hash)
+                elif body.get("status") == "completed":
+                    completed_hashes.append(file_hash)
+                    page_counts[file_hash] = body.get("page_count") or 1
+                response.success()
+            else:
+                response.failure(f"Failed with status code {response.status_code}: {response.text}")
+
+
+class UniqueUploadUser(PDFConverterUser):
+    """Uploads freshly generated documents, exercising the full conversion path."""
+
+    weight = 2
+
     def on_start(self) -> None:
-        # Path to your PDF file - update this with your actual PDF file path
-        pdf_path = os.path.join(os.path.dirname(__file__), r"data\test.pdf")
+        self.distribution = parse_size_distribution(self.environment.parsed_options.doc_sizes)
 
-        # Check if the file exists
-        if not os.path.exists(pdf_path):
-            raise StopUser()
+    @task
+    def upload_unique_pdf(self) -> None:
+        pages = sample_page_count(self.distribution)
+        self.upload(build_unique_pdf(pages), name=f"unique-upload [{pages}p]")
 
-        # Read the PDF file
-        try:
-            with open(pdf_path, "rb") as pdf_file:
-                self.pdf_data = pdf_file.read()
-        except Exception:
+
+class CacheHitUploadUser(PDFConverterUser):
+    """Re-uploads a small fixed set of documents, exercising the cache-hit path."""
+
+    weight = 5
+
+    def on_start(self) -> None:
+        distribution = parse_size_distribution(self.environment.parsed_options.doc_sizes)
+        seed = load_seed_pdf()
+        self.documents = [seed] if seed else []
+        for index in range(self.environment.parsed_options.cache_hit_docs):
+            self.documents.append(build_pdf(sample_page_count(distribution), nonce=f"cache-hit-{index}"))
+        if not self.documents:
             raise StopUser()
 
     @task
-    def convert_pdf_to_image(self) -> None:
-        # Define files to upload
-        files = {"file": ("sample.pdf", self.pdf_data, "application/pdf")}
-        with self.client.post(
-            "/api/convert-pdf-to-image/",
-            files=files,
-            name="Convert PDF to Image",
+    def upload_known_pdf(self) -> None:
+        self.upload(random.choice(self.documents), name="cache-hit-upload")  # noqa: S311
+
+
+class StatusPollerUser(HttpUser):
+    """Polls conversion status for documents submitted during the run, like the frontend does."""
+
+    weight = 3
+    wait_time = between(2, 2)
+
+    @task
+    def poll_status(self) -> None:
+        if not known_hashes:
+            return
+        task_id = random.choice(known_hashes)  # noqa: S311
+        with self.client.get(
+            STATUS_URL.format(task_id=task_id), name="status-poll", catch_response=True, verify=False
+        ) as response:
+            if response.status_code in (200, 202):
+                body = response.json()
+                if body.get("status") == "completed":
+                    completed_hashes.append(task_id)
+                    page_counts[task_id] = body.get("page_count") or 1
+                response.success()
+            else:
+                response.failure(f"Failed with status code {response.status_code}: {response.text}")
+
+
+class PageFetcherUser(HttpUser):
+    """Views single pages of converted documents through the page endpoint, like the frontend does."""
+
+    weight = 2
+    wait_time = between(1, 3)
+
+    @task
+    def fetch_page(self) -> None:
+        if not completed_hashes:
+            return
+        hash_id = random.choice(completed_hashes)  # noqa: S311
+        page_number = random.randint(1, page_counts.get(hash_id, 1))  # noqa: S311
+        with self.client.get(
+            PAGE_URL.format(hash_id=hash_id, page_number=page_number),
+            name="page-fetch",
             catch_response=True,
             verify=False,
         ) as response:
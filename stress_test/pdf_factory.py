@@ -0,0 +1,89 @@
+import random
+import uuid
+
+
+def build_pdf(num_pages: int, nonce: str | None = None) -> bytes:
+    """
+    Build a minimal, valid PDF document with the requested number of pages.
+
+    Each page carries a short text line. When a nonce is given it is written on every
+    page, so two documents with different nonces never share a SHA-256 hash.
+
+    Args:
+        num_pages (int): Number of pages to generate.
+        nonce (str | None): Optional marker embedded in the page content.
+
+    Returns:
+        bytes: The encoded PDF document.
+    """
+    if num_pages < 1:
+        raise ValueError("A PDF needs at least one page")
+
+    font_id = 3
+    first_page_id = 4
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # pages tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    page_ids = []
+    for page in range(1, num_pages + 1):
+        page_id = first_page_id + 2 * (page - 1)
+        content_id = page_id + 1
+        page_ids.append(page_id)
+        text = f"Stress test page {page}" + (f" - {nonce}" if nonce else "")
+        stream = f"BT /F1 24 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {num_pages} >>".encode("latin-1")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for object_id, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (object_id, body)
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+def build_unique_pdf(num_pages: int) -> bytes:
+    """Build a PDF whose content (and therefore hash) is unique to this call."""
+    return build_pdf(num_pages, nonce=uuid.uuid4().hex)
+
+
+def parse_size_distribution(spec: str) -> list[tuple[int, int]]:
+    """
+    Parse a document size distribution such as ``"1:60,5:25,50:10,300:5"``.
+
+    Each item is ``pages:weight``; weights are relative and do not need to add up to 100.
+
+    Returns:
+        list[tuple[int, int]]: ``(pages, weight)`` pairs.
+    """
+    distribution = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        pages, _, weight = item.partition(":")
+        distribution.append((int(pages), int(weight or 1)))
+    if not distribution:
+        raise ValueError(f"Empty document size distribution: {spec!r}")
+    return distribution
+
+
+def sample_page_count(distribution: list[tuple[int, int]]) -> int:
+    """Pick a page count according to the weighted distribution."""
+    sizes = [pages for pages, _ in distribution]
+    weights = [weight for _, weight in distribution]
+    return random.choices(sizes, weights=weights, k=1)[0]  # noqa: S311